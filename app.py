@@ -1,15 +1,25 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import (Flask, Response, render_template, request, jsonify, session,
+                   stream_with_context)
 from flask_cors import CORS
 import os
 import logging
 from werkzeug.utils import secure_filename
 from config import Config
-from models.ai_model import UnibotAI
+from models.ai_model import (OVERLOADED_RESPONSE, TIMEOUT_RESPONSE, batch_responses,
+                             fallback_response, load_unibot_ai, split_response)
+from models.intent_router import IntentRouter
+from utils.conversation_log import ConversationLogger
 from utils.database import Database
-import json
+from utils.sse import sse_event
+from utils.executors import (Deadline, DeadlineExceeded, ExecutorOverloaded,
+                             shutdown_executors)
+from utils.warmup import BackgroundLoader
+from worker import describe_ingest_job, start_worker_process, stop_worker_process
+import atexit
+import secrets
 import signal
 import sys
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import time
 
 # Configurar logging
 logging.basicConfig(
@@ -22,18 +32,26 @@ logger = logging.getLogger(__name__)
 def signal_handler(sig, frame):
     """Handler para interrupção do programa"""
     logger.info("Recebido sinal de interrupção. Encerrando...")
+    shutdown_executors()
     sys.exit(0)
 
 
 signal.signal(signal.SIGINT, signal_handler)
 
 
-def create_app():
-    """Factory function para criar a aplicação Flask"""
+def create_app(preload=False):
+    """Factory function para criar a aplicação Flask
+
+    Com preload=True (servidor pre-fork, ver wsgi.py) o modelo é carregado
+    aqui mesmo, antes do fork, para ser compartilhado pelos workers; o
+    aquecimento fica para cada worker, após o fork.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
-    CORS(app)
+    if Config.CORS_ALLOW_CREDENTIALS and '*' in Config.CORS_ORIGINS:
+        raise ValueError("CORS_ORIGINS='*' não pode ser usado com CORS_ALLOW_CREDENTIALS: liste as origens")
+    CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=Config.CORS_ALLOW_CREDENTIALS)
 
     logger.info("Inicializando componentes...")
 
@@ -45,18 +63,41 @@ def create_app():
         config_instance = Config()
         logger.info("Config carregado")
 
+        # Conversas gravadas em lotes por uma thread, fora do /chat
+        conversation_logger = ConversationLogger(
+            db,
+            batch_size=config_instance.CONVERSATION_LOG_BATCH_SIZE,
+            flush_interval=config_instance.CONVERSATION_LOG_FLUSH_INTERVAL,
+            max_pending=config_instance.CONVERSATION_LOG_MAX_PENDING
+        )
+        app.extensions['conversation_logger'] = conversation_logger
+
         # Criar diretórios necessários
         os.makedirs(config_instance.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(config_instance.VECTORSTORE_PATH, exist_ok=True)
         logger.info("Diretórios criados")
 
-        unibot_ai = UnibotAI(config_instance)
-        logger.info("UnibotAI inicializado")
+        # Modelo e vectorstore carregam em segundo plano; até lá o /chat
+        # responde com o fallback (ou 503) e o /readyz informa o andamento
+        ai_loader = BackgroundLoader(
+            lambda loader: load_unibot_ai(loader, config_instance, db, warm_up=not preload))
+        if preload or not config_instance.MODEL_WARMUP_BACKGROUND:
+            ai_loader.load()
+        else:
+            ai_loader.start()
+        app.extensions['unibot_ai_loader'] = ai_loader
+        fallback_router = IntentRouter(config_instance.INTENT_KEYWORDS)
 
     except Exception as e:
         logger.error(f"Erro na inicialização: {str(e)}")
         raise
 
+    def chat_session_id():
+        """Id da sessão de chat, guardado no cookie de sessão (assinado)"""
+        if 'chat_id' not in session:
+            session['chat_id'] = secrets.token_urlsafe(16)
+        return session['chat_id']
+
     def allowed_file(filename):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'pdf'
 
@@ -70,6 +111,21 @@ def create_app():
         """Página administrativa"""
         return render_template('admin.html')
 
+    @app.route('/healthz')
+    def healthz():
+        """Liveness: o processo está de pé e atendendo requisições"""
+        return jsonify({'status': 'ok'})
+
+    @app.route('/readyz')
+    def readyz():
+        """Readiness: modelo e vectorstore carregados"""
+        status = ai_loader.status()
+        unibot_ai = ai_loader.get()
+        status['vectorstore'] = (unibot_ai is not None
+                                 and unibot_ai.pdf_processor.vectorstore is not None)
+        # Modelo carregado mas sem índice (erro já registrado): não recebe tráfego
+        return jsonify(status), 200 if ai_loader.ready and status['vectorstore'] else 503
+
     @app.route('/chat', methods=['POST'])
     def chat():
         """Endpoint para processar mensagens do chat"""
@@ -85,39 +141,187 @@ def create_app():
 
             logger.info(f"Recebida pergunta: {user_message[:50]}...")
 
-            # Registrar pergunta no banco
-            db.log_question(user_message)
+            unibot_ai = ai_loader.get()
+            if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+                return jsonify({
+                    'success': False,
+                    'error': 'O assistente ainda está sendo carregado. Tente novamente em instantes.',
+                    'loading': True
+                }), 503, {'Retry-After': '5'}
 
-            # Gerar resposta com timeout
+            # Gerar resposta dentro do prazo da requisição
+            started = time.perf_counter()
+            details = {}
             try:
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(
-                        unibot_ai.generate_response, user_message)
-                    response = future.result(timeout=30)  # 30 segundos timeout
-            except TimeoutError:
+                if unibot_ai is None:
+                    logger.info("Modelo ainda carregando - resposta de fallback")
+                    response = fallback_response(fallback_router, user_message)
+                    details['origin'] = 'loading'
+                else:
+                    response = unibot_ai.generate_response(
+                        user_message, deadline=Deadline(config_instance.CHAT_TIMEOUT),
+                        details=details, session_id=chat_session_id())
+            except DeadlineExceeded:
                 logger.error("Timeout na geração de resposta")
-                response = "Desculpe, a consulta está demorando mais que o esperado. Tente novamente com uma pergunta mais específica."
+                response = TIMEOUT_RESPONSE
+                details['origin'] = 'timeout'
+            except ExecutorOverloaded:
+                logger.warning("Servidor sobrecarregado - pergunta recusada")
+                response = OVERLOADED_RESPONSE
+                details['origin'] = 'overloaded'
+
+            # Registrar a conversa (gravada em segundo plano)
+            conversation_logger.log(
+                user_message, response,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                origin=details.get('origin'),
+                sources=details.get('sources')
+            )
+
+            logger.info("Resposta enviada com sucesso")
 
-            # Registrar resposta no banco
-            db.log_response(user_message, response)
+            return jsonify({
+                'success': True,
+                'response': response,
+                'loading': unibot_ai is None
+            })
 
-            logger.info(f"Resposta enviada com sucesso")
+        except Exception as e:
+            logger.error(f"Erro no chat: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': 'Erro interno do servidor'
+            })
+
+    @app.route('/chat/batch', methods=['POST'])
+    def chat_batch():
+        """Várias perguntas em uma requisição: {"questions": [...]}
+
+        As respostas vêm na mesma ordem, cada uma com o próprio success/error.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            questions = data.get('questions')
+            if not isinstance(questions, list) or not questions:
+                return jsonify({
+                    'success': False,
+                    'error': 'Envie uma lista de perguntas em "questions"'
+                }), 400
+            if len(questions) > config_instance.CHAT_BATCH_MAX_QUESTIONS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Máximo de {config_instance.CHAT_BATCH_MAX_QUESTIONS} perguntas por requisição'
+                }), 413
+
+            logger.info(f"Recebido lote de {len(questions)} perguntas")
+
+            unibot_ai = ai_loader.get()
+            if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+                return jsonify({
+                    'success': False,
+                    'error': 'O assistente ainda está sendo carregado. Tente novamente em instantes.',
+                    'loading': True
+                }), 503, {'Retry-After': '5'}
+
+            started = time.perf_counter()
+            results = batch_responses(unibot_ai, fallback_router, questions,
+                                      config_instance.CHAT_BATCH_TIMEOUT)
+
+            # Registrar as conversas (gravadas em segundo plano)
+            latency_ms = (time.perf_counter() - started) * 1000
+            for question, result in zip(questions, results):
+                if result['success']:
+                    conversation_logger.log(
+                        question.strip(), result['response'], latency_ms=latency_ms,
+                        origin=result.get('origin'), sources=result.get('sources'))
 
             return jsonify({
                 'success': True,
-                'response': response
+                'results': results,
+                'loading': unibot_ai is None
             })
 
         except Exception as e:
-            logger.error(f"Erro no chat: {str(e)}")
+            logger.error(f"Erro no chat em lote: {str(e)}")
             return jsonify({
                 'success': False,
                 'error': 'Erro interno do servidor'
             })
 
+    @app.route('/chat/stream', methods=['POST'])
+    def chat_stream():
+        """Como o /chat, mas a resposta chega em eventos SSE à medida que é produzida
+
+        Eventos: status (logo ao receber e antes da busca), sources (arquivos
+        usados), delta (pedaços do texto) e done (origem da resposta).
+        """
+        data = request.get_json(silent=True) or {}
+        user_message = (data.get('message') or '').strip()
+        if not user_message:
+            return jsonify({
+                'success': False,
+                'error': 'Mensagem vazia'
+            })
+
+        logger.info(f"Recebida pergunta (stream): {user_message[:50]}...")
+
+        unibot_ai = ai_loader.get()
+        if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+            return jsonify({
+                'success': False,
+                'error': 'O assistente ainda está sendo carregado. Tente novamente em instantes.',
+                'loading': True
+            }), 503, {'Retry-After': '5'}
+
+        # O cookie de sessão precisa sair nos cabeçalhos, antes do corpo
+        session_id = chat_session_id()
+
+        def events():
+            started = time.perf_counter()
+            details = {}
+            pieces = []
+            yield sse_event('status', {'stage': 'received', 'loading': unibot_ai is None})
+            try:
+                if unibot_ai is None:
+                    details['origin'] = 'loading'
+                    stream = (('delta', {'text': piece}) for piece in
+                              split_response(fallback_response(fallback_router, user_message)))
+                else:
+                    stream = unibot_ai.stream_response(
+                        user_message, deadline=Deadline(config_instance.CHAT_TIMEOUT),
+                        details=details, session_id=session_id)
+                for event, event_data in stream:
+                    if event == 'done':
+                        continue
+                    if event == 'delta':
+                        pieces.append(event_data['text'])
+                    yield sse_event(event, event_data)
+            except (DeadlineExceeded, ExecutorOverloaded) as e:
+                timeout = isinstance(e, DeadlineExceeded)
+                logger.error("Timeout na geração de resposta" if timeout
+                             else "Servidor sobrecarregado - pergunta recusada")
+                details['origin'] = 'timeout' if timeout else 'overloaded'
+                pieces = [TIMEOUT_RESPONSE if timeout else OVERLOADED_RESPONSE]
+                yield sse_event('delta', {'text': pieces[0]})
+            except Exception as e:
+                logger.error(f"Erro no chat (stream): {str(e)}")
+                details['origin'] = 'error'
+                yield sse_event('error', {'error': 'Erro interno do servidor'})
+
+            yield sse_event('done', {'origin': details.get('origin')})
+            conversation_logger.log(
+                user_message, ''.join(pieces),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                origin=details.get('origin'),
+                sources=details.get('sources')
+            )
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     @app.route('/upload', methods=['POST'])
     def upload_files():
-        """Endpoint para upload e treinamento com PDFs"""
+        """Endpoint para upload de PDFs - o treinamento é feito pelo worker"""
         try:
             logger.info("=== INICIANDO UPLOAD DE ARQUIVOS ===")
 
@@ -129,7 +333,7 @@ def create_app():
 
             files = request.files.getlist('files')
             uploaded_files = []
-            training_results = []
+            jobs = []
 
             logger.info(f"Recebidos {len(files)} arquivos para upload")
 
@@ -140,7 +344,7 @@ def create_app():
                         config_instance.UPLOAD_FOLDER, filename)
 
                     logger.info(
-                        f"Processando arquivo {i+1}/{len(files)}: {filename}")
+                        f"Salvando arquivo {i+1}/{len(files)}: {filename}")
 
                     try:
                         # Salvar arquivo
@@ -152,41 +356,23 @@ def create_app():
                         logger.info(
                             f"Arquivo salvo: {file_size / 1024 / 1024:.2f} MB")
 
-                        # Treinar IA com timeout mais longo
-                        logger.info(f"Iniciando treinamento para: {filename}")
-
-                        try:
-                            with ThreadPoolExecutor(max_workers=1) as executor:
-                                future = executor.submit(
-                                    unibot_ai.pdf_processor.train_with_pdf,
-                                    filepath,
-                                    filename
-                                )
-                                success = future.result(
-                                    timeout=300)  # 5 minutos timeout
-                        except TimeoutError:
-                            logger.error(
-                                f"Timeout no treinamento de {filename}")
-                            success = False
-
-                        training_results.append({
-                            'filename': filename,
-                            'success': success
-                        })
+                        # Enfileirar o treinamento
+                        job_id = db.create_ingest_job(filename, filepath)
+                        if job_id is None:
+                            raise RuntimeError(
+                                'Não foi possível enfileirar o treinamento')
 
-                        # Registrar no banco
-                        if success:
-                            db.log_pdf_upload(filename, filepath)
-                            logger.info(f"✅ {filename} processado com SUCESSO")
-                        else:
-                            logger.error(
-                                f"❌ {filename} FALHOU no processamento")
+                        jobs.append({
+                            'job_id': job_id,
+                            'filename': filename
+                        })
+                        logger.info(f"Job {job_id} criado para {filename}")
 
                     except Exception as e:
                         logger.error(f"Erro ao processar {filename}: {str(e)}")
-                        training_results.append({
+                        jobs.append({
+                            'job_id': None,
                             'filename': filename,
-                            'success': False,
                             'error': str(e)
                         })
 
@@ -195,8 +381,8 @@ def create_app():
             return jsonify({
                 'success': True,
                 'uploaded_files': uploaded_files,
-                'training_results': training_results
-            })
+                'jobs': jobs
+            }), 202
 
         except Exception as e:
             logger.error(f"Erro crítico no upload: {str(e)}")
@@ -205,11 +391,30 @@ def create_app():
                 'error': f'Erro ao processar arquivos: {str(e)}'
             })
 
+    @app.route('/jobs/<int:job_id>')
+    def get_job(job_id):
+        """Endpoint para acompanhar o progresso de um job de ingestão"""
+        job = db.get_ingest_job(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'job': describe_ingest_job(job)
+        })
+
     @app.route('/stats')
     def get_stats():
         """Endpoint para obter estatísticas"""
         try:
             stats = db.get_stats()
+            unibot_ai = ai_loader.get()
+            if unibot_ai is not None:
+                stats['cache'] = unibot_ai.get_cache_stats()
+            stats['conversation_log'] = conversation_logger.get_stats()
             return jsonify({
                 'success': True,
                 'stats': stats
@@ -221,6 +426,36 @@ def create_app():
                 'error': 'Erro ao obter estatísticas'
             })
 
+    @app.route('/admin/conversations')
+    def get_conversations():
+        """Histórico de conversas paginado (mais recentes primeiro)
+
+        Parâmetros: limit, before_id (o next_before_id da página anterior),
+        since, until (UTC, 'AAAA-MM-DD[ HH:MM:SS]') e origin. Conversas
+        mais antigas que a retenção estão nos arquivos de
+        utils/conversation_archive.py.
+        """
+        try:
+            limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+            conversations = db.get_conversations(
+                limit=limit,
+                before_id=request.args.get('before_id', type=int),
+                since=request.args.get('since'),
+                until=request.args.get('until'),
+                origin=request.args.get('origin')
+            )
+            return jsonify({
+                'success': True,
+                'conversations': conversations,
+                'next_before_id': conversations[-1]['id'] if len(conversations) == limit else None
+            })
+        except Exception as e:
+            logger.error(f"Erro ao obter conversas: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': 'Erro ao obter conversas'
+            })
+
     @app.route('/trained-docs')
     def get_trained_docs():
         """Endpoint para obter lista de documentos treinados"""
@@ -239,9 +474,19 @@ def create_app():
 
     @app.route('/clear-history', methods=['POST'])
     def clear_history():
-        """Endpoint para limpar histórico"""
+        """Endpoint para limpar histórico
+
+        Limpa o histórico da sessão de quem chama; {"all": true} (painel
+        administrativo) limpa o de todas as sessões.
+        """
         try:
-            unibot_ai.clear_history()
+            data = request.get_json(silent=True) or {}
+            unibot_ai = ai_loader.get()
+            if unibot_ai is not None:
+                if data.get('all'):
+                    unibot_ai.clear_history()
+                elif 'chat_id' in session:
+                    unibot_ai.clear_history(session['chat_id'])
             return jsonify({
                 'success': True,
                 'message': 'Histórico limpo com sucesso'
@@ -273,6 +518,10 @@ if __name__ == '__main__':
         logger.info("=== INICIANDO UNIBOT ===")
         app = create_app()
         logger.info("Aplicação criada com sucesso!")
+
+        # Com o reloader do modo debug só o processo filho inicia o worker
+        if Config.INGEST_WORKER_AUTOSTART and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            atexit.register(stop_worker_process, start_worker_process())
         logger.info("Servidor iniciando em http://localhost:5000")
         logger.info("=== UNIBOT PRONTO PARA USO ===")
         app.run(debug=True, host='127.0.0.1', port=5000, threaded=True)
@@ -1,34 +1,528 @@
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.middleware.cors import CORSMiddleware
-from document_processor import process_document, query_ai_model
+"""Serviço ASGI (FastAPI) com as mesmas rotas do app.py
+
+    uvicorn backend.main:app --host 127.0.0.1 --port 8000
+
+Executar a partir da raiz do projeto (os caminhos em data/ são relativos).
+O loop de eventos só coordena: geração de respostas (encode e busca) roda
+no pool 'chat' de utils/executors.py e as consultas ao SQLite no pool de
+threads do AnyIO, então conexões ociosas ou esperando o /chat/stream não
+ocupam uma thread cada.
+"""
+import asyncio
+import logging
 import os
-import shutil
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import anyio
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.middleware.sessions import SessionMiddleware
+from werkzeug.utils import secure_filename
 
-app = FastAPI()
+from config import Config
+from models.ai_model import (OVERLOADED_RESPONSE, TIMEOUT_RESPONSE, batch_responses,
+                             fallback_response, load_unibot_ai, split_response)
+from models.intent_router import IntentRouter
+from utils.conversation_log import ConversationLogger
+from utils.database import Database
+from utils.executors import (Deadline, DeadlineExceeded, ExecutorOverloaded, get_executor,
+                             shutdown_executors)
+from utils.sse import sse_event
+from utils.warmup import BackgroundLoader
+from worker import describe_ingest_job, start_worker_process, stop_worker_process
 
-# Permitir acesso do seu front-end
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["../frontend/js/script.js"],  # ou especifique o domínio do seu front-end
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLarge(Exception):
+    """O corpo do upload passou de MAX_CONTENT_LENGTH"""
+
+
+async def run_in_chat_pool(fn, *args, **kwargs):
+    """Executa uma função bloqueante no pool 'chat' sem bloquear o loop"""
+    return await asyncio.wrap_future(get_executor('chat').submit(fn, *args, **kwargs))
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'pdf'
+
+
+async def stream_uploads(request: Request, upload_folder: str, max_bytes: int) -> List[Dict]:
+    """Grava no disco os PDFs do campo 'files' à medida que o corpo chega
+
+    O corpo multipart/form-data passa pelo parser bloco a bloco e o
+    conteúdo de cada arquivo vai direto para o destino, sem ser montado em
+    memória nem em um arquivo temporário. Retorna [{'filename', 'filepath',
+    'size'}]; se o corpo passar de max_bytes (com ou sem Content-Length),
+    apaga o que foi gravado e levanta UploadTooLarge.
+    """
+    _, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if not boundary:
+        raise ValueError('Envie os arquivos como multipart/form-data')
+
+    # Os callbacks do parser são síncronos: acumulam eventos que são
+    # gravados (sem bloquear o loop) depois de cada bloco
+    events = []
+    header = [b'', b'']
+    headers = {}
+
+    def on_header_field(data, start, end):
+        header[0] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header[1] += data[start:end]
+
+    def on_header_end():
+        headers[header[0].lower()] = header[1]
+        header[0] = header[1] = b''
+
+    def on_headers_finished():
+        events.append(('begin', dict(headers)))
+        headers.clear()
+
+    parser = MultipartParser(boundary, {
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': lambda data, start, end: events.append(('data', data[start:end])),
+        'on_part_end': lambda: events.append(('end', None)),
+    })
+
+    saved = []
+    output = None
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise UploadTooLarge()
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == 'begin':
+                    _, disposition = parse_options_header(value.get(b'content-disposition', b''))
+                    name = disposition.get(b'name', b'').decode('utf-8', 'replace')
+                    filename = secure_filename(disposition.get(b'filename', b'').decode('utf-8', 'replace'))
+                    if name == 'files' and filename and allowed_file(filename):
+                        saved.append({
+                            'filename': filename,
+                            'filepath': os.path.join(upload_folder, filename),
+                            'size': 0
+                        })
+                        output = await anyio.open_file(saved[-1]['filepath'], 'wb')
+                elif output is not None and kind == 'data':
+                    await output.write(value)
+                    saved[-1]['size'] += len(value)
+                elif output is not None and kind == 'end':
+                    await output.aclose()
+                    output = None
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        for item in saved:
+            try:
+                os.remove(item['filepath'])
+            except OSError:
+                pass
+        raise
+    finally:
+        if output is not None:
+            await output.aclose()
+    return saved
+
+
+def create_app() -> FastAPI:
+    """Cria o app ASGI com os mesmos componentes do app.py"""
+    config_instance = Config()
+    if config_instance.CORS_ALLOW_CREDENTIALS and '*' in config_instance.CORS_ORIGINS:
+        raise ValueError("CORS_ORIGINS='*' não pode ser usado com CORS_ALLOW_CREDENTIALS: liste as origens")
+    db = Database()
+    os.makedirs(config_instance.UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(config_instance.VECTORSTORE_PATH, exist_ok=True)
+
+    conversation_logger = ConversationLogger(
+        db,
+        batch_size=config_instance.CONVERSATION_LOG_BATCH_SIZE,
+        flush_interval=config_instance.CONVERSATION_LOG_FLUSH_INTERVAL,
+        max_pending=config_instance.CONVERSATION_LOG_MAX_PENDING
+    )
+    ai_loader = BackgroundLoader(
+        lambda loader: load_unibot_ai(loader, config_instance, db))
+    fallback_router = IntentRouter(config_instance.INTENT_KEYWORDS)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if config_instance.MODEL_WARMUP_BACKGROUND:
+            ai_loader.start()
+        else:
+            await anyio.to_thread.run_sync(ai_loader.load)
+        # Com --workers N cada processo inicia um worker, mas só o que
+        # obtém a trava (INGEST_WORKER_LOCK_PATH) fica rodando
+        ingest_process = start_worker_process() if config_instance.INGEST_WORKER_AUTOSTART else None
+        yield
+        conversation_logger.close()
+        stop_worker_process(ingest_process)
+        shutdown_executors()
+
+    app = FastAPI(title='Unibot', lifespan=lifespan)
+    app.state.db = db
+    app.state.ai_loader = ai_loader
+    app.state.conversation_logger = conversation_logger
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=config_instance.CORS_ORIGINS,
+        allow_credentials=config_instance.CORS_ALLOW_CREDENTIALS,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Mesmo papel do cookie de sessão do Flask: o id do histórico de chat
+    app.add_middleware(SessionMiddleware, secret_key=config_instance.SECRET_KEY)
+
+    app.mount('/static', StaticFiles(directory='static'), name='static')
+    templates = Jinja2Templates(directory='templates')
+    # Os templates usam url_for('static', filename=...) no formato do Flask
+    templates.env.globals['url_for'] = lambda endpoint, filename: f"/static/{filename}"
+
+    def chat_session_id(request: Request):
+        if 'chat_id' not in request.session:
+            request.session['chat_id'] = secrets.token_urlsafe(16)
+        return request.session['chat_id']
+
+    async def read_message(request: Request) -> str:
+        try:
+            data = await request.json()
+        except ValueError:
+            return ''
+        return ((data or {}).get('message') or '').strip()
+
+    def loading_response():
+        return JSONResponse({
+            'success': False,
+            'error': 'O assistente ainda está sendo carregado. Tente novamente em instantes.',
+            'loading': True
+        }, status_code=503, headers={'Retry-After': '5'})
+
+    @app.get('/')
+    async def index(request: Request):
+        """Página principal do chat"""
+        return templates.TemplateResponse(request, 'index.html')
+
+    @app.get('/admin')
+    async def admin(request: Request):
+        """Página administrativa"""
+        return templates.TemplateResponse(request, 'admin.html')
+
+    @app.get('/healthz')
+    async def healthz():
+        """Liveness: o processo está de pé e atendendo requisições"""
+        return {'status': 'ok'}
+
+    @app.get('/readyz')
+    async def readyz():
+        """Readiness: modelo e vectorstore carregados"""
+        status = ai_loader.status()
+        unibot_ai = ai_loader.get()
+        status['vectorstore'] = (unibot_ai is not None
+                                 and unibot_ai.pdf_processor.vectorstore is not None)
+        # Modelo carregado mas sem índice (erro já registrado): não recebe tráfego
+        return JSONResponse(status, status_code=200 if ai_loader.ready and status['vectorstore'] else 503)
+
+    @app.post('/chat')
+    async def chat(request: Request):
+        """Endpoint para processar mensagens do chat"""
+        try:
+            user_message = await read_message(request)
+            if not user_message:
+                return {'success': False, 'error': 'Mensagem vazia'}
+
+            logger.info(f"Recebida pergunta: {user_message[:50]}...")
+
+            unibot_ai = ai_loader.get()
+            if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+                return loading_response()
+
+            # Gerar resposta dentro do prazo da requisição
+            started = time.perf_counter()
+            details = {}
+            try:
+                if unibot_ai is None:
+                    logger.info("Modelo ainda carregando - resposta de fallback")
+                    response = fallback_response(fallback_router, user_message)
+                    details['origin'] = 'loading'
+                else:
+                    response = await run_in_chat_pool(
+                        unibot_ai.generate_response, user_message,
+                        deadline=Deadline(config_instance.CHAT_TIMEOUT),
+                        details=details, session_id=chat_session_id(request))
+            except DeadlineExceeded:
+                logger.error("Timeout na geração de resposta")
+                response = TIMEOUT_RESPONSE
+                details['origin'] = 'timeout'
+            except ExecutorOverloaded:
+                logger.warning("Servidor sobrecarregado - pergunta recusada")
+                response = OVERLOADED_RESPONSE
+                details['origin'] = 'overloaded'
+
+            # Registrar a conversa (gravada em segundo plano)
+            conversation_logger.log(
+                user_message, response,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                origin=details.get('origin'),
+                sources=details.get('sources')
+            )
+
+            return {'success': True, 'response': response, 'loading': unibot_ai is None}
+
+        except Exception as e:
+            logger.error(f"Erro no chat: {str(e)}")
+            return {'success': False, 'error': 'Erro interno do servidor'}
+
+    @app.post('/chat/batch')
+    async def chat_batch(request: Request):
+        """Várias perguntas em uma requisição: {"questions": [...]}
+
+        As respostas vêm na mesma ordem, cada uma com o próprio success/error.
+        """
+        try:
+            try:
+                data = await request.json()
+            except ValueError:
+                data = None
+            questions = data.get('questions') if isinstance(data, dict) else None
+            if not isinstance(questions, list) or not questions:
+                return JSONResponse({
+                    'success': False,
+                    'error': 'Envie uma lista de perguntas em "questions"'
+                }, status_code=400)
+            if len(questions) > config_instance.CHAT_BATCH_MAX_QUESTIONS:
+                return JSONResponse({
+                    'success': False,
+                    'error': f'Máximo de {config_instance.CHAT_BATCH_MAX_QUESTIONS} perguntas por requisição'
+                }, status_code=413)
+
+            logger.info(f"Recebido lote de {len(questions)} perguntas")
+
+            unibot_ai = ai_loader.get()
+            if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+                return loading_response()
+
+            started = time.perf_counter()
+            results = await run_in_chat_pool(
+                batch_responses, unibot_ai, fallback_router, questions,
+                config_instance.CHAT_BATCH_TIMEOUT)
+
+            # Registrar as conversas (gravadas em segundo plano)
+            latency_ms = (time.perf_counter() - started) * 1000
+            for question, result in zip(questions, results):
+                if result['success']:
+                    conversation_logger.log(
+                        question.strip(), result['response'], latency_ms=latency_ms,
+                        origin=result.get('origin'), sources=result.get('sources'))
+
+            return {'success': True, 'results': results, 'loading': unibot_ai is None}
+
+        except Exception as e:
+            logger.error(f"Erro no chat em lote: {str(e)}")
+            return {'success': False, 'error': 'Erro interno do servidor'}
+
+    @app.post('/chat/stream')
+    async def chat_stream(request: Request):
+        """Como o /chat, mas a resposta chega em eventos SSE (ver app.py)"""
+        user_message = await read_message(request)
+        if not user_message:
+            return {'success': False, 'error': 'Mensagem vazia'}
+
+        logger.info(f"Recebida pergunta (stream): {user_message[:50]}...")
+
+        unibot_ai = ai_loader.get()
+        if unibot_ai is None and config_instance.CHAT_WHILE_LOADING == '503':
+            return loading_response()
+        session_id = chat_session_id(request)
+
+        async def events():
+            started = time.perf_counter()
+            details = {}
+            pieces = []
+            yield sse_event('status', {'stage': 'received', 'loading': unibot_ai is None})
+            try:
+                if unibot_ai is None:
+                    details['origin'] = 'loading'
+                    stream = iter([('delta', {'text': piece}) for piece in
+                                   split_response(fallback_response(fallback_router, user_message))])
+                else:
+                    stream = unibot_ai.stream_response(
+                        user_message, deadline=Deadline(config_instance.CHAT_TIMEOUT),
+                        details=details, session_id=session_id)
+                while True:
+                    # Cada passo do gerador (que pode esperar pela busca) roda no pool
+                    item = await run_in_chat_pool(next, stream, None)
+                    if item is None:
+                        break
+                    event, event_data = item
+                    if event == 'done':
+                        continue
+                    if event == 'delta':
+                        pieces.append(event_data['text'])
+                    yield sse_event(event, event_data)
+            except (DeadlineExceeded, ExecutorOverloaded) as e:
+                timeout = isinstance(e, DeadlineExceeded)
+                logger.error("Timeout na geração de resposta" if timeout
+                             else "Servidor sobrecarregado - pergunta recusada")
+                details['origin'] = 'timeout' if timeout else 'overloaded'
+                pieces = [TIMEOUT_RESPONSE if timeout else OVERLOADED_RESPONSE]
+                yield sse_event('delta', {'text': pieces[0]})
+            except Exception as e:
+                logger.error(f"Erro no chat (stream): {str(e)}")
+                details['origin'] = 'error'
+                yield sse_event('error', {'error': 'Erro interno do servidor'})
+
+            yield sse_event('done', {'origin': details.get('origin')})
+            conversation_logger.log(
+                user_message, ''.join(pieces),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                origin=details.get('origin'),
+                sources=details.get('sources')
+            )
+
+        return StreamingResponse(events(), media_type='text/event-stream',
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.post('/upload')
+    async def upload_files(request: Request):
+        """Endpoint para upload de PDFs - o treinamento é feito pelo worker"""
+        try:
+            content_length = request.headers.get('content-length')
+            if content_length and int(content_length) > config_instance.MAX_CONTENT_LENGTH:
+                return JSONResponse({
+                    'success': False,
+                    'error': 'Arquivo muito grande'
+                }, status_code=413)
+
+            try:
+                saved = await stream_uploads(
+                    request, config_instance.UPLOAD_FOLDER, config_instance.MAX_CONTENT_LENGTH)
+            except UploadTooLarge:
+                return JSONResponse({
+                    'success': False,
+                    'error': 'Arquivo muito grande'
+                }, status_code=413)
+            if not saved:
+                return {'success': False, 'error': 'Nenhum arquivo enviado'}
+
+            logger.info(f"Recebidos {len(saved)} arquivos para upload")
+            uploaded_files = []
+            jobs = []
+
+            for item in saved:
+                filename = item['filename']
+                uploaded_files.append(filename)
+                logger.info(f"Arquivo salvo: {filename} ({item['size'] / 1024 / 1024:.2f} MB)")
+                try:
+                    # Enfileirar o treinamento
+                    job_id = await anyio.to_thread.run_sync(
+                        db.create_ingest_job, filename, item['filepath'])
+                    if job_id is None:
+                        raise RuntimeError('Não foi possível enfileirar o treinamento')
+                    jobs.append({'job_id': job_id, 'filename': filename})
+                    logger.info(f"Job {job_id} criado para {filename}")
+
+                except Exception as e:
+                    logger.error(f"Erro ao processar {filename}: {str(e)}")
+                    jobs.append({'job_id': None, 'filename': filename, 'error': str(e)})
+
+            return JSONResponse({
+                'success': True,
+                'uploaded_files': uploaded_files,
+                'jobs': jobs
+            }, status_code=202)
+
+        except Exception as e:
+            logger.error(f"Erro crítico no upload: {str(e)}")
+            return {'success': False, 'error': f'Erro ao processar arquivos: {str(e)}'}
+
+    # Rotas só com consultas rápidas ao SQLite: funções comuns, que o
+    # FastAPI executa no pool de threads do AnyIO
+
+    @app.get('/jobs/{job_id}')
+    def get_job(job_id: int):
+        """Endpoint para acompanhar o progresso de um job de ingestão"""
+        job = db.get_ingest_job(job_id)
+        if job is None:
+            return JSONResponse({'success': False, 'error': 'Job não encontrado'}, status_code=404)
+        return {'success': True, 'job': describe_ingest_job(job)}
+
+    @app.get('/stats')
+    def get_stats():
+        """Endpoint para obter estatísticas"""
+        try:
+            stats = db.get_stats()
+            unibot_ai = ai_loader.get()
+            if unibot_ai is not None:
+                stats['cache'] = unibot_ai.get_cache_stats()
+            stats['conversation_log'] = conversation_logger.get_stats()
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            logger.error(f"Erro ao obter estatísticas: {str(e)}")
+            return {'success': False, 'error': 'Erro ao obter estatísticas'}
+
+    @app.get('/admin/conversations')
+    def get_conversations(limit: int = 50, before_id: int = None, since: str = None,
+                          until: str = None, origin: str = None):
+        """Histórico de conversas paginado (ver app.py)"""
+        limit = min(max(limit, 1), 200)
+        conversations = db.get_conversations(
+            limit=limit, before_id=before_id, since=since, until=until, origin=origin)
+        return {
+            'success': True,
+            'conversations': conversations,
+            'next_before_id': conversations[-1]['id'] if len(conversations) == limit else None
+        }
+
+    @app.get('/trained-docs')
+    def get_trained_docs():
+        """Endpoint para obter lista de documentos treinados"""
+        try:
+            return {'success': True, 'documents': db.get_trained_documents()}
+        except Exception as e:
+            logger.error(f"Erro ao obter documentos: {str(e)}")
+            return {'success': False, 'error': 'Erro ao obter documentos'}
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    @app.post('/clear-history')
+    async def clear_history(request: Request):
+        """Limpa o histórico da sessão; {"all": true} limpa o de todas"""
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        unibot_ai = ai_loader.get()
+        if unibot_ai is not None:
+            if (data or {}).get('all'):
+                unibot_ai.clear_history()
+            elif 'chat_id' in request.session:
+                unibot_ai.clear_history(request.session['chat_id'])
+        return {'success': True, 'message': 'Histórico limpo com sucesso'}
 
-@app.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
+    @app.exception_handler(StarletteHTTPException)
+    async def http_error(request: Request, error: StarletteHTTPException):
+        if error.status_code == 404:
+            return templates.TemplateResponse(request, 'index.html', status_code=404)
+        return JSONResponse({'success': False, 'error': error.detail}, status_code=error.status_code)
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    return app
 
-    result = process_document(file_path)
-    return result
 
-@app.post("/ask/")
-async def ask_question(question: str = Form(...), filename: str = Form(...)):
-    answer = query_ai_model(question, filename)
-    return {"answer": answer}
+app = create_app()
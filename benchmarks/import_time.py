@@ -0,0 +1,75 @@
+"""Tempo de import por módulo (python -X importtime) de um módulo do projeto
+
+Roda o import em um processo novo e lista os módulos mais caros pelo tempo
+acumulado (incluindo os imports de cada um). Com --max-ms o comando falha
+se o total passar do limite, o que permite pegar regressões - por exemplo,
+um import de torch ou langchain que volte para o topo do app.py.
+
+    python -m benchmarks.import_time app --top 15 --max-ms 400
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE_RE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_imports(module: str):
+    """Retorna [(módulo, próprio µs, acumulado µs, profundidade)] na ordem do import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('module', nargs='?', default='app')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-ms', type=float, help='Falha se o import total passar disso')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    args = parser.parse_args(argv)
+
+    rows = measure_imports(args.module)
+    total_ms = next((cumulative for name, _, cumulative, _ in rows if name == args.module), 0) / 1000
+    top = sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]
+
+    report = {
+        'module': args.module,
+        'total_ms': round(total_ms, 1),
+        'modules': [
+            {'name': name, 'self_ms': round(self_us / 1000, 1),
+             'cumulative_ms': round(cumulative_us / 1000, 1), 'depth': depth}
+            for name, self_us, cumulative_us, depth in top
+        ]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {report['total_ms']} ms")
+        for row in report['modules']:
+            print(f"{row['cumulative_ms']:>10.1f} ms {row['self_ms']:>8.1f} ms  {'  ' * row['depth']}{row['name']}")
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"Import de {args.module} levou {total_ms:.1f} ms (limite {args.max_ms} ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
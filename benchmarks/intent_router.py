@@ -0,0 +1,94 @@
+"""Micro-benchmark do roteamento de intenções: cascata de any() x Aho-Corasick
+
+Mede o custo por pergunta com a tabela atual (Config.INTENT_KEYWORDS) e com
+tabelas maiores, completadas com intenções sintéticas, para mostrar como
+cada abordagem cresce com o número de intenções.
+
+    python -m benchmarks.intent_router --intents 5 50 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from models.intent_router import IntentRouter  # noqa: E402
+
+QUESTIONS = [
+    "Quais são as modalidades de ensino?",
+    "Qual o valor da mensalidade de Pedagogia?",
+    "Vocês têm curso de graduação em Administração EAD?",
+    "Qual o horário de atendimento da secretaria?",
+    "Como faço a matrícula na pós-graduação?",
+    "Olá, tudo bem? Gostaria de mais informações.",
+    "Quanto custa a segunda licenciatura e quais as formas de pagamento?",
+]
+
+
+def cascade_route(table, question):
+    """Roteamento anterior: uma varredura any() por intenção, em ordem"""
+    question_lower = question.lower()
+    for intent, keywords in table.items():
+        if any(word in question_lower for word in keywords):
+            return intent
+    return None
+
+
+def synthetic_table(size, seed):
+    rng = random.Random(seed)
+    table = {intent: list(keywords) for intent, keywords in Config.INTENT_KEYWORDS.items()}
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    while len(table) < size:
+        table[f"intent_{len(table)}"] = [
+            ''.join(rng.choice(alphabet) for _ in range(rng.randint(5, 10)))
+            for _ in range(5)
+        ]
+    return table
+
+
+def measure(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            fn(question)
+    return (time.perf_counter() - started) / (repeat * len(QUESTIONS)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--intents', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Grava os resultados em JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.intents:
+        table = synthetic_table(size, args.seed)
+        started = time.perf_counter()
+        router = IntentRouter(table)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        lowered = {intent: [keyword.lower() for keyword in keywords] for intent, keywords in table.items()}
+        result = {
+            'intents': len(table),
+            'keywords': sum(len(keywords) for keywords in table.values()),
+            'router_build_ms': round(build_ms, 3),
+            'cascade_us': round(measure(lambda q: cascade_route(lowered, q), args.repeat), 2),
+            'router_us': round(measure(router.route, args.repeat), 2)
+        }
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
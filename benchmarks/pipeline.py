@@ -0,0 +1,434 @@
+"""Desempenho da ingestão e das respostas, para comparar versões
+
+Ingestão: PDFProcessor.train_with_pdf sobre os PDFs de data/pdfs e sobre
+corpora sintéticos 10× e 100× maiores (páginas geradas com trechos dos
+próprios PDFs), com páginas/s, chunks/s e pico de memória (RSS). Respostas:
+latência de generate_response em um conjunto fixo de perguntas, na primeira
+passada (processo recém-iniciado) e em passadas seguintes com os caches
+limpos, além das respostas vindas do cache.
+
+Cada medida roda em um processo novo, com índice, banco e cache de
+embeddings em um diretório temporário (data/ não é alterado), e o modelo é
+carregado apenas do cache local (HF_HUB_OFFLINE).
+
+    python -m benchmarks.pipeline --scales 1 10 100 --output bench.json
+    python -m benchmarks.pipeline compare antes.json depois.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "Qual o valor da mensalidade?",
+    "Quais são as modalidades de ensino oferecidas?",
+    "Quais cursos de graduação estão disponíveis?",
+    "Como faço a matrícula?",
+    "Como funciona a rematrícula?",
+    "Posso cursar uma disciplina isolada?",
+    "Quais são as formas de pagamento?",
+    "Existe desconto para pagamento antecipado?",
+    "Quanto custa a segunda graduação?",
+    "Qual o horário de atendimento da secretaria?",
+    "Como solicitar o trancamento do curso?",
+    "Quais documentos são necessários para a inscrição?",
+    "O curso de Pedagogia é EAD ou presencial?",
+    "Qual a duração do curso de Administração?",
+    "Como emitir a segunda via do boleto?",
+    "Há cobrança de taxa para emissão de diploma?",
+]
+
+LINE_WIDTH = 95
+LINES_PER_PAGE = 52
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """Pico de RSS (ru_maxrss é em KB no Linux e em bytes no macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def latency_summary(latencies):
+    values = np.array(latencies) * 1000
+    return {
+        'count': len(latencies),
+        'mean_ms': round(float(values.mean()), 3),
+        **{f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in (50, 90, 95, 99)},
+        'max_ms': round(float(values.max()), 3)
+    }
+
+
+def bench_config(workdir: str):
+    """Config com índice, banco e caches dentro de workdir"""
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+    from config import Config
+
+    class BenchConfig(Config):
+        VECTORSTORE_PATH = os.path.join(workdir, 'vectorstore')
+        NUMPY_INDEX_PATH = os.path.join(workdir, 'vectorstore', 'numpy')
+        BM25_INDEX_PATH = os.path.join(workdir, 'vectorstore', 'bm25.json')
+        EMBEDDING_CACHE_PATH = os.path.join(workdir, 'embedding_cache.db')
+        # Mede o modelo, não o cache em disco dos chunks
+        EMBEDDING_CACHE_ENABLED = False
+        # Mede o corpus inteiro, sem o corte de arquivos grandes
+        INGEST_MAX_CHUNKS = 0
+        INGEST_MAX_TEXT_CHARS = 0
+
+    return BenchConfig
+
+
+def unique_pdfs(pdf_dir: str):
+    """PDFs do diretório sem as cópias de conteúdo idêntico (que a ingestão ignora)"""
+    from models.pdf_processor import file_fingerprint
+
+    files, seen = [], set()
+    for path in sorted(glob.glob(os.path.join(pdf_dir, '*.pdf'))):
+        fingerprint = file_fingerprint(path)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            files.append(path)
+    return files
+
+
+def _escape(line: str) -> bytes:
+    encoded = line.encode('cp1252', 'replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def write_text_pdf(path: str, pages):
+    """Grava um PDF com uma página de texto (Helvetica) por lista de linhas"""
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding')
+    }))
+    for lines in pages:
+        content = DecodedStreamObject()
+        content.set_data(b"BT /F1 10 Tf 14 TL 40 800 Td " +
+                         b" ".join(b"(" + _escape(line) + b") Tj T*" for line in lines) + b" ET")
+        page = PageObject.create_blank_page(None, 595, 842)
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})
+        })
+        writer.add_page(page)
+    with open(path, 'wb') as file:
+        writer.write(file)
+
+
+def synthetic_corpus(base_files, scale: int, output_dir: str, pages_per_file: int, seed: int):
+    """Gera scale × as páginas dos PDFs base, com trechos deles em ordem aleatória
+
+    Cada página recebe um trecho contínuo de palavras começando em uma
+    posição sorteada, com o mesmo número médio de caracteres por página dos
+    originais, então os chunks são parecidos com os reais, mas todos
+    diferentes entre si.
+    """
+    import PyPDF2
+
+    words, base_pages = [], 0
+    for path in base_files:
+        reader = PyPDF2.PdfReader(path)
+        base_pages += len(reader.pages)
+        for page in reader.pages:
+            words.extend((page.extract_text() or '').split())
+    if not words:
+        raise RuntimeError("Os PDFs base não têm texto extraível")
+
+    chars_per_page = min(sum(len(word) + 1 for word in words) // base_pages,
+                         LINE_WIDTH * (LINES_PER_PAGE - 1))
+    rng = random.Random(seed + scale)
+    total_pages = base_pages * scale
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for file_number, first_page in enumerate(range(0, total_pages, pages_per_file)):
+        pages = []
+        for page_number in range(first_page, min(first_page + pages_per_file, total_pages)):
+            position = rng.randrange(len(words))
+            text, chars = [], 0
+            while chars < chars_per_page:
+                word = words[position % len(words)]
+                text.append(word)
+                chars += len(word) + 1
+                position += 1
+            header = f"Documento sintético {file_number + 1} - página {page_number + 1}"
+            pages.append([header] + textwrap.wrap(' '.join(text), LINE_WIDTH))
+        path = os.path.join(output_dir, f"sintetico-{scale}x-{file_number + 1:04d}.pdf")
+        write_text_pdf(path, pages)
+        files.append(path)
+    return files
+
+
+def run_ingest(workdir: str, files):
+    """Treina files em um índice novo (executado no processo filho)"""
+    import PyPDF2
+    from models.pdf_processor import PDFProcessor
+    from utils.database import Database
+
+    config = bench_config(workdir)
+    db = Database(os.path.join(workdir, 'unibot.db'))
+    started = time.perf_counter()
+    processor = PDFProcessor(config, db)
+    model_load_seconds = time.perf_counter() - started
+    if processor.embeddings is None:
+        raise RuntimeError("Modelo de embeddings indisponível (está no cache local?)")
+    model_rss_mb = peak_rss_mb()
+
+    pages = sum(len(PyPDF2.PdfReader(path).pages) for path in files)
+    failed = 0
+    started = time.perf_counter()
+    for path in files:
+        if not processor.train_with_pdf(path, os.path.basename(path)):
+            failed += 1
+    seconds = time.perf_counter() - started
+    chunks = db.get_total_chunks()
+
+    return {
+        'files': len(files),
+        'failed': failed,
+        'pages': pages,
+        'chunks': chunks,
+        'model_load_seconds': round(model_load_seconds, 3),
+        'seconds': round(seconds, 3),
+        'pages_per_second': round(pages / seconds, 2),
+        'chunks_per_second': round(chunks / seconds, 2),
+        'model_rss_mb': model_rss_mb,
+        'peak_rss_mb': peak_rss_mb(),
+        # Processos da extração paralela (o maior deles)
+        'peak_child_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN)
+    }
+
+
+def run_query(workdir: str, warm_runs: int):
+    """Latência de generate_response sobre o índice de workdir (no processo filho)"""
+    from models.ai_model import UnibotAI
+    from utils.database import Database
+
+    config = bench_config(workdir)
+    started = time.perf_counter()
+    unibot_ai = UnibotAI(config, Database(os.path.join(workdir, 'unibot.db')), read_only=True)
+    model_load_seconds = time.perf_counter() - started
+    if unibot_ai.pdf_processor.vectorstore is None:
+        raise RuntimeError("Vectorstore indisponível (modelo fora do cache local?)")
+
+    def answer_all():
+        latencies, origins = [], {}
+        for question in QUESTIONS:
+            details = {}
+            started = time.perf_counter()
+            unibot_ai.generate_response(question, details=details)
+            latencies.append(time.perf_counter() - started)
+            origins[details.get('origin')] = origins.get(details.get('origin'), 0) + 1
+        return latencies, origins
+
+    def clear_caches():
+        unibot_ai.response_cache.clear()
+        unibot_ai.pdf_processor.query_embedding_cache.clear()
+
+    # Primeira passada: processo recém-iniciado, caches vazios
+    cold, origins = answer_all()
+
+    warm = []
+    for _ in range(warm_runs):
+        clear_caches()
+        warm.extend(answer_all()[0])
+
+    # Sem limpar: respostas vindas do cache
+    cached = answer_all()[0]
+
+    clear_caches()
+    started = time.perf_counter()
+    unibot_ai.generate_responses(QUESTIONS)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'questions': len(QUESTIONS),
+        'model_load_seconds': round(model_load_seconds, 3),
+        'origins': origins,
+        'cold': latency_summary(cold),
+        'warm': latency_summary(warm),
+        'cached': latency_summary(cached),
+        'batch_ms': round(batch_seconds * 1000, 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run_child(args, verbose: bool):
+    """Roda um subcomando em um processo novo e devolve o JSON impresso por ele"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.pipeline'] + args + (['--verbose'] if verbose else []),
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=None if verbose else subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha em {' '.join(args[:1])}:\n{(result.stderr or '')[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    from config import Config
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'embedding_model': Config.EMBEDDING_MODEL,
+        'embedding_backend': Config.EMBEDDING_BACKEND,
+        'vector_backend': Config.VECTOR_BACKEND,
+        'ingest_streaming': Config.INGEST_STREAMING,
+        'chunk_size': Config.CHUNK_SIZE
+    }
+
+
+def run_suite(args):
+    base_files = unique_pdfs(args.pdf_dir)
+    if not base_files:
+        print(f"Nenhum PDF em {args.pdf_dir}", file=sys.stderr)
+        return 1
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='unibot-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    results = {'environment': environment(), 'ingest': [], 'query': None}
+    try:
+        for scale in args.scales:
+            if scale == 1:
+                files = base_files
+            else:
+                files = synthetic_corpus(base_files, scale, os.path.join(workdir, f"corpus-{scale}x"),
+                                         args.pages_per_file, args.seed)
+            index_dir = os.path.join(workdir, f"index-{scale}x")
+            result = {'scale': scale, **run_child(['ingest', '--workdir', index_dir] + files, args.verbose)}
+            results['ingest'].append(result)
+            print(json.dumps(result))
+
+        if not args.skip_query:
+            index_dir = os.path.join(workdir, 'index-1x')
+            if 1 not in args.scales:
+                run_child(['ingest', '--workdir', index_dir] + base_files, args.verbose)
+            results['query'] = run_child(
+                ['query', '--workdir', index_dir, '--warm-runs', str(args.warm_runs)], args.verbose)
+            print(json.dumps(results['query']))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+def _change(before, after):
+    if not before:
+        return 'n/a'
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before_path: str, after_path: str):
+    """Diferença percentual entre dois resultados gravados com --output"""
+    with open(before_path) as file:
+        before = json.load(file)
+    with open(after_path) as file:
+        after = json.load(file)
+
+    before_ingest = {result['scale']: result for result in before.get('ingest', [])}
+    for result in after.get('ingest', []):
+        old = before_ingest.get(result['scale'])
+        if old is None:
+            continue
+        print(f"ingestão {result['scale']}x: "
+              f"páginas/s {old['pages_per_second']} -> {result['pages_per_second']} "
+              f"({_change(old['pages_per_second'], result['pages_per_second'])}), "
+              f"chunks/s {old['chunks_per_second']} -> {result['chunks_per_second']} "
+              f"({_change(old['chunks_per_second'], result['chunks_per_second'])}), "
+              f"pico RSS {old['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+
+    if before.get('query') and after.get('query'):
+        for run in ('cold', 'warm', 'cached'):
+            for metric in ('p50_ms', 'p95_ms'):
+                old, new = before['query'][run][metric], after['query'][run][metric]
+                print(f"resposta {run} {metric}: {old} -> {new} ({_change(old, new)})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='1 = PDFs de --pdf-dir; N = corpus sintético N× maior')
+    parser.add_argument('--pdf-dir', default=os.path.join(ROOT, 'data', 'pdfs'))
+    parser.add_argument('--pages-per-file', type=int, default=50)
+    parser.add_argument('--warm-runs', type=int, default=5)
+    parser.add_argument('--skip-query', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', help='Mantém índices e corpora aqui (padrão: temporário)')
+    parser.add_argument('--output', help='Grava os resultados em JSON')
+    parser.add_argument('--verbose', action='store_true', help='Mostra os logs dos processos filhos')
+    subparsers = parser.add_subparsers(dest='command')
+
+    compare_parser = subparsers.add_parser('compare', help='Compara dois arquivos de --output')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+
+    # Executados pela suíte em processos novos
+    ingest_parser = subparsers.add_parser('ingest')
+    ingest_parser.add_argument('--workdir', required=True)
+    ingest_parser.add_argument('files', nargs='+')
+    query_parser = subparsers.add_parser('query')
+    query_parser.add_argument('--workdir', required=True)
+    query_parser.add_argument('--warm-runs', type=int, default=5)
+    for subparser in (ingest_parser, query_parser):
+        subparser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    # Caminhos relativos ao diretório de onde o comando foi chamado
+    for name in ('pdf_dir', 'workdir', 'output', 'before', 'after'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    if args.command == 'ingest':
+        args.files = [os.path.abspath(path) for path in args.files]
+    os.chdir(ROOT)
+    if args.command == 'compare':
+        return compare(args.before, args.after)
+    if args.command is None:
+        return run_suite(args)
+
+    import logging
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    os.makedirs(args.workdir, exist_ok=True)
+    if args.command == 'ingest':
+        result = run_ingest(args.workdir, args.files)
+    else:
+        result = run_query(args.workdir, args.warm_runs)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
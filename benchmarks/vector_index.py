@@ -0,0 +1,132 @@
+"""Compara os backends vetoriais (Chroma x numpy) em recall e latência
+
+Usa vetores sintéticos (sem carregar o modelo de embeddings) agrupados em
+tópicos, parecidos com os chunks de um mesmo documento. O recall é medido
+contra a busca exata.
+
+    python -m benchmarks.vector_index --sizes 1000 5000 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vector_backends import ChromaBackend, NumpyBackend  # noqa: E402
+
+
+def synthetic_corpus(size: int, dim: int, topics: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=size)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_queries(corpus, count: int, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    base = corpus[rng.integers(0, len(corpus), size=count)]
+    queries = base + 0.3 * rng.normal(size=base.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def percentile(values, p):
+    return round(float(np.percentile(values, p)) * 1000, 3)
+
+
+def run_backend(backend_name, path, corpus, queries, truth, k, dtype):
+    ids = [f"chunk-{i}" for i in range(len(corpus))]
+    texts = [str(i) for i in range(len(corpus))]
+    metadatas = [{'source': 'bench.pdf', 'row': i} for i in range(len(corpus))]
+
+    def open_backend():
+        if backend_name == 'chroma':
+            return ChromaBackend(path, embedding_function=None, collection_name='bench')
+        return NumpyBackend(path, dtype=dtype)
+
+    backend = open_backend()
+    batch = backend.max_batch_size or len(ids)
+    started = time.perf_counter()
+    for i in range(0, len(ids), batch):
+        backend.upsert(ids[i:i + batch], texts[i:i + batch],
+                       metadatas[i:i + batch], corpus[i:i + batch].tolist())
+    backend.persist()
+    build_seconds = time.perf_counter() - started
+    backend.close()
+
+    # Abrir de novo, como um processo recém-iniciado
+    started = time.perf_counter()
+    backend = open_backend()
+    backend.count()
+    open_seconds = time.perf_counter() - started
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = backend.query([query.tolist()], k)[0]
+        latencies.append(time.perf_counter() - started)
+        found = {int(text) for text, _ in result}
+        hits += len(found & set(expected.tolist()))
+
+    started = time.perf_counter()
+    backend.query(queries.tolist(), k)
+    batch_seconds = time.perf_counter() - started
+    backend.close()
+
+    return {
+        'backend': backend_name if backend_name == 'chroma' else f"numpy-{dtype}",
+        'build_seconds': round(build_seconds, 3),
+        'open_ms': round(open_seconds * 1000, 3),
+        'recall_at_k': round(hits / (len(queries) * k), 4),
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'batch_queries_per_second': round(len(queries) / batch_seconds, 1)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--backends', nargs='+', default=['chroma', 'numpy-float32', 'numpy-float16'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Grava os resultados em JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, args.dim, topics=max(10, size // 100), seed=args.seed)
+        queries = synthetic_queries(corpus, args.queries, seed=args.seed)
+        scores = queries @ corpus.T
+        truth = np.argsort(-scores, axis=1)[:, :args.k]
+
+        for name in args.backends:
+            backend_name, _, dtype = name.partition('-')
+            workdir = tempfile.mkdtemp(prefix='unibot-bench-')
+            try:
+                result = run_backend(backend_name, workdir, corpus, queries, truth,
+                                     args.k, dtype or 'float32')
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            result['size'] = size
+            results.append(result)
+            print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,12 +10,136 @@ class Config:
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///unibot.db'
     UPLOAD_FOLDER = 'data/pdfs'
     VECTORSTORE_PATH = 'data/vectorstore'
+    # 'chroma' (HNSW persistido) ou 'numpy' (busca exata em matriz memory-mapped)
+    VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND') or 'chroma'
+    NUMPY_INDEX_PATH = 'data/vectorstore/numpy'
+    NUMPY_INDEX_DTYPE = 'float32'  # 'float16' usa metade da memória, mas cada busca converte a matriz
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
     # IA Configuration
     EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+    # 'huggingface' (PyTorch) ou 'onnx' (ONNX Runtime, sem torch)
+    EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND') or 'huggingface'
+    # Gerado com: python -m models.embedding_backends export
+    ONNX_MODEL_DIR = 'data/models/all-MiniLM-L6-v2-onnx'
+    ONNX_QUANTIZED = True  # Usar a versão int8
+    EMBEDDING_THREADS = 0  # 0 = padrão do backend
+    # Cache persistente dos embeddings dos chunks
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_PATH = 'data/embedding_cache.db'
+    EMBEDDING_CACHE_MAX_ENTRIES = 200000  # ~300MB com vetores de 384 dimensões
+
+    # Caches em memória do /chat (invalidados a cada novo treinamento)
+    RESPONSE_CACHE_MAX_ENTRIES = 1000
+    RESPONSE_CACHE_TTL = 3600  # segundos
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 5000
+    QUERY_EMBEDDING_CACHE_TTL = 86400  # segundos
+
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
 
+    # Extração de texto dos PDFs
+    # 0 = usar todos os núcleos disponíveis
+    PDF_EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS') or 0)
+    PDF_PAGES_PER_TASK = 8  # Páginas por tarefa enviada ao pool de processos
+    PDF_PARALLEL_MIN_PAGES = 16  # Abaixo disso a extração é sequencial
+
+    # Pipeline de ingestão em streaming (páginas → chunks → embeddings → vectorstore)
+    INGEST_STREAMING = True
+    INGEST_QUEUE_SIZE = 4  # Itens em espera entre dois estágios
+    INGEST_EMBED_BATCH_SIZE = 32  # Chunks por chamada ao modelo de embeddings
+    # Limites por arquivo, nos dois modos (0 = sem limite): o que passar
+    # disso é ignorado. No streaming o texto conta só as páginas extraídas
+    # na ingestão (páginas inalteradas de uma versão anterior não são lidas)
+    INGEST_MAX_CHUNKS = 200
+    INGEST_MAX_TEXT_CHARS = 500000  # ~500 KB de texto
+
+    # Origens liberadas pelo CORS (separadas por vírgula). Padrão: nenhuma,
+    # só o próprio site. '*' (todas) não é aceito com credenciais, que
+    # expõem o cookie de sessão a qualquer site
+    CORS_ORIGINS = [origin.strip() for origin in os.environ.get('CORS_ORIGINS', '').split(',')
+                    if origin.strip()]
+    CORS_ALLOW_CREDENTIALS = (os.environ.get('CORS_ALLOW_CREDENTIALS') or 'true').lower() == 'true'
+
+    # Servidor pre-fork de produção (gunicorn -c gunicorn.conf.py wsgi:app)
+    SERVER_BIND = os.environ.get('SERVER_BIND') or '127.0.0.1:5000'
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or 0)  # 0 = um por núcleo
+    SERVER_THREADS = 4  # Threads por worker
+
+    # Inicialização: modelo e vectorstore carregam em segundo plano
+    MODEL_WARMUP_BACKGROUND = True  # False = create_app espera a carga
+    CHAT_WHILE_LOADING = 'fallback'  # 'fallback' ou '503' até o /readyz ficar pronto
+
+    # Histórico de conversa por sessão (cookie de sessão do Flask), em memória
+    SESSION_HISTORY_MAX_TURNS = 10  # Interações guardadas por sessão
+    SESSION_HISTORY_MAX_SESSIONS = 10000  # Além disso as menos recentes saem
+    SESSION_HISTORY_IDLE_SECONDS = 1800  # Sessões paradas há mais tempo saem
+
+    # Registro das conversas em segundo plano (utils/conversation_log.py)
+    CONVERSATION_LOG_BATCH_SIZE = 100  # Conversas por transação
+    CONVERSATION_LOG_FLUSH_INTERVAL = 1.0  # Espera máxima antes de gravar (segundos)
+    CONVERSATION_LOG_MAX_PENDING = 10000  # Além disso as conversas são descartadas
+    # Retenção: conversas mais antigas vão para arquivos .jsonl.gz por dia
+    # (utils/conversation_archive.py), movidas pelo worker de ingestão
+    CONVERSATION_RETENTION_DAYS = 90  # 0 = manter tudo no banco
+    CONVERSATION_ARCHIVE_PATH = 'data/archive/conversations'
+    CONVERSATION_RETENTION_INTERVAL = 3600  # Segundos entre execuções
+    CONVERSATION_ARCHIVE_BATCH_SIZE = 5000  # Conversas por lote
+
+    # Pools de execução compartilhados (utils/executors.py)
+    CHAT_TIMEOUT = 30  # Prazo total de uma requisição /chat (segundos)
+    SEARCH_TIMEOUT = 30  # Prazo de uma busca feita fora de uma requisição
+    CHAT_BATCH_TIMEOUT = 120  # Prazo de uma requisição /chat/batch
+    CHAT_BATCH_MAX_QUESTIONS = 500  # Perguntas por requisição /chat/batch
+    INGEST_BATCH_TIMEOUT = 60  # Prazo de cada lote no modo não-streaming
+    QUERY_EXECUTOR_WORKERS = 4
+    QUERY_EXECUTOR_MAX_PENDING = 16  # Além disso o /chat recusa na hora
+    INGEST_EXECUTOR_WORKERS = 2
+    INGEST_EXECUTOR_MAX_PENDING = 4
+    # Serviço ASGI (backend/main.py): cada pergunta ocupa uma thread deste
+    # pool só enquanto é respondida; conexões ociosas não ocupam threads
+    CHAT_EXECUTOR_WORKERS = 16
+    CHAT_EXECUTOR_MAX_PENDING = 256
+
+    # Roteamento de perguntas: intenção -> palavras-chave (sem diferenciar
+    # acentos e maiúsculas; casam em qualquer posição: "valor" casa com
+    # "valores"). Em caso de empate vale a ordem desta tabela.
+    INTENT_KEYWORDS = {
+        'modalidades': ['modalidade', 'tipos', 'formas'],
+        'cursos': ['curso', 'graduação'],
+        'precos': ['preço', 'valor', 'mensalidade', 'custo', 'pagamento'],
+        'horarios': ['horário', 'funcionamento', 'atendimento'],
+        'matricula': ['matrícula', 'inscrição'],
+    }
+
+    # Busca híbrida: índice BM25 (léxico) + vetorial
+    LEXICAL_INDEX_ENABLED = True
+    BM25_INDEX_PATH = 'data/vectorstore/bm25.json'
+    HYBRID_CANDIDATES = 10  # Candidatos de cada lista antes da fusão
+    HYBRID_RRF_K = 60  # Constante do Reciprocal Rank Fusion
+    HYBRID_LEXICAL_WEIGHT = 1.0  # Peso do BM25 na fusão (vetorial = 1.0)
+    # Consultas que o BM25 responde com confiança não passam pelo modelo
+    LEXICAL_FAST_PATH = True
+    LEXICAL_FAST_PATH_MIN_TERMS = 2
+    LEXICAL_FAST_PATH_MIN_SCORE = 5.0
+    LEXICAL_FAST_PATH_MIN_COVERAGE = 1.0  # Fração dos termos no melhor chunk
+
+    # Micro-batching das buscas concorrentes do /chat
+    QUERY_BATCHING = True
+    QUERY_BATCH_WINDOW_MS = 2  # Espera por outras perguntas antes de vetorizar
+    QUERY_BATCH_MAX_SIZE = 32
+    QUERY_BATCH_MAX_PENDING = 256  # Além disso o /chat recusa na hora
+
+    # Carga em massa em add_documents_to_vectorstore
+    BULK_LOAD = True
+    BULK_EMBED_BATCH_SIZE = 256  # Chunks por chamada ao modelo de embeddings
+    BULK_UPSERT_BATCH_SIZE = 2048  # Chunks por upsert no Chroma
+
+    # Worker de ingestão (worker.py) que processa os jobs do /upload
+    INGEST_WORKER_AUTOSTART = True  # Iniciar junto com o app.py
+    INGEST_POLL_INTERVAL = 1.0  # Segundos entre consultas à fila
+    # Trava do único processo escritor: workers extras saem ao iniciar
+    INGEST_WORKER_LOCK_PATH = 'data/ingest_worker.lock'
+
     # OpenAI API (opcional - para modelos mais avançados)
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
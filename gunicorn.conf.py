@@ -0,0 +1,42 @@
+"""Configuração do gunicorn para servir o Unibot com vários processos
+
+- preload_app: o modelo é carregado uma vez no mestre, antes do fork;
+- cada worker reabre o índice somente para leitura (post_fork);
+- o treinamento roda em um único processo escritor (worker.py), iniciado
+  pelo mestre.
+"""
+import multiprocessing
+
+from config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS or multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+preload_app = True
+timeout = Config.CHAT_TIMEOUT + 30
+
+_ingest_process = None
+
+
+def when_ready(server):
+    """Inicia o worker de ingestão (único processo que grava no índice)
+
+    Como um processo comum (worker.start_worker_process): os workers do
+    gunicorn são forks do mestre e não herdam nenhum registro dele.
+    """
+    global _ingest_process
+    if Config.INGEST_WORKER_AUTOSTART:
+        from worker import start_worker_process
+        _ingest_process = start_worker_process()
+
+
+def post_fork(server, worker):
+    # Dividir os núcleos entre os workers em vez de cada um usar todos
+    from wsgi import after_fork
+    after_fork(max(1, multiprocessing.cpu_count() // workers))
+
+
+def on_exit(server):
+    from worker import stop_worker_process
+    stop_worker_process(_ingest_process)
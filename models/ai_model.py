@@ -1,47 +1,253 @@
-from typing import List, Dict, Optional
-from .pdf_processor import PDFProcessor
-import logging
 import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from .fact_extractor import extract_courses, extract_modalities, extract_prices
+from .intent_router import IntentRouter
+from .lexical_index import tokenize
+from .query_cache import TTLCache, normalize_question
+from .session_history import SessionHistoryStore
+from utils.executors import Deadline, DeadlineExceeded, ExecutorOverloaded
+import logging
 
 logger = logging.getLogger(__name__)
 
+MODALIDADE_LABELS = {
+    'presencial': '• **Presencial**',
+    'ead': '• **EAD (Ensino a Distância)**',
+    'semipresencial': '• **Semipresencial/Híbrido**',
+}
+# Respostas sem contexto para as intenções que têm uma orientação padrão
+FALLBACK_RESPONSES = {
+    'horarios': "Para informações sobre horários de funcionamento, consulte nossa secretaria acadêmica ou acesse nosso portal.",
+    'cursos': "Oferecemos diversos cursos de graduação e pós-graduação. Para informações detalhadas, consulte nosso catálogo acadêmico.",
+    'matricula': "Para informações sobre matrículas e inscrições, acesse nosso portal do aluno ou consulte a secretaria acadêmica.",
+    'precos': "Para informações sobre valores e formas de pagamento, entre em contato com nossa equipe comercial.",
+}
+TIMEOUT_RESPONSE = "Desculpe, a consulta está demorando mais que o esperado. Tente novamente com uma pergunta mais específica."
+OVERLOADED_RESPONSE = "Estamos recebendo muitas perguntas neste momento. Tente novamente em alguns segundos."
+# Termos da pergunta que só indicam o assunto "preço" (não filtram valores)
+PRICE_QUESTION_TERMS = frozenset(
+    tokenize('preço preços valor valores mensalidade mensalidades custo custa quanto pagamento '
+             'curso cursos'))
+
+# Pedaços da resposta enviados pelo /chat/stream: uma linha por vez
+_RESPONSE_PIECE_RE = re.compile(r'[^\n]*\n|[^\n]+')
+
+
+def split_response(response: str) -> List[str]:
+    """Divide a resposta em pedaços para o envio em streaming"""
+    return _RESPONSE_PIECE_RE.findall(response)
+
+
+def fallback_response(router: IntentRouter, question: str) -> str:
+    """Resposta sem contexto, pela intenção da pergunta
+
+    Não depende do modelo: também é usada enquanto o UnibotAI carrega.
+    """
+    for intent, _ in router.route(question):
+        if intent in FALLBACK_RESPONSES:
+            return FALLBACK_RESPONSES[intent]
+
+    return "Obrigado pela sua pergunta. Para informações específicas, recomendo entrar em contato com nossa equipe ou consultar nossa documentação."
+
+
+def batch_responses(unibot_ai, router: IntentRouter, questions: List, timeout: float) -> List[Dict]:
+    """Respostas do /chat/batch: generate_responses ou, com o modelo ainda
+    carregando (unibot_ai None), a resposta de fallback de cada pergunta"""
+    if unibot_ai is not None:
+        return unibot_ai.generate_responses(questions, deadline=Deadline(timeout))
+
+    logger.info("Modelo ainda carregando - respostas de fallback")
+    return [
+        {'success': True, 'response': fallback_response(router, question),
+         'origin': 'loading', 'sources': []}
+        if isinstance(question, str) and question.strip()
+        else {'success': False, 'error': 'Pergunta vazia'}
+        for question in questions
+    ]
+
 
 class UnibotAI:
-    def __init__(self, config):
+    def __init__(self, config, db=None, read_only: bool = False):
         self.config = config
-        self.pdf_processor = PDFProcessor(config)
-        self.conversation_history = []
+        self.db = db
+        # Import tardio: carrega langchain/torch só quando o UnibotAI é criado
+        from .pdf_processor import PDFProcessor
+        self.pdf_processor = PDFProcessor(config, db, read_only=read_only)
+        self.intent_router = IntentRouter(config.INTENT_KEYWORDS)
+        self.response_cache = TTLCache(
+            max_entries=getattr(config, 'RESPONSE_CACHE_MAX_ENTRIES', 1000),
+            ttl_seconds=getattr(config, 'RESPONSE_CACHE_TTL', 3600)
+        )
+        self.history = SessionHistoryStore(
+            max_turns=getattr(config, 'SESSION_HISTORY_MAX_TURNS', 10),
+            max_sessions=getattr(config, 'SESSION_HISTORY_MAX_SESSIONS', 10000),
+            idle_seconds=getattr(config, 'SESSION_HISTORY_IDLE_SECONDS', 1800)
+        )
         logger.info("UnibotAI inicializado com sucesso")
 
-    def generate_response(self, user_question: str) -> str:
-        """Gera resposta para a pergunta do usuário"""
+    def generate_response(self, user_question: str, deadline: Optional[Deadline] = None,
+                          details: Optional[Dict] = None, session_id: Optional[str] = None) -> str:
+        """Gera resposta para a pergunta do usuário
+
+        Com deadline, DeadlineExceeded e ExecutorOverloaded chegam ao chamador
+        para que ele possa responder sem esperar mais. Se details for um
+        dict, recebe a origem da resposta ('cache', 'facts', 'documents' ou
+        'fallback') e os arquivos usados como fonte. A interação entra no
+        histórico de session_id, se houver.
+        """
+        return ''.join(data['text'] for event, data in self.stream_response(
+            user_question, deadline, details, session_id) if event == 'delta')
+
+    def stream_response(self, user_question: str, deadline: Optional[Deadline] = None,
+                        details: Optional[Dict] = None,
+                        session_id: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Gera a resposta como uma sequência de eventos (usada pelo /chat/stream)
+
+        ('status', {'stage': 'searching'}) antes da busca nos documentos,
+        ('sources', {'sources': [...]}) com os arquivos usados, ('delta',
+        {'text': ...}) com os pedaços do texto e, por fim, ('done',
+        {'origin': ...}). Parâmetros e exceções como em generate_response.
+        """
+        if details is None:
+            details = {}
         try:
             logger.info(f"Processando pergunta: {user_question[:50]}...")
-
+            response = yield from self._answer(user_question, deadline, details)
+            # Adicionar à história da conversa
+            self.add_to_history(user_question, response, session_id)
+        except (DeadlineExceeded, ExecutorOverloaded):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao gerar resposta: {str(e)}")
+            details['origin'] = 'error'
+            details['sources'] = []
+            response = "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
+
+        for piece in split_response(response):
+            yield 'delta', {'text': piece}
+        yield 'done', {'origin': details.get('origin')}
+
+    def _answer(self, user_question: str, deadline: Optional[Deadline], details: Dict):
+        """Cache, fatos ou busca nos documentos; emite eventos de status e retorna a resposta"""
+        response = self._quick_answer(user_question, details)
+        if response is None:
             # Buscar documentos relevantes
+            yield 'status', {'stage': 'searching'}
             relevant_docs = self.pdf_processor.search_similar_documents(
-                user_question, k=3
+                user_question, k=3, deadline=deadline
             )
-
-            logger.info(
-                f"Encontrados {len(relevant_docs)} documentos relevantes")
-
-            # Gerar resposta baseada no contexto
-            if relevant_docs:
-                response = self.generate_context_response(
-                    user_question, relevant_docs)
-            else:
-                response = self.generate_fallback_response(user_question)
-
-            # Adicionar à história da conversa
-            self.add_to_history(user_question, response)
-
-            logger.info(f"Resposta gerada com sucesso")
+            response = self._compose_answer(user_question, relevant_docs, details)
+
+        if details['sources']:
+            yield 'sources', {'sources': details['sources']}
+        return response
+
+    def _quick_answer(self, user_question: str, details: Dict) -> Optional[str]:
+        """Resposta do cache ou das tabelas de fatos; None se for preciso buscar nos documentos"""
+        # Respostas em cache valem apenas para a versão atual do índice
+        cache_key = normalize_question(user_question)
+        index_version = self.pdf_processor.current_index_version()
+        cached = self.response_cache.get(cache_key, index_version)
+        if cached is not None:
+            logger.info("Resposta obtida do cache")
+            response, details['sources'] = cached
+            details['origin'] = 'cache'
             return response
 
-        except Exception as e:
-            logger.error(f"Erro ao gerar resposta: {str(e)}")
-            return "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
+        # Perguntas sobre preços, cursos e modalidades: consulta aos fatos
+        response = self.generate_fact_response(user_question, details)
+        if response is not None:
+            logger.info("Resposta obtida das tabelas de fatos")
+            details['origin'] = 'facts'
+            self.response_cache.set(cache_key, (response, details['sources']), index_version)
+        return response
+
+    def _compose_answer(self, user_question: str, relevant_docs: List, details: Dict) -> str:
+        """Monta a resposta a partir dos documentos encontrados (ou a de fallback)"""
+        logger.info(
+            f"Encontrados {len(relevant_docs)} documentos relevantes")
+
+        # Gerar resposta baseada no contexto
+        if relevant_docs:
+            details['sources'] = list(dict.fromkeys(
+                doc.metadata.get('source', 'Documento') for doc in relevant_docs))
+            response = self.generate_context_response(
+                user_question, relevant_docs)
+            details['origin'] = 'documents'
+            self.response_cache.set(
+                normalize_question(user_question), (response, details['sources']),
+                self.pdf_processor.current_index_version())
+        else:
+            response = self.generate_fallback_response(user_question)
+            details['origin'] = 'fallback'
+            details['sources'] = []
+
+        logger.info("Resposta gerada com sucesso")
+        return response
+
+    def generate_responses(self, questions: List[str],
+                           deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Responde várias perguntas de uma vez (usada pelo /chat/batch)
+
+        As que não vêm do cache nem dos fatos são buscadas juntas: uma única
+        vetorização em lote e uma única consulta ao vectorstore. Retorna um
+        item por pergunta, na mesma ordem: {'success': True, 'response',
+        'origin', 'sources'} ou {'success': False, 'error'}. As perguntas
+        não entram no histórico de nenhuma sessão.
+        """
+        results: List[Optional[Dict]] = [None] * len(questions)
+        # Pergunta normalizada -> (pergunta, details, posições); repetidas são buscadas uma vez
+        pending: Dict[str, Tuple[str, Dict, List[int]]] = {}
+        for i, question in enumerate(questions):
+            if not isinstance(question, str) or not question.strip():
+                results[i] = {'success': False, 'error': 'Pergunta vazia'}
+                continue
+            question = question.strip()
+            key = normalize_question(question)
+            if key in pending:
+                pending[key][2].append(i)
+                continue
+            details = {}
+            try:
+                response = self._quick_answer(question, details)
+            except Exception as e:
+                logger.error(f"Erro ao gerar resposta: {str(e)}")
+                results[i] = {'success': False, 'error': 'Erro ao processar a pergunta'}
+                continue
+            if response is None:
+                pending[key] = (question, details, [i])
+            else:
+                results[i] = {'success': True, 'response': response, **details}
+
+        if pending:
+            logger.info(f"Processando lote de {len(pending)} perguntas")
+            try:
+                doc_lists = self.pdf_processor.search_similar_documents_batch(
+                    [question for question, _, _ in pending.values()], k=3, deadline=deadline)
+            except (DeadlineExceeded, ExecutorOverloaded) as e:
+                logger.error(f"Busca em lote interrompida: {str(e)}")
+                error = ('Tempo limite excedido' if isinstance(e, DeadlineExceeded)
+                         else 'Servidor sobrecarregado')
+                doc_lists = None
+            except Exception as e:
+                logger.error(f"Erro na busca em lote: {str(e)}")
+                error = 'Erro ao buscar nos documentos'
+                doc_lists = None
+
+            for n, (question, details, positions) in enumerate(pending.values()):
+                if doc_lists is None:
+                    result = {'success': False, 'error': error}
+                else:
+                    try:
+                        response = self._compose_answer(question, doc_lists[n], details)
+                        result = {'success': True, 'response': response, **details}
+                    except Exception as e:
+                        logger.error(f"Erro ao gerar resposta: {str(e)}")
+                        result = {'success': False, 'error': 'Erro ao processar a pergunta'}
+                for i in positions:
+                    results[i] = dict(result)
+
+        return results
 
     def generate_context_response(self, question: str, documents: List) -> str:
         """Gera resposta baseada no contexto dos documentos"""
@@ -57,22 +263,22 @@ class UnibotAI:
                     sources.append(source)
 
             combined_content = combined_content.strip()
-            question_lower = question.lower()
 
             # Análise inteligente baseada na pergunta
-            if any(word in question_lower for word in ['modalidade', 'modalidades', 'tipos', 'formas']):
+            intent = self.detect_intent(question)
+            if intent == 'modalidades':
                 return self.extract_modalidades_info(combined_content, sources)
 
-            elif any(word in question_lower for word in ['curso', 'cursos', 'graduação', 'graduacao']):
+            elif intent == 'cursos':
                 return self.extract_cursos_info(combined_content, sources)
 
-            elif any(word in question_lower for word in ['preço', 'preco', 'valor', 'mensalidade', 'custo', 'pagamento']):
+            elif intent == 'precos':
                 return self.extract_precos_info(combined_content, sources)
 
-            elif any(word in question_lower for word in ['horário', 'horario', 'funcionamento', 'atendimento']):
+            elif intent == 'horarios':
                 return self.extract_horarios_info(combined_content, sources)
 
-            elif any(word in question_lower for word in ['matrícula', 'matricula', 'inscrição', 'inscricao']):
+            elif intent == 'matricula':
                 return self.extract_matricula_info(combined_content, sources)
 
             else:
@@ -89,56 +295,105 @@ Para informações mais detalhadas, recomendo consultar a documentação complet
             logger.error(f"Erro ao gerar resposta com contexto: {str(e)}")
             return self.generate_fallback_response(question)
 
-    def extract_modalidades_info(self, content: str, sources: List[str]) -> str:
-        """Extrai informações sobre modalidades"""
-        modalidades = []
-        content_lower = content.lower()
+    def detect_intent(self, question: str) -> Optional[str]:
+        """Assunto principal da pergunta (ver Config.INTENT_KEYWORDS)"""
+        return self.intent_router.best(question)
+
+    def route_intents(self, question: str) -> List:
+        """Todas as intenções da pergunta com suas pontuações"""
+        return self.intent_router.route(question)
+
+    def generate_fact_response(self, question: str, details: Optional[Dict] = None) -> Optional[str]:
+        """Responde com os fatos extraídos na ingestão, sem busca nos documentos
+
+        Cobre todo o corpus (e não só os chunks retornados pela busca).
+        Retorna None quando a pergunta não é sobre preços, cursos ou
+        modalidades, quando uma pergunta sobre preços não diz qual valor
+        procura, ou quando não há fatos registrados para ela. As fontes
+        usadas vão para details['sources'].
+        """
+        if details is None:
+            details = {}
+        if self.db is None:
+            return None
+
+        intent = self.detect_intent(question)
+        if intent == 'modalidades':
+            modalities = self.db.get_modalities()
+            if modalities:
+                sources = sorted({filename for filenames in modalities.values() for filename in filenames})
+                details['sources'] = sources
+                return self._format_modalidades(list(modalities), sources)
+
+        elif intent == 'cursos':
+            courses = self.db.get_courses(limit=10)
+            if courses:
+                sources = sorted({filename for course in courses for filename in course['filenames']})
+                details['sources'] = sources
+                return self._format_cursos([course['name'] for course in courses], sources)
+
+        elif intent == 'precos':
+            # Só responde quando a pergunta diz de que valor se trata (curso,
+            # taxa, serviço) e todos esses termos aparecem junto do preço;
+            # senão a busca nos documentos decide
+            terms = [term for term in dict.fromkeys(tokenize(question))
+                     if term not in PRICE_QUESTION_TERMS]
+            prices = self.db.find_prices(terms, limit=5) if terms else []
+            if prices:
+                sources = sorted({price['filename'] for price in prices})
+                details['sources'] = sources
+                return self._format_precos(prices, sources)
+
+        return None
+
+    def _format_modalidades(self, modalities: List[str], sources: List[str]) -> str:
+        modalidades = [MODALIDADE_LABELS[key] for key in MODALIDADE_LABELS if key in modalities]
+        sources_text = ", ".join(sources)
+        return f"""**Modalidades oferecidas** (conforme {sources_text}):
 
-        if 'presencial' in content_lower:
-            modalidades.append('• **Presencial**')
-        if 'ead' in content_lower or 'distância' in content_lower or 'distancia' in content_lower:
-            modalidades.append('• **EAD (Ensino a Distância)**')
-        if 'semipresencial' in content_lower or 'híbrido' in content_lower or 'hibrido' in content_lower:
-            modalidades.append('• **Semipresencial/Híbrido**')
+{chr(10).join(modalidades)}
+
+Para mais informações sobre cada modalidade, consulte nossa documentação completa ou entre em contato conosco."""
 
+    def _format_cursos(self, cursos: List[str], sources: List[str]) -> str:
+        cursos_text = '\n• '.join(cursos)
         sources_text = ", ".join(sources)
+        return f"""**Cursos disponíveis** (fonte: {sources_text}):
 
-        if modalidades:
-            return f"""**Modalidades oferecidas** (conforme {sources_text}):
+• {cursos_text}
 
-{chr(10).join(modalidades)}
+Para informações completas sobre grade curricular, duração e requisitos, consulte nosso catálogo acadêmico."""
 
-Para mais informações sobre cada modalidade, consulte nossa documentação completa ou entre em contato conosco."""
+    def _format_precos(self, prices: List[Dict], sources: List[str]) -> str:
+        lines = [f"• {price['label']}: {price['amount']}" if price['label'] else f"• {price['amount']}"
+                 for price in prices]
+        sources_text = ", ".join(sources)
+        return f"""**Informações sobre valores** (fonte: {sources_text}):
+
+Valores encontrados na documentação:
+{chr(10).join(lines)}
+
+Para informações atualizadas sobre valores, formas de pagamento e possíveis descontos, entre em contato com nossa equipe comercial."""
+
+    def extract_modalidades_info(self, content: str, sources: List[str]) -> str:
+        """Extrai informações sobre modalidades"""
+        modalidades = extract_modalities(content)
+        sources_text = ", ".join(sources)
+
+        if modalidades:
+            return self._format_modalidades(modalidades, sources)
 
         return f"Com base nos documentos disponíveis ({sources_text}), temos informações sobre modalidades de ensino. Para detalhes específicos, recomendo consultar nossa equipe acadêmica."
 
     def extract_cursos_info(self, content: str, sources: List[str]) -> str:
         """Extrai informações sobre cursos"""
         # Buscar menções de cursos
-        cursos_patterns = [
-            r'curso[s]?\s+de\s+([A-Za-z\s]+)',
-            r'graduação\s+em\s+([A-Za-z\s]+)',
-            r'bacharelado\s+em\s+([A-Za-z\s]+)',
-            r'licenciatura\s+em\s+([A-Za-z\s]+)'
-        ]
-
-        cursos_encontrados = set()
-        for pattern in cursos_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for match in matches:
-                if len(match.strip()) > 3:  # Evitar matches muito curtos
-                    cursos_encontrados.add(match.strip().title())
+        cursos_encontrados = extract_courses(content)
 
         sources_text = ", ".join(sources)
 
         if cursos_encontrados:
-            cursos_list = list(cursos_encontrados)[:5]  # Limitar a 5
-            cursos_text = '\n• '.join(cursos_list)
-            return f"""**Cursos disponíveis** (fonte: {sources_text}):
-
-• {cursos_text}
-
-Para informações completas sobre grade curricular, duração e requisitos, consulte nosso catálogo acadêmico."""
+            return self._format_cursos(cursos_encontrados[:5], sources)  # Limitar a 5
 
         return f"""Oferecemos diversos cursos de graduação e pós-graduação conforme documentado em {sources_text}.
 
@@ -149,24 +404,10 @@ Para informações detalhadas sobre cursos específicos, entre em contato com no
         sources_text = ", ".join(sources)
 
         # Buscar valores monetários
-        price_patterns = [
-            r'R\$\s*[\d.,]+',
-            r'valor[es]?\s*[:.]?\s*R\$\s*[\d.,]+',
-            r'mensalidade[s]?\s*[:.]?\s*R\$\s*[\d.,]+'
-        ]
-
-        precos_encontrados = set()
-        for pattern in price_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            precos_encontrados.update(matches)
+        precos_encontrados = extract_prices(content)
 
         if precos_encontrados:
-            return f"""**Informações sobre valores** (fonte: {sources_text}):
-
-Valores encontrados na documentação:
-• {chr(10).join([f"• {preco}" for preco in list(precos_encontrados)[:3]])}
-
-Para informações atualizadas sobre valores, formas de pagamento e possíveis descontos, entre em contato com nossa equipe comercial."""
+            return self._format_precos(precos_encontrados[:3], sources)
 
         return f"""Para informações sobre valores e formas de pagamento (conforme {sources_text}):
 
@@ -200,40 +441,55 @@ Nossa equipe acadêmica poderá orientá-lo sobre todo o processo."""
 
     def generate_fallback_response(self, question: str) -> str:
         """Gera resposta de fallback quando não há contexto"""
-        question_lower = question.lower()
+        return fallback_response(self.intent_router, question)
+
+    def after_fork(self, num_threads: int = 0):
+        """Chamado em cada worker do servidor pre-fork (ver gunicorn.conf.py)"""
+        self.pdf_processor.after_fork(num_threads)
+        self.warm_up()
+
+    def warm_up(self):
+        """Executa uma consulta para que a primeira pergunta real não pague a inicialização"""
+        self.pdf_processor.warm_up()
+
+    def get_cache_stats(self) -> Dict:
+        """Estatísticas de acerto dos caches de resposta e de embeddings"""
+        stats = {'responses': self.response_cache.get_stats(),
+                 'sessions': self.history.get_stats()}
+        stats.update(self.pdf_processor.get_cache_stats())
+        return stats
+
+    def add_to_history(self, question: str, response: str, session_id: Optional[str] = None):
+        """Adiciona interação ao histórico da sessão (sem sessão, não registra)"""
+        if session_id is not None:
+            self.history.add(session_id, question, response)
+
+    def get_conversation_history(self, session_id: str) -> List[Dict]:
+        """Retorna histórico da conversa de uma sessão"""
+        return self.history.get(session_id)
+
+    def clear_history(self, session_id: Optional[str] = None):
+        """Limpa o histórico de uma sessão (sem sessão, de todas)"""
+        if session_id is None:
+            self.history.clear_all()
+        else:
+            self.history.clear(session_id)
+        logger.info("Histórico de conversas limpo")
 
-        if any(word in question_lower for word in ['horário', 'horarios', 'funcionamento']):
-            return "Para informações sobre horários de funcionamento, consulte nossa secretaria acadêmica ou acesse nosso portal."
 
-        elif any(word in question_lower for word in ['curso', 'cursos', 'graduação']):
-            return "Oferecemos diversos cursos de graduação e pós-graduação. Para informações detalhadas, consulte nosso catálogo acadêmico."
+def load_unibot_ai(loader, config, db, warm_up: bool = True) -> UnibotAI:
+    """Carga do UnibotAI executada pelo BackgroundLoader, em etapas medidas
 
-        elif any(word in question_lower for word in ['matrícula', 'inscrição']):
-            return "Para informações sobre matrículas e inscrições, acesse nosso portal do aluno ou consulte a secretaria acadêmica."
+    Usada pelos dois servidores (app.py e backend/main.py), que só
+    consultam o índice; o treinamento é feito pelo worker.
+    """
+    loader.stage('imports')
+    from . import pdf_processor  # noqa: F401 - langchain, PyPDF2 e backends
 
-        elif any(word in question_lower for word in ['preço', 'valor', 'mensalidade']):
-            return "Para informações sobre valores e formas de pagamento, entre em contato com nossa equipe comercial."
+    loader.stage('modelo e vectorstore')
+    unibot_ai = UnibotAI(config, db, read_only=True)
 
-        else:
-            return "Obrigado pela sua pergunta. Para informações específicas, recomendo entrar em contato com nossa equipe ou consultar nossa documentação."
-
-    def add_to_history(self, question: str, response: str):
-        """Adiciona interação ao histórico"""
-        self.conversation_history.append({
-            'question': question,
-            'response': response,
-            'timestamp': __import__('datetime').datetime.now().isoformat()
-        })
-
-        # Manter apenas as últimas 10 interações
-        if len(self.conversation_history) > 10:
-            self.conversation_history = self.conversation_history[-10:]
-
-    def get_conversation_history(self) -> List[Dict]:
-        """Retorna histórico da conversa"""
-        return self.conversation_history
-
-    def clear_history(self):
-        """Limpa histórico da conversa"""
-        self.conversation_history = []
-        logger.info("Histórico de conversas limpo")
+    if warm_up:
+        loader.stage('aquecimento')
+        unibot_ai.warm_up()
+    return unibot_ai
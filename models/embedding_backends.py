@@ -0,0 +1,305 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_QUANTIZED_MODEL_FILE = 'model_quantized.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+
+PARITY_TEXTS = [
+    "Qual o valor da mensalidade do curso de Administração?",
+    "Quais são as modalidades de ensino oferecidas?",
+    "Como faço a matrícula em uma disciplina isolada?",
+    "O pagamento pode ser feito por boleto ou cartão de crédito.",
+    "Licenciatura em Pedagogia na modalidade EAD com encontros presenciais.",
+    "Regulamento de preços: descontos para pagamento antecipado e convênios.",
+]
+
+
+def embedding_model_id(config) -> str:
+    """Identifica o modelo e o backend que geraram um vetor (chave dos caches)"""
+    backend = getattr(config, 'EMBEDDING_BACKEND', 'huggingface')
+    if backend == 'onnx':
+        suffix = 'int8' if getattr(config, 'ONNX_QUANTIZED', True) else 'fp32'
+        return f"{config.EMBEDDING_MODEL}#onnx-{suffix}"
+    return config.EMBEDDING_MODEL
+
+
+def create_embeddings(config) -> Embeddings:
+    """Cria o modelo de embeddings escolhido em Config.EMBEDDING_BACKEND
+
+    Os imports ficam aqui dentro para que o backend ONNX não carregue torch.
+    """
+    backend = getattr(config, 'EMBEDDING_BACKEND', 'huggingface')
+    threads = getattr(config, 'EMBEDDING_THREADS', 0)
+
+    if backend == 'huggingface':
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+
+        return HuggingFaceEmbeddings(
+            model_name=config.EMBEDDING_MODEL,
+            model_kwargs={
+                'device': 'cpu',
+                'trust_remote_code': False
+            },
+            encode_kwargs={
+                'normalize_embeddings': True,
+                'batch_size': 16  # Processar em lotes menores
+            }
+        )
+
+    if backend == 'onnx':
+        return OnnxEmbeddings(
+            config.ONNX_MODEL_DIR,
+            quantized=getattr(config, 'ONNX_QUANTIZED', True),
+            num_threads=threads
+        )
+
+    raise ValueError(f"Backend de embeddings desconhecido: {backend}")
+
+
+def prepare_after_fork(embeddings, num_threads: int = 0):
+    """Ajusta o modelo de embeddings em um processo recém-criado por fork
+
+    num_threads limita as threads de cada processo, para que vários workers
+    não disputem os mesmos núcleos.
+    """
+    if isinstance(embeddings, OnnxEmbeddings):
+        embeddings.after_fork(num_threads)
+    elif num_threads > 0 and 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(num_threads)
+
+
+class OnnxEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 exportado para ONNX Runtime (opcionalmente int8)
+
+    Reproduz o pipeline do sentence-transformers - tokenização com
+    truncamento em 256 tokens, mean pooling e normalização L2 - sem
+    importar torch.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, num_threads: int = 0,
+                 batch_size: int = 32, max_length: int = 256):
+        from tokenizers import Tokenizer
+
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Modelo ONNX não encontrado em {model_path}. "
+                f"Gere-o com: python -m models.embedding_backends export")
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        self.model_path = model_path
+        self._create_session(num_threads)
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        logger.info(f"Modelo ONNX carregado: {model_path}")
+
+    def _create_session(self, num_threads: int):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "onnxruntime não está instalado: necessário para EMBEDDING_BACKEND='onnx' "
+                "(pip install onnxruntime)") from e
+
+        options = onnxruntime.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, options, providers=['CPUExecutionProvider'])
+
+    def after_fork(self, num_threads: int = 0):
+        """Recria a sessão: o pool de threads do ONNX Runtime não sobrevive ao fork"""
+        self._create_session(num_threads)
+
+    def _encode(self, texts: List[str]):
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            inputs['token_type_ids'] = np.array(
+                [e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling considerando apenas os tokens reais
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings = summed / counts
+        norms = np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, str]:
+    """Exporta o modelo do Hugging Face para ONNX e gera a versão int8
+
+    Precisa de torch, transformers e onnx (apenas na exportação).
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"Exportando {model_name} para {output_dir}...")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)  # Gera o tokenizer.json
+
+    sample = tokenizer(["exemplo de frase"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    paths = {'model': model_path}
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        paths['quantized'] = quantized_path
+
+    for name, path in paths.items():
+        logger.info(f"{name}: {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    return paths
+
+
+def check_parity(model_name: str, model_dir: str, quantized: bool = True,
+                 texts: Optional[List[str]] = None) -> Dict:
+    """Compara os vetores do ONNX com os do PyTorch (sentence-transformers)"""
+    import numpy as np
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    texts = texts or PARITY_TEXTS
+    reference = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    onnx_embeddings = OnnxEmbeddings(model_dir, quantized=quantized)
+
+    expected = np.array(reference.embed_documents(texts))
+    actual = np.array(onnx_embeddings.embed_documents(texts))
+    cosines = (expected * actual).sum(axis=1)
+
+    # Ranking: para cada texto, o vizinho mais próximo deve ser o mesmo
+    same_neighbours = (
+        np.argsort(-(expected @ expected.T), axis=1)[:, 1] ==
+        np.argsort(-(actual @ actual.T), axis=1)[:, 1]
+    ).mean()
+
+    return {
+        'min_cosine': round(float(cosines.min()), 5),
+        'mean_cosine': round(float(cosines.mean()), 5),
+        'same_nearest_neighbour': round(float(same_neighbours), 3)
+    }
+
+
+def _measure_load(config) -> Dict:
+    """Tempo de carga e RSS do backend configurado (em processo limpo)"""
+    import resource
+
+    start = time.perf_counter()
+    embeddings = create_embeddings(config)
+    embeddings.embed_query("aquecimento")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embeddings.embed_documents(PARITY_TEXTS * 10)
+    encode_seconds = time.perf_counter() - start
+
+    return {
+        'backend': getattr(config, 'EMBEDDING_BACKEND', 'huggingface'),
+        'load_seconds': round(load_seconds, 3),
+        'texts_per_second': round(len(PARITY_TEXTS) * 10 / encode_seconds, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main(argv=None):
+    from config import Config
+
+    parser = argparse.ArgumentParser(
+        description="Exporta e valida o backend ONNX de embeddings")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Exporta o modelo para ONNX (+ int8)')
+    export_parser.add_argument('--output', default=Config.ONNX_MODEL_DIR)
+    export_parser.add_argument('--no-quantize', action='store_true')
+    export_parser.add_argument('--min-cosine', type=float, default=0.99)
+
+    parity_parser = subparsers.add_parser('parity', help='Compara ONNX x PyTorch')
+    parity_parser.add_argument('--model-dir', default=Config.ONNX_MODEL_DIR)
+    parity_parser.add_argument('--fp32', action='store_true')
+    parity_parser.add_argument('--min-cosine', type=float, default=0.99)
+
+    load_parser = subparsers.add_parser('load', help='Mede carga e RSS de um backend')
+    load_parser.add_argument('backend', choices=['huggingface', 'onnx'])
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'load':
+        Config.EMBEDDING_BACKEND = args.backend
+        print(_measure_load(Config))
+        return 0
+
+    if args.command == 'export':
+        quantized = not args.no_quantize
+        export_onnx(Config.EMBEDDING_MODEL, args.output, quantize=quantized)
+        model_dir = args.output
+    else:
+        quantized = not args.fp32
+        model_dir = args.model_dir
+
+    report = check_parity(Config.EMBEDDING_MODEL, model_dir, quantized=quantized)
+    print(report)
+    if report['min_cosine'] < args.min_cosine:
+        logger.error(
+            f"Paridade insuficiente: cosseno mínimo {report['min_cosine']} < {args.min_cosine}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
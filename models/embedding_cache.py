@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza o texto antes de calcular a chave do cache"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings com cache persistente em SQLite
+
+    Envolve o modelo de embeddings entregue ao Chroma. Os vetores dos
+    documentos ficam gravados por (modelo, hash do texto normalizado), de
+    modo que reconstruir o índice ou reprocessar documentos com trechos em
+    comum não precisa passar de novo pelo modelo. O cache tem um limite de
+    entradas e descarta as usadas há mais tempo (LRU).
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, db_path: str, max_entries: int = 200000):
+        self.base = base
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.reconnect()
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        ''')
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute(
+            "SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Cache de embeddings com {self._count} vetores")
+
+    def reconnect(self):
+        """Abre a conexão (de novo, após um fork: conexões SQLite não podem ser herdadas)"""
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Busca vetores no cache e marca os encontrados como usados agora"""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name] + batch
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        """Grava vetores novos e aplica o limite de tamanho"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model_name, key, array('f', vector).tobytes(), now)
+                 for key, vector in vectors.items()]
+            )
+            self._count += max(cursor.rowcount, 0)
+
+            if self._count > self.max_entries:
+                # Descartar um pouco além do excesso para não despejar a cada inserção
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    """DELETE FROM embeddings WHERE rowid IN (
+                           SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?
+                       )""",
+                    (excess,)
+                )
+                self._count = self._conn.execute(
+                    "SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                logger.info(f"Cache de embeddings reduzido para {self._count} vetores")
+
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Vetoriza documentos, calculando apenas os que não estão no cache"""
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(list(set(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Consultas não passam pelo cache em disco"""
+        return self.base.embed_query(text)
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': self._count,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0
+        }
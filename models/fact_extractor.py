@@ -0,0 +1,123 @@
+import re
+from typing import Dict, List, Optional
+
+from .lexical_index import fold_text, tokenize
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# "R$ 1.320,00" e também parcelas "12 X R$ 110,00"
+PRICE_RE = re.compile(
+    r'(?:(\d{1,2})\s*[xX]\s*)?R\$\s*(\d{1,3}(?:\.\d{3})*(?:,\d{1,2})?|\d+(?:,\d{1,2})?)')
+_LABEL_CLEAN_RE = re.compile(r'[^\w\s/%]+')
+_LABEL_MAX_WORDS = 10
+_CONTEXT_CHARS = 80
+
+# Nome do curso: uma palavra seguida de palavras com inicial maiúscula
+# (ligadas ou não por "de", "e"...), até pontuação, número ou minúscula
+_NAME = r'([^\W\d_]+(?:\s+(?:(?:de|da|do|das|dos|e)\s+)?[A-ZÀ-Ý][^\W\d_]*){0,4})'
+COURSE_PATTERNS = [
+    re.compile(r'(?i:gradua[çc][ãa]o\s+em)\s+' + _NAME),
+    re.compile(r'(?i:licenciatura\s+em)\s+' + _NAME),
+    re.compile(r'(?i:bacharelado\s+em)\s+' + _NAME),
+    re.compile(r'(?i:cursos?\s+de)\s+' + _NAME),
+]
+# Palavras (sem acento) que encerram o nome: começo de outra coluna da tabela
+_COURSE_STOP_WORDS = frozenset(
+    'licenciados licenciadas bachareis tecnologos graduados ead presencial semipresencial'.split())
+# Nomes genéricos que não identificam um curso
+_GENERIC_COURSE_WORDS = frozenset(
+    'graduacao licenciatura bacharelado pos segunda tecnologo extensao'.split())
+
+# Palavras-chave (sem acento) de cada modalidade
+MODALITY_KEYWORDS = {
+    'presencial': ('presencial',),
+    'ead': ('ead', 'distancia'),
+    'semipresencial': ('semipresencial', 'hibrido'),
+}
+_MODALITY_RES = {
+    modality: re.compile(r'\b(?:' + '|'.join(keywords) + r')\b')
+    for modality, keywords in MODALITY_KEYWORDS.items()
+}
+
+
+def parse_amount(amount: str) -> Optional[float]:
+    """Converte "1.320,00" em 1320.0"""
+    try:
+        return float(amount.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _label(text: str) -> str:
+    words = _LABEL_CLEAN_RE.sub(' ', text).split()
+    return ' '.join(words[-_LABEL_MAX_WORDS:])
+
+
+def extract_prices(text: str) -> List[Dict]:
+    """Valores em R$ com o rótulo que os precede
+
+    O rótulo é o texto entre o valor anterior e este (as últimas palavras);
+    valores colados ao anterior, como o total em "12 X R$ 110,00 = R$
+    1.320,00", herdam o rótulo dele.
+    """
+    text = _WHITESPACE_RE.sub(' ', text)
+    prices = []
+    previous_end = 0
+    previous_label = ''
+    for match in PRICE_RE.finditer(text):
+        label = _label(text[previous_end:match.start()]) or previous_label
+        installments, amount = match.group(1), match.group(2)
+        context_start = max(0, match.start() - _CONTEXT_CHARS)
+        context = text[context_start:match.end() + _CONTEXT_CHARS]
+        prices.append({
+            'label': label,
+            'amount': match.group(0).strip(),
+            'value': parse_amount(amount),
+            'installments': int(installments) if installments else None,
+            # Contexto sem acentos, comparado com os termos da pergunta
+            'context_key': fold_text(context),
+            # Termos do contexto antes do valor (o que vem depois já é a
+            # próxima linha da tabela), indexados para a busca por termo
+            'terms': list(dict.fromkeys(tokenize(text[context_start:match.start()])))
+        })
+        previous_end = match.end()
+        previous_label = label
+    return prices
+
+
+def extract_courses(text: str) -> List[str]:
+    """Nomes de cursos após "graduação em", "licenciatura em" etc."""
+    text = _WHITESPACE_RE.sub(' ', text)
+    courses = []
+    for pattern in COURSE_PATTERNS:
+        for match in pattern.finditer(text):
+            words = []
+            for word in match.group(1).split():
+                if fold_text(word) in _COURSE_STOP_WORDS:
+                    break
+                words.append(word)
+            name = ' '.join(words).strip()
+            if not name or fold_text(words[0]) in _GENERIC_COURSE_WORDS:
+                continue
+            if len(name) > 3 and name.title() not in courses:
+                courses.append(name.title())
+    return courses
+
+
+def extract_modalities(text: str) -> List[str]:
+    """Modalidades de ensino citadas no texto"""
+    folded = fold_text(text)
+    return [modality for modality, pattern in _MODALITY_RES.items() if pattern.search(folded)]
+
+
+def extract_facts(text: str) -> Dict[str, List]:
+    """Fatos estruturados de um chunk: preços, cursos e modalidades
+
+    No formato esperado por Database.add_chunk_facts; os cursos vêm como
+    (nome, chave sem acentos) para agrupar grafias diferentes.
+    """
+    return {
+        'prices': extract_prices(text),
+        'courses': [(name, fold_text(name)) for name in extract_courses(text)],
+        'modalities': extract_modalities(text)
+    }
@@ -0,0 +1,348 @@
+import hashlib
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marca o fim do fluxo entre dois estágios
+_END = object()
+
+
+def chunk_fingerprint(filename: str, text: str) -> str:
+    """Id do chunk: hash do conteúdo, no escopo do arquivo de origem"""
+    return hashlib.sha256(f"{filename}\0{text}".encode('utf-8')).hexdigest()[:32]
+
+
+class StageStats:
+    """Contadores de throughput de um estágio do pipeline"""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.items / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'items': self.items,
+            'unit': self.unit,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'per_second': round(self.per_second, 2)
+        }
+
+
+class IngestPipeline:
+    """Pipeline de ingestão em streaming: páginas → chunks → embeddings → vectorstore
+
+    Cada estágio roda em sua própria thread e se comunica com o seguinte por
+    uma fila limitada. A extração da página N+1 acontece enquanto os chunks
+    anteriores são vetorizados, e a memória usada depende apenas do tamanho
+    das filas, não do tamanho do PDF.
+
+    Os chunks são identificados pelo hash do conteúdo: os que já existem no
+    vectorstore (existing_ids) não são vetorizados de novo, e páginas cujo
+    hash não mudou (known_pages) nem chegam a ter o texto extraído.
+
+    max_chunks e max_text_chars (0 = sem limite) são as mesmas travas do
+    process_pdf: ao atingir uma delas o PDF é cortado ali (o resto das
+    páginas nem é extraído). O texto conta o que foi extraído nesta
+    ingestão; páginas reaproveitadas contam só pelos seus chunks.
+    """
+
+    def __init__(self, processor, queue_size: int = 4, embed_batch_size: int = 32,
+                 max_chunks: int = 0, max_text_chars: int = 0):
+        self.processor = processor
+        self.queue_size = max(1, queue_size)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.max_chunks = max(0, max_chunks)
+        self.max_text_chars = max(0, max_text_chars)
+
+        self._stop = threading.Event()
+        # Limite do arquivo atingido: a extração para, o que já foi lido segue
+        self._truncated = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.stats: Dict[str, StageStats] = {}
+        # chunk_id -> (página, hash da página) de todos os chunks do PDF
+        self.chunks: Dict[str, Tuple[int, str]] = {}
+        self.kept = 0
+        self.text_chars = 0
+        self.pages_done = 0
+        self.pages_total = 0
+        self._progress_callback: Optional[Callable[[int, int, int], None]] = None
+
+    def run(self, pdf_path: str, filename: str, existing_ids: Iterable[str] = (),
+            known_pages: Optional[Dict[str, List[str]]] = None,
+            progress_callback: Optional[Callable[[int, int, int], None]] = None) -> Dict:
+        """Executa o pipeline completo e retorna o relatório de throughput
+
+        known_pages: {hash da página: [ids dos chunks]} de uma ingestão
+        anterior, cujos chunks ainda estão no vectorstore. Valem em qualquer
+        posição da nova versão do arquivo.
+        progress_callback(páginas lidas, total de páginas, chunks gravados) é
+        chamado a cada página extraída e a cada lote gravado.
+        """
+        self._stop.clear()
+        self._truncated.clear()
+        self._error = None
+        self.chunks = {}
+        self.kept = 0
+        self.text_chars = 0
+        self.pages_done = 0
+        self.pages_total = self.processor.count_pages(pdf_path)
+        self._progress_callback = progress_callback
+        existing_ids = set(existing_ids)
+        known_pages = known_pages or {}
+        self.stats = {
+            'extract': StageStats('extração', 'páginas'),
+            'chunk': StageStats('chunking', 'chunks'),
+            'embed': StageStats('embeddings', 'chunks'),
+            'upsert': StageStats('gravação', 'chunks'),
+        }
+
+        processed_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        pages_q = queue.Queue(maxsize=self.queue_size)
+        batches_q = queue.Queue(maxsize=self.queue_size)
+        embedded_q = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(
+                target=self._run_source, name='ingest-extract',
+                args=(self.processor.iter_pages(
+                    pdf_path,
+                    known_page_hashes=frozenset(known_pages)
+                ), pages_q),
+                daemon=True),
+            threading.Thread(
+                target=self._run_stage, name='ingest-chunk',
+                args=('chunk', pages_q, batches_q,
+                      self._chunker(pdf_path, filename, processed_at,
+                                    existing_ids, known_pages)),
+                daemon=True),
+            threading.Thread(
+                target=self._run_stage, name='ingest-embed',
+                args=('embed', batches_q, embedded_q, self._embed),
+                daemon=True),
+            threading.Thread(
+                target=self._run_stage, name='ingest-upsert',
+                args=('upsert', embedded_q, None, self._upsert),
+                daemon=True),
+        ]
+
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.time() - start_time
+
+        for stage in self.stats.values():
+            logger.info(
+                f"Estágio {stage.name}: {stage.items} {stage.unit} em "
+                f"{stage.busy_seconds:.2f}s ({stage.per_second:.1f} {stage.unit}/s)")
+
+        if self._error is not None:
+            logger.error(f"Pipeline interrompido: {str(self._error)}")
+
+        return {
+            'success': self._error is None and len(self.chunks) > 0,
+            'pages': self.stats['extract'].items,
+            'chunks': len(self.chunks),
+            'new': self.stats['upsert'].items,
+            'kept': self.kept,
+            'truncated': self._truncated.is_set(),
+            'seconds': round(duration, 3),
+            'stages': {key: stage.to_dict() for key, stage in self.stats.items()},
+            'error': str(self._error) if self._error is not None else None
+        }
+
+    # ------------------------------------------------------------------
+    # Estágios
+
+    def _chunker(self, pdf_path: str, filename: str, processed_at: str,
+                 existing_ids: set, known_pages: Dict) -> Callable:
+        """Divide cada página em chunks e agrupa em lotes para o embedding
+
+        Só seguem adiante os chunks que ainda não estão no vectorstore.
+        """
+        batch: List[Dict] = []
+
+        def chunk(item) -> Iterator[List[Dict]]:
+            if item is _END:
+                if batch:
+                    yield list(batch)
+                    batch.clear()
+                return
+            if self._truncated.is_set():
+                return  # Páginas já na fila quando o limite foi atingido
+
+            page_num, page_text, page_hash = item
+            if page_text is None:
+                # Página inalterada: reaproveita os chunks da ingestão anterior
+                for chunk_id in known_pages[page_hash]:
+                    if chunk_id not in self.chunks:
+                        if self._chunk_limit_reached(filename):
+                            return
+                        self.chunks[chunk_id] = (page_num, page_hash)
+                        self.kept += 1
+                return
+
+            if self.max_text_chars:
+                remaining = self.max_text_chars - self.text_chars
+                if len(page_text) > remaining:
+                    self._truncate(filename, f"{self.max_text_chars} caracteres de texto")
+                    page_text = page_text[:remaining]
+                self.text_chars += len(page_text)
+
+            for chunk_text in self.processor.text_splitter.split_text(page_text):
+                chunk_id = chunk_fingerprint(filename, chunk_text)
+                if chunk_id in self.chunks:
+                    continue  # Texto repetido dentro do mesmo PDF
+                if self._chunk_limit_reached(filename):
+                    break
+                self.chunks[chunk_id] = (page_num, page_hash)
+                self.stats['chunk'].items += 1
+
+                if chunk_id in existing_ids:
+                    self.kept += 1
+                    continue
+
+                batch.append({
+                    'id': chunk_id,
+                    'text': chunk_text,
+                    'metadata': {
+                        'source': filename,
+                        'file_path': pdf_path,
+                        'page': page_num,
+                        'processed_at': processed_at
+                    }
+                })
+                if len(batch) >= self.embed_batch_size:
+                    yield list(batch)
+                    batch.clear()
+
+        return chunk
+
+    def _chunk_limit_reached(self, filename: str) -> bool:
+        if self.max_chunks and len(self.chunks) >= self.max_chunks:
+            self._truncate(filename, f"{self.max_chunks} chunks")
+            return True
+        return False
+
+    def _truncate(self, filename: str, limit: str):
+        if not self._truncated.is_set():
+            logger.warning(f"{filename} passou do limite de {limit} - o restante do PDF foi ignorado")
+            self._truncated.set()
+
+    def _embed(self, batch) -> Iterable:
+        if batch is _END:
+            return ()
+        embeddings = self.processor.embeddings.embed_documents(
+            [chunk['text'] for chunk in batch])
+        self.stats['embed'].items += len(batch)
+        return ((batch, embeddings),)
+
+    def _upsert(self, item) -> Iterable:
+        if item is _END:
+            return ()
+        batch, embeddings = item
+        self.processor._upsert_embedded(
+            ids=[chunk['id'] for chunk in batch],
+            texts=[chunk['text'] for chunk in batch],
+            metadatas=[chunk['metadata'] for chunk in batch],
+            embeddings=embeddings
+        )
+        self.stats['upsert'].items += len(batch)
+        self._report_progress()
+        return ()
+
+    # ------------------------------------------------------------------
+    # Infraestrutura das threads
+
+    def _report_progress(self):
+        if self._progress_callback is None:
+            return
+        try:
+            self._progress_callback(
+                self.pages_done, self.pages_total, self.stats['upsert'].items)
+        except Exception as e:
+            logger.warning(f"Erro ao reportar progresso: {str(e)}")
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, out_q: queue.Queue, item) -> bool:
+        """Coloca na fila, desistindo se o pipeline foi interrompido"""
+        while not self._stop.is_set():
+            try:
+                out_q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_q: queue.Queue):
+        while True:
+            try:
+                return in_q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _END
+
+    def _run_source(self, pages: Iterator, out_q: queue.Queue):
+        stats = self.stats['extract']
+        try:
+            while not self._stop.is_set() and not self._truncated.is_set():
+                started = time.perf_counter()
+                page = next(pages, _END)
+                stats.busy_seconds += time.perf_counter() - started
+                if page is _END:
+                    break
+                stats.items += 1
+                self.pages_done = page[0] + 1
+                self._report_progress()
+                if not self._put(out_q, page):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            pages.close()
+            self._put(out_q, _END)
+
+    def _run_stage(self, key: str, in_q: queue.Queue, out_q: Optional[queue.Queue], transform: Callable):
+        """Consome a fila de entrada aplicando transform a cada item
+
+        transform recebe também o marcador de fim, para liberar o que tiver
+        acumulado, atualiza os contadores do estágio e retorna os itens a
+        repassar ao estágio seguinte.
+        """
+        stats = self.stats[key]
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _END and self._stop.is_set():
+                    break
+
+                started = time.perf_counter()
+                outputs = list(transform(item))
+                stats.busy_seconds += time.perf_counter() - started
+
+                for output in outputs:
+                    if out_q is not None and not self._put(out_q, output):
+                        return
+
+                if item is _END:
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if out_q is not None:
+                self._put(out_q, _END)
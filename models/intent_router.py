@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .lexical_index import fold_text
+
+
+class IntentRouter:
+    """Roteador de intenções com um único autômato Aho-Corasick
+
+    Todas as palavras-chave de todas as intenções (sem acento e em
+    minúsculas) formam um só autômato, então a pergunta é percorrida uma
+    única vez, qualquer que seja o número de intenções. Como no roteamento
+    anterior, uma palavra-chave casa em qualquer posição ("valor" casa com
+    "valores").
+
+    A pontuação de uma intenção é o número de posições da pergunta onde
+    alguma palavra-chave dela começa; empates são resolvidos pela ordem das
+    intenções na tabela.
+    """
+
+    def __init__(self, table: Dict[str, Sequence[str]]):
+        self.intents = list(table)
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+        # Autômato: transições, links de falha e saídas (intenção, tamanho)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]
+
+        for intent, keywords in table.items():
+            for keyword in keywords:
+                self._add_keyword(fold_text(keyword), intent)
+        self._build_failure_links()
+
+    def _add_keyword(self, keyword: str, intent: str):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if (intent, len(keyword)) not in self._output[state]:
+            self._output[state].append((intent, len(keyword)))
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Herdar as saídas do estado de falha (sufixos que também casam)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """Pontuação de cada intenção encontrada no texto, em uma passada"""
+        goto, fail, output = self._goto, self._fail, self._output
+        starts: Dict[str, set] = {}
+        state = 0
+        for position, char in enumerate(fold_text(text)):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for intent, length in output[state]:
+                    starts.setdefault(intent, set()).add(position - length + 1)
+        return {intent: len(positions) for intent, positions in starts.items()}
+
+    def route(self, text: str) -> List[Tuple[str, int]]:
+        """Todas as intenções encontradas, da mais provável para a menos"""
+        return sorted(self.scores(text).items(),
+                      key=lambda item: (-item[1], self._priority[item[0]]))
+
+    def best(self, text: str) -> Optional[str]:
+        """Intenção mais provável, ou None se nenhuma palavra-chave casou"""
+        ranked = self.route(text)
+        return ranked[0][0] if ranked else None
@@ -0,0 +1,156 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Palavras muito frequentes que não ajudam a distinguir chunks (já sem acento)
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de do dos e ela ele em entre essa esse esta
+este eu foi ha isso isto ja lhe mais mas me meu minha na nas no nos o os ou
+para pela pelas pelo pelos por qual quais quando que quem se sem ser seu sua
+sao so sobre tem um uma umas uns voce voces
+""".split())
+
+
+def fold_text(text: str) -> str:
+    """Remove acentos e caixa: "Preço" e "preco" viram o mesmo termo"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos indexáveis de um texto (sem acentos e sem stopwords)"""
+    return [token for token in _TOKEN_RE.findall(fold_text(text))
+            if token not in STOPWORDS and (len(token) > 1 or token.isdigit())]
+
+
+class BM25Index:
+    """Índice invertido com ranking BM25 sobre os mesmos chunks do vectorstore
+
+    Guarda em disco apenas ids, textos e metadados (JSON); as listas
+    invertidas são reconstruídas na carga, o que para alguns milhares de
+    chunks leva milissegundos. As atualizações trocam as listas afetadas
+    por cópias, de modo que buscas concorrentes nunca veem um dicionário
+    sendo modificado.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Tuple[str, Dict, Counter, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def load(self) -> bool:
+        """Carrega o índice salvo em disco; False se ainda não existe"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        self.clear()
+        self.add(data['ids'], data['texts'], data['metadatas'])
+        logger.info(f"Índice BM25 carregado com {len(self._docs)} chunks")
+        return True
+
+    def persist(self):
+        if not self.path:
+            return
+        with self._lock:
+            ids = list(self._docs.keys())
+            data = {
+                'ids': ids,
+                'texts': [self._docs[chunk_id][0] for chunk_id in ids],
+                'metadatas': [self._docs[chunk_id][1] for chunk_id in ids]
+            }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            self._total_length = 0
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        """Indexa (ou reindexa) chunks"""
+        with self._lock:
+            self._remove_locked([chunk_id for chunk_id in ids if chunk_id in self._docs])
+
+            changes: Dict[str, Dict[str, int]] = {}
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                terms = Counter(tokenize(text))
+                length = sum(terms.values())
+                self._docs[chunk_id] = (text, metadata or {}, terms, length)
+                self._total_length += length
+                for term, tf in terms.items():
+                    changes.setdefault(term, {})[chunk_id] = tf
+
+            for term, added in changes.items():
+                self._postings[term] = {**self._postings.get(term, {}), **added}
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._remove_locked(ids)
+
+    def _remove_locked(self, ids: List[str]):
+        removed: Dict[str, set] = {}
+        for chunk_id in ids:
+            entry = self._docs.pop(chunk_id, None)
+            if entry is None:
+                continue
+            self._total_length -= entry[3]
+            for term in entry[2]:
+                removed.setdefault(term, set()).add(chunk_id)
+
+        for term, chunk_ids in removed.items():
+            remaining = {chunk_id: tf for chunk_id, tf in self._postings.get(term, {}).items()
+                         if chunk_id not in chunk_ids}
+            if remaining:
+                self._postings[term] = remaining
+            else:
+                self._postings.pop(term, None)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Os k chunks de maior pontuação BM25 como (id, pontuação)"""
+        terms = set(tokenize(query))
+        total_docs = len(self._docs)
+        if not terms or total_docs == 0:
+            return []
+
+        avg_length = max(self._total_length / total_docs, 1.0)
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                entry = self._docs.get(chunk_id)
+                if entry is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * entry[3] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def get(self, chunk_id: str) -> Optional[Tuple[str, Dict]]:
+        """Texto e metadados de um chunk indexado"""
+        entry = self._docs.get(chunk_id)
+        return (entry[0], entry[1]) if entry is not None else None
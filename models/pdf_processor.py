@@ -1,22 +1,91 @@
 import PyPDF2
+import hashlib
 import os
-from typing import List, Dict
+from typing import AbstractSet, List, Dict, Optional, Tuple, Iterator, Callable
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.docstore.document import Document
+from .embedding_backends import create_embeddings, embedding_model_id, prepare_after_fork
+from .embedding_cache import CachedEmbeddings, normalize_text
+from .fact_extractor import extract_facts
+from .ingest_pipeline import IngestPipeline, chunk_fingerprint
+from .lexical_index import BM25Index, tokenize
+from .query_batcher import QueryBatcher
+from .query_cache import TTLCache
+from .vector_backends import create_vector_backend, hits_to_documents
 import logging
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from collections import deque
+from concurrent.futures import as_completed
+from utils.executors import (Deadline, DeadlineExceeded, ExecutorOverloaded,
+                             check_deadline, get_executor, get_process_pool)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def file_fingerprint(path: str) -> str:
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _page_fingerprint(page) -> str:
+    """Hash do content stream de uma página (bem mais barato que extract_text)"""
+    try:
+        contents = page.get_contents()
+        data = contents.get_data() if contents is not None else b''
+    except Exception:
+        return ''
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _extract_pages(pdf_reader, start: int, end: int,
+                   known_page_hashes: Optional[AbstractSet[str]] = None
+                   ) -> List[Tuple[int, Optional[str], Optional[str], str]]:
+    """Extrai o texto das páginas [start, end) de um PdfReader aberto
+
+    Retorna (página, texto, erro, hash da página). Páginas cujo hash consta
+    em known_page_hashes (em qualquer posição: inserir ou remover uma
+    página não afeta as demais) não são extraídas e voltam com texto None.
+    """
+    known_page_hashes = known_page_hashes or frozenset()
+    results = []
+    for page_num in range(start, end):
+        page_hash = ''
+        try:
+            page = pdf_reader.pages[page_num]
+            page_hash = _page_fingerprint(page)
+            if page_hash and page_hash in known_page_hashes:
+                results.append((page_num, None, None, page_hash))
+                continue
+            page_text = page.extract_text()
+            results.append((page_num, page_text or "", None, page_hash))
+        except Exception as e:
+            results.append((page_num, "", str(e), page_hash))
+    return results
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int,
+                        known_page_hashes: Optional[AbstractSet[str]] = None
+                        ) -> List[Tuple[int, Optional[str], Optional[str], str]]:
+    """Extrai as páginas [start, end) - executado em processo separado"""
+    with open(pdf_path, 'rb') as file:
+        return _extract_pages(PyPDF2.PdfReader(file), start, end, known_page_hashes)
+
+
 class PDFProcessor:
-    def __init__(self, config):
+    def __init__(self, config, db=None, read_only: bool = False):
         self.config = config
+        self.db = db
+        # Somente leitura: o servidor web apenas consulta o índice; quem grava
+        # é o worker de ingestão (único processo escritor)
+        self.read_only = read_only
+        # Modelo + backend: chave dos caches de embeddings
+        self.embedding_model_id = embedding_model_id(config)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.CHUNK_SIZE,
             chunk_overlap=config.CHUNK_OVERLAP,
@@ -24,65 +93,217 @@ class PDFProcessor:
         )
 
         self.embeddings = None
+        # Modelo sem o cache em disco, usado para vetorizar consultas
+        self.query_encoder = None
         self.vectorstore = None
+        # Versão do índice carregada neste processo (ver get_index_version)
+        self.loaded_index_version = None
+        self._reload_lock = threading.Lock()
+        self.query_embedding_cache = TTLCache(
+            max_entries=getattr(config, 'QUERY_EMBEDDING_CACHE_MAX_ENTRIES', 5000),
+            ttl_seconds=getattr(config, 'QUERY_EMBEDDING_CACHE_TTL', 86400)
+        )
+        # Índice BM25 sobre os mesmos chunks (busca híbrida)
+        self.lexical_index = None
+        if getattr(config, 'LEXICAL_INDEX_ENABLED', False):
+            self.lexical_index = BM25Index(getattr(config, 'BM25_INDEX_PATH', None))
+        self.retrieval_stats = {'lexical_fast_path': 0, 'hybrid': 0, 'dense': 0}
+        self.query_batcher = None
+        if getattr(config, 'QUERY_BATCHING', False):
+            self.query_batcher = QueryBatcher(
+                self,
+                window_ms=getattr(config, 'QUERY_BATCH_WINDOW_MS', 2),
+                max_batch=getattr(config, 'QUERY_BATCH_MAX_SIZE', 32),
+                max_pending=getattr(config, 'QUERY_BATCH_MAX_PENDING', 256)
+            )
         self._init_embeddings()
 
     def _init_embeddings(self):
         """Inicializa embeddings com timeout"""
         try:
-            logger.info("Carregando embeddings...")
-            # Usar um modelo mais leve e rápido
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={
-                    'device': 'cpu',
-                    'trust_remote_code': False
-                },
-                encode_kwargs={
-                    'normalize_embeddings': True,
-                    'batch_size': 16  # Processar em lotes menores
-                }
-            )
+            logger.info(
+                f"Carregando embeddings ({self.embedding_model_id})...")
+            self.embeddings = create_embeddings(self.config)
+            self.query_encoder = self.embeddings
+            if getattr(self.config, 'EMBEDDING_CACHE_ENABLED', False):
+                self.embeddings = CachedEmbeddings(
+                    self.embeddings,
+                    model_name=self.embedding_model_id,
+                    db_path=self.config.EMBEDDING_CACHE_PATH,
+                    max_entries=self.config.EMBEDDING_CACHE_MAX_ENTRIES
+                )
             logger.info("Embeddings carregados com sucesso")
             self.load_vectorstore()
         except Exception as e:
             logger.error(f"Erro ao carregar embeddings: {str(e)}")
             self.embeddings = None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extrai texto de um arquivo PDF"""
+    def _extraction_workers(self) -> int:
+        """Número de processos usados na extração paralela"""
+        workers = getattr(self.config, 'PDF_EXTRACTION_WORKERS', 0)
+        return workers if workers > 0 else (os.cpu_count() or 1)
+
+    def extract_text_from_pdf(self, pdf_path: str, parallel: Optional[bool] = None) -> str:
+        """Extrai texto de um arquivo PDF
+
+        Com parallel=None a extração é paralela apenas quando o PDF tem
+        páginas suficientes e há mais de um núcleo disponível.
+        """
         try:
             logger.info(f"Extraindo texto de: {pdf_path}")
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-
                 total_pages = len(pdf_reader.pages)
                 logger.info(f"PDF tem {total_pages} páginas")
 
-                for page_num in range(total_pages):
-                    try:
-                        page = pdf_reader.pages[page_num]
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
+                workers = self._extraction_workers()
+                if parallel is None:
+                    parallel = (
+                        workers > 1 and
+                        total_pages >= getattr(self.config, 'PDF_PARALLEL_MIN_PAGES', 16)
+                    )
 
-                        # Log de progresso a cada 10 páginas
-                        if (page_num + 1) % 10 == 0:
-                            logger.info(
-                                f"Processadas {page_num + 1}/{total_pages} páginas")
+                if parallel:
+                    page_texts = self._extract_pages_parallel(
+                        pdf_path, total_pages, workers)
+                else:
+                    page_texts = self._extract_pages_sequential(
+                        pdf_reader, total_pages)
 
-                    except Exception as e:
-                        logger.warning(f"Erro na página {page_num}: {str(e)}")
-                        continue
+            # Juntar uma única vez, na ordem das páginas
+            text = "".join(
+                page_text + "\n" for page_text in page_texts if page_text)
 
-                logger.info(f"Texto extraído: {len(text)} caracteres")
-                return text
+            logger.info(f"Texto extraído: {len(text)} caracteres")
+            return text
 
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF {pdf_path}: {str(e)}")
             return ""
 
+    def _extract_pages_sequential(self, pdf_reader, total_pages: int) -> List[str]:
+        """Extrai as páginas uma a uma no processo atual"""
+        page_texts = []
+        for page_num in range(total_pages):
+            try:
+                page = pdf_reader.pages[page_num]
+                page_texts.append(page.extract_text() or "")
+
+                # Log de progresso a cada 10 páginas
+                if (page_num + 1) % 10 == 0:
+                    logger.info(
+                        f"Processadas {page_num + 1}/{total_pages} páginas")
+
+            except Exception as e:
+                logger.warning(f"Erro na página {page_num}: {str(e)}")
+                page_texts.append("")
+                continue
+
+        return page_texts
+
+    def _extract_pages_parallel(self, pdf_path: str, total_pages: int, workers: int) -> List[str]:
+        """Distribui intervalos de páginas entre um pool de processos"""
+        pages_per_task = max(1, getattr(self.config, 'PDF_PAGES_PER_TASK', 8))
+        ranges = [
+            (start, min(start + pages_per_task, total_pages))
+            for start in range(0, total_pages, pages_per_task)
+        ]
+        # O pool é compartilhado entre PDFs: tamanho fixo, não limitado aos intervalos
+        logger.info(
+            f"Extração paralela: {len(ranges)} intervalos em até {workers} processos")
+
+        page_texts = [""] * total_pages
+        pages_done = 0
+
+        executor = get_process_pool(workers)
+        futures = [
+            executor.submit(_extract_page_range, pdf_path, start, end)
+            for start, end in ranges
+        ]
+        for future in as_completed(futures):
+            results = future.result()
+            for page_num, page_text, error, _ in results:
+                if error is not None:
+                    logger.warning(f"Erro na página {page_num}: {error}")
+                    continue
+                page_texts[page_num] = page_text
+
+            # Log de progresso a cada 10 páginas
+            previous = pages_done
+            pages_done += len(results)
+            if pages_done // 10 > previous // 10:
+                logger.info(
+                    f"Processadas {pages_done}/{total_pages} páginas")
+
+        return page_texts
+
+    def count_pages(self, pdf_path: str) -> int:
+        """Retorna o número de páginas de um PDF"""
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def iter_pages(self, pdf_path: str, parallel: Optional[bool] = None,
+                   known_page_hashes: Optional[AbstractSet[str]] = None
+                   ) -> Iterator[Tuple[int, Optional[str], str]]:
+        """Gera (página, texto, hash da página) em ordem, página a página
+
+        Páginas cujo hash está em known_page_hashes não são extraídas e saem
+        com texto None. No modo paralelo mantém no máximo dois intervalos por
+        processo em andamento, de modo que a memória não cresce com o tamanho
+        do PDF. Páginas com erro são registradas e puladas.
+        """
+        total_pages = self.count_pages(pdf_path)
+        workers = self._extraction_workers()
+        if parallel is None:
+            parallel = (
+                workers > 1 and
+                total_pages >= getattr(self.config, 'PDF_PARALLEL_MIN_PAGES', 16)
+            )
+
+        def page_items(results):
+            for page_num, page_text, error, page_hash in results:
+                if error is not None:
+                    logger.warning(f"Erro na página {page_num}: {error}")
+                    continue
+                if page_text is None or page_text:
+                    yield page_num, page_text, page_hash
+
+        if not parallel:
+            with open(pdf_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for page_num in range(total_pages):
+                    yield from page_items(_extract_pages(
+                        pdf_reader, page_num, page_num + 1, known_page_hashes))
+            return
+
+        pages_per_task = max(1, getattr(self.config, 'PDF_PAGES_PER_TASK', 8))
+        ranges = iter([
+            (start, min(start + pages_per_task, total_pages))
+            for start in range(0, total_pages, pages_per_task)
+        ])
+
+        executor = get_process_pool(workers)
+        pending = deque()
+
+        def submit_next():
+            page_range = next(ranges, None)
+            if page_range is not None:
+                pending.append(executor.submit(
+                    _extract_page_range, pdf_path, *page_range, known_page_hashes))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        try:
+            while pending:
+                results = pending.popleft().result()
+                submit_next()
+                yield from page_items(results)
+        finally:
+            # Consumidor parou antes do fim: não deixar trabalho órfão no pool
+            for future in pending:
+                future.cancel()
+
     def process_pdf(self, pdf_path: str, filename: str) -> List[Document]:
         """Processa um PDF e retorna documentos chunked"""
         try:
@@ -94,10 +315,11 @@ class PDFProcessor:
                 return []
 
             # Limitar tamanho do texto se muito grande
-            if len(text) > 500000:  # 500KB de texto
+            max_text_chars = getattr(self.config, 'INGEST_MAX_TEXT_CHARS', 0)
+            if max_text_chars and len(text) > max_text_chars:
                 logger.warning(
                     f"Texto muito grande ({len(text)} chars), truncando...")
-                text = text[:500000]
+                text = text[:max_text_chars]
 
             # Criar documento
             document = Document(
@@ -114,10 +336,11 @@ class PDFProcessor:
             chunks = self.text_splitter.split_documents([document])
 
             # Limitar número de chunks se muito grande
-            if len(chunks) > 200:
+            max_chunks = getattr(self.config, 'INGEST_MAX_CHUNKS', 0)
+            if max_chunks and len(chunks) > max_chunks:
                 logger.warning(
-                    f"Muitos chunks ({len(chunks)}), limitando a 200")
-                chunks = chunks[:200]
+                    f"Muitos chunks ({len(chunks)}), limitando a {max_chunks}")
+                chunks = chunks[:max_chunks]
 
             logger.info(
                 f"PDF {filename} processado: {len(chunks)} chunks criados")
@@ -140,35 +363,226 @@ class PDFProcessor:
             # Criar diretório se não existir
             os.makedirs(self.config.VECTORSTORE_PATH, exist_ok=True)
 
-            self.vectorstore = Chroma(
-                persist_directory=self.config.VECTORSTORE_PATH,
-                embedding_function=self.embeddings,
-                collection_name="unibot_docs"
-            )
+            version = self.get_index_version()
+            self.vectorstore = create_vector_backend(self.config, self.embeddings)
+            # Só depois de carregar: se falhar, refresh_if_stale tenta de novo
+            self.loaded_index_version = version
 
             # Verificar se tem documentos
             try:
-                collection = self.vectorstore._collection
-                count = collection.count()
-                logger.info(f"Vectorstore carregado com {count} documentos")
-            except:
+                count = self.vectorstore.count()
+                logger.info(
+                    f"Vectorstore ({self.vectorstore.name}) carregado com {count} documentos")
+            except Exception:
+                count = 0
                 logger.info("Vectorstore vazio ou novo")
 
+            self._load_lexical_index(count)
+            self._backfill_facts(count)
+            self._backfill_chunk_counts(count)
+
         except Exception as e:
             logger.error(f"Erro ao carregar vectorstore: {str(e)}")
             self.vectorstore = None
 
-    def add_documents_to_vectorstore(self, documents: List[Document]) -> bool:
-        """Adiciona documentos ao vectorstore com timeout"""
+    def _load_lexical_index(self, vector_count: int):
+        """Carrega o índice BM25; se ainda não existe, monta a partir do vectorstore"""
+        if self.lexical_index is None:
+            return
+        try:
+            if self.lexical_index.load() or vector_count == 0:
+                return
+            logger.info("Índice BM25 não encontrado - construindo a partir do vectorstore")
+            self.lexical_index.add(*self.vectorstore.all_chunks())
+        except Exception as e:
+            logger.error(f"Erro ao carregar índice BM25: {str(e)}")
+            self.lexical_index.clear()
+
+    def _backfill_facts(self, vector_count: int):
+        """Extrai os fatos de um vectorstore criado antes da tabela de fatos"""
+        if self.db is None or vector_count == 0 or self.read_only:
+            return
+        if any(self.db.count_facts().values()):
+            return
+        try:
+            logger.info("Tabelas de fatos vazias - extraindo fatos do vectorstore")
+            self._index_facts(*self.vectorstore.all_chunks())
+        except Exception as e:
+            logger.error(f"Erro ao extrair fatos do vectorstore: {str(e)}")
+
+    def _backfill_chunk_counts(self, vector_count: int):
+        """Conta os chunks de PDFs registrados antes da contagem por documento"""
+        if self.db is None or vector_count == 0 or self.read_only:
+            return
+        try:
+            for filename in self.db.get_pdfs_without_chunk_count():
+                self.db.set_chunk_count(filename, len(self._existing_chunk_ids(filename)))
+        except Exception as e:
+            logger.error(f"Erro ao contar chunks dos documentos: {str(e)}")
+
+    def _index_facts(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        """Registra preços, cursos e modalidades de cada chunk no banco"""
+        if self.db is None:
+            return
+        self.db.add_chunk_facts([
+            (chunk_id, (metadata or {}).get('source', ''), extract_facts(text))
+            for chunk_id, text, metadata in zip(ids, texts, metadatas)
+        ])
+
+    def _index_documents(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        """Atualiza os índices derivados (BM25 e fatos) com chunks gravados"""
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, texts, metadatas)
+        self._index_facts(ids, texts, metadatas)
+
+    def _persist_indexes(self):
+        """Grava o vectorstore e o índice BM25"""
+        self.vectorstore.persist()
+        if self.lexical_index is not None:
+            self.lexical_index.persist()
+
+    def _index_version_path(self) -> str:
+        return os.path.join(self.config.VECTORSTORE_PATH, 'index_version')
+
+    def get_index_version(self) -> str:
+        """Versão do índice publicada no disco (muda a cada treinamento)"""
+        try:
+            with open(self._index_version_path(), 'r') as file:
+                return file.read().strip() or '0'
+        except FileNotFoundError:
+            return '0'
+
+    def bump_index_version(self) -> str:
+        """Publica uma nova versão do índice para os demais processos"""
+        version = str(time.time_ns())
+        tmp_path = self._index_version_path() + '.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(version)
+        os.replace(tmp_path, self._index_version_path())
+        self.loaded_index_version = version
+        return version
+
+    def refresh_if_stale(self):
+        """Recarrega o vectorstore se outro processo (o worker) o atualizou"""
+        if self.embeddings is None:
+            return
+        if self.get_index_version() == self.loaded_index_version:
+            return
+
+        with self._reload_lock:
+            if self.get_index_version() == self.loaded_index_version:
+                return
+            logger.info("Nova versão do índice detectada - recarregando vectorstore")
+            if self.vectorstore is not None:
+                self.vectorstore.close()
+            self.load_vectorstore()
+
+    def current_index_version(self) -> Optional[str]:
+        """Versão do índice em uso neste processo, já recarregado se preciso"""
+        self.refresh_if_stale()
+        return self.loaded_index_version
+
+    def after_fork(self, num_threads: int = 0):
+        """Prepara um processo criado por fork a partir de um processo já carregado
+
+        O modelo continua compartilhado (copy-on-write); apenas o que não pode
+        ser herdado é recriado: conexões SQLite, o cliente do vectorstore e
+        os pools de threads do backend de embeddings.
+        """
+        if self.query_encoder is not None:
+            prepare_after_fork(self.query_encoder, num_threads)
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self.embeddings.reconnect()
+        with self._reload_lock:
+            if self.vectorstore is not None:
+                self.vectorstore.close()
+            self.load_vectorstore()
+
+    def warm_up(self):
+        """Primeira passada do modelo e do índice, fora do caminho das requisições"""
+        if self.query_encoder is None or self.vectorstore is None:
+            return
+        vector = self.query_encoder.embed_documents(["aquecimento"])
+        if self.vectorstore.count() > 0:
+            self.vectorstore.query(vector, 1)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Vetoriza uma consulta, reaproveitando vetores de perguntas repetidas"""
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Vetoriza várias consultas em uma única passada do modelo
+
+        Consultas já vistas vêm do cache. As entradas são marcadas com o nome
+        do modelo: o vetor da pergunta não depende do conteúdo do índice, só
+        do modelo que o gerou.
+        """
+        model = self.embedding_model_id
+        keys = [normalize_text(query) for query in queries]
+        vectors = {}
+        missing = {}
+        for key, query in zip(keys, queries):
+            if key in vectors or key in missing:
+                continue
+            cached = self.query_embedding_cache.get(key, model)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                missing[key] = query
+
+        if missing:
+            # Para o MiniLM a vetorização de consultas e de documentos é a mesma
+            computed = self.query_encoder.embed_documents(list(missing.values()))
+            for key, vector in zip(missing.keys(), computed):
+                self.query_embedding_cache.set(key, vector, model)
+                vectors[key] = vector
+
+        return [vectors[key] for key in keys]
+
+    def search_by_vectors(self, vectors: List[List[float]], k: int) -> List[List[Document]]:
+        """Consulta o vectorstore com vários vetores em uma única chamada"""
+        return [hits_to_documents(hits) for hits in self.vectorstore.query(vectors, k)]
+
+    def get_cache_stats(self) -> Dict:
+        """Estatísticas dos caches de embeddings"""
+        stats = {
+            'query_embeddings': self.query_embedding_cache.get_stats(),
+            'retrieval': dict(self.retrieval_stats)
+        }
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats['document_embeddings'] = self.embeddings.get_stats()
+        if self.query_batcher is not None:
+            stats['query_batches'] = self.query_batcher.get_stats()
+        return stats
+
+    def add_documents_to_vectorstore(self, documents: List[Document], bulk: Optional[bool] = None) -> bool:
+        """Adiciona documentos ao vectorstore com timeout
+
+        No modo bulk (padrão: Config.BULK_LOAD) os embeddings são calculados
+        em lotes grandes e gravados com ids e vetores já prontos em poucos
+        upserts; senão cada lote de 10 passa por vectorstore.add_documents.
+        Nos dois casos o id de cada chunk é o chunk_fingerprint, o mesmo do
+        BM25 e das tabelas de fatos.
+        """
         if not documents:
             logger.warning("Nenhum documento para adicionar")
             return False
 
+        if self.read_only:
+            logger.error("Vectorstore aberto somente para leitura")
+            return False
+
         if self.vectorstore is None or self.embeddings is None:
             logger.error("Vectorstore ou embeddings não disponíveis")
             return False
 
+        if bulk is None:
+            bulk = getattr(self.config, 'BULK_LOAD', False)
+        if bulk:
+            return self._bulk_add_documents(documents)
+
         try:
+            ids, documents = self._unique_documents(documents)
             logger.info(
                 f"Adicionando {len(documents)} documentos ao vectorstore...")
 
@@ -178,6 +592,7 @@ class PDFProcessor:
 
             for i in range(0, len(documents), batch_size):
                 batch = documents[i:i + batch_size]
+                batch_ids = ids[i:i + batch_size]
                 batch_num = (i // batch_size) + 1
 
                 logger.info(
@@ -185,23 +600,28 @@ class PDFProcessor:
 
                 try:
                     # Usar timeout para cada lote
-                    with ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(
-                            self.vectorstore.add_documents, batch)
-                        future.result(timeout=60)  # 60 segundos por lote
+                    get_executor('ingest').run(
+                        self.vectorstore.add_documents, batch, batch_ids,
+                        deadline=Deadline(getattr(self.config, 'INGEST_BATCH_TIMEOUT', 60)))
 
                     logger.info(f"Lote {batch_num} processado com sucesso")
 
-                except TimeoutError:
+                except DeadlineExceeded:
                     logger.error(f"Timeout no lote {batch_num}")
                     return False
                 except Exception as e:
                     logger.error(f"Erro no lote {batch_num}: {str(e)}")
                     return False
 
+            self._index_documents(
+                ids,
+                [doc.page_content for doc in documents],
+                [doc.metadata for doc in documents]
+            )
+
             # Persistir mudanças
             logger.info("Persistindo vectorstore...")
-            self.vectorstore.persist()
+            self._persist_indexes()
 
             logger.info(
                 f"Todos os {len(documents)} documentos foram adicionados com sucesso")
@@ -212,8 +632,198 @@ class PDFProcessor:
                 f"Erro ao adicionar documentos ao vectorstore: {str(e)}")
             return False
 
-    def search_similar_documents(self, query: str, k: int = 3) -> List[Document]:
-        """Busca documentos similares à query"""
+    def _unique_documents(self, documents: List[Document]) -> Tuple[List[str], List[Document]]:
+        """Ids pelo hash do conteúdo, sem repetições: recarregar o mesmo documento não duplica"""
+        unique = {}
+        for doc in documents:
+            chunk_id = chunk_fingerprint(
+                doc.metadata.get('source', ''), doc.page_content)
+            unique.setdefault(chunk_id, doc)
+        return list(unique.keys()), list(unique.values())
+
+    def _bulk_add_documents(self, documents: List[Document]) -> bool:
+        """Carga em massa: embeddings em lotes grandes + upserts com vetores prontos"""
+        embed_batch_size = max(1, getattr(self.config, 'BULK_EMBED_BATCH_SIZE', 256))
+        upsert_batch_size = max(1, getattr(self.config, 'BULK_UPSERT_BATCH_SIZE', 2048))
+        # O Chroma limita o tamanho de cada chamada
+        if self.vectorstore.max_batch_size:
+            upsert_batch_size = min(upsert_batch_size, self.vectorstore.max_batch_size)
+        timeout = getattr(self.config, 'INGEST_BATCH_TIMEOUT', 60)
+
+        ids, docs = self._unique_documents(documents)
+
+        logger.info(
+            f"Carga em massa de {len(docs)} documentos (lotes de {embed_batch_size} embeddings / {upsert_batch_size} upserts)")
+
+        embed_seconds = 0.0
+        upsert_seconds = 0.0
+        start_time = time.time()
+        try:
+            for i in range(0, len(docs), upsert_batch_size):
+                batch_ids = ids[i:i + upsert_batch_size]
+                batch_docs = docs[i:i + upsert_batch_size]
+                texts = [doc.page_content for doc in batch_docs]
+
+                started = time.perf_counter()
+                embeddings = []
+                for j in range(0, len(texts), embed_batch_size):
+                    embeddings.extend(get_executor('ingest').run(
+                        self.embeddings.embed_documents, texts[j:j + embed_batch_size],
+                        deadline=Deadline(timeout)))
+                embed_seconds += time.perf_counter() - started
+
+                started = time.perf_counter()
+                get_executor('ingest').run(
+                    self._upsert_embedded, batch_ids, texts,
+                    [doc.metadata for doc in batch_docs], embeddings,
+                    deadline=Deadline(timeout))
+                upsert_seconds += time.perf_counter() - started
+
+                logger.info(
+                    f"Gravados {min(i + upsert_batch_size, len(docs))}/{len(docs)} documentos")
+
+            logger.info("Persistindo vectorstore...")
+            self._persist_indexes()
+
+        except DeadlineExceeded:
+            logger.error("Timeout na carga em massa")
+            return False
+        except Exception as e:
+            logger.error(f"Erro na carga em massa: {str(e)}")
+            return False
+
+        duration = time.time() - start_time
+        logger.info(
+            f"{len(docs)} documentos em {duration:.2f}s - "
+            f"{len(docs) / duration if duration > 0 else 0:.1f} documentos/s "
+            f"(embeddings: {len(docs) / embed_seconds if embed_seconds > 0 else 0:.1f}/s, "
+            f"gravação: {len(docs) / upsert_seconds if upsert_seconds > 0 else 0:.1f}/s)")
+        return True
+
+    def _upsert_embedded(self, ids: List[str], texts: List[str], metadatas: List[Dict],
+                         embeddings: List[List[float]]):
+        """Grava chunks com embeddings já calculados no vectorstore"""
+        self.vectorstore.upsert(ids, texts, metadatas, embeddings)
+        self._index_documents(ids, texts, metadatas)
+
+    def _existing_chunk_ids(self, filename: str) -> List[str]:
+        """Ids de todos os chunks de um arquivo presentes no vectorstore"""
+        return self.vectorstore.ids_for_source(filename)
+
+    def _delete_chunks(self, ids: List[str]):
+        """Remove chunks do vectorstore"""
+        if ids:
+            self.vectorstore.delete(ids)
+            if self.lexical_index is not None:
+                self.lexical_index.delete(ids)
+            if self.db is not None:
+                self.db.delete_chunk_facts(ids)
+
+    def _remove_stale_chunks(self, existing_ids, current_ids) -> int:
+        """Remove os chunks da versão anterior de um arquivo que não existem mais"""
+        stale_ids = list(set(existing_ids).difference(current_ids))
+        self._delete_chunks(stale_ids)
+        return len(stale_ids)
+
+    def _train_streaming(self, pdf_path: str, filename: str,
+                         progress_callback: Optional[Callable[[int, int, int], None]] = None) -> bool:
+        """Treina com o pipeline em streaming, sem carregar o PDF inteiro
+
+        Apenas chunks novos são vetorizados; os que sumiram da nova versão
+        do arquivo são removidos do vectorstore.
+        """
+        if self.vectorstore is None or self.embeddings is None:
+            logger.error("Vectorstore ou embeddings não disponíveis")
+            return False
+
+        existing_ids = set(self._existing_chunk_ids(filename))
+
+        # Páginas da versão anterior cujos chunks continuam no vectorstore,
+        # pelo hash do conteúdo (não pela posição no arquivo)
+        known_pages = {}
+        if self.db is not None and existing_ids:
+            for page_hash, chunk_ids in self.db.get_pdf_chunks(filename).values():
+                if page_hash and all(chunk_id in existing_ids for chunk_id in chunk_ids):
+                    known_pages[page_hash] = chunk_ids
+
+        pipeline = IngestPipeline(
+            self,
+            queue_size=getattr(self.config, 'INGEST_QUEUE_SIZE', 4),
+            embed_batch_size=getattr(self.config, 'INGEST_EMBED_BATCH_SIZE', 32),
+            max_chunks=getattr(self.config, 'INGEST_MAX_CHUNKS', 0),
+            max_text_chars=getattr(self.config, 'INGEST_MAX_TEXT_CHARS', 0)
+        )
+        report = pipeline.run(
+            pdf_path, filename, existing_ids, known_pages, progress_callback)
+
+        if report['chunks'] == 0 and report['error'] is None:
+            logger.error(f"Nenhum documento processado para {filename}")
+            return False
+
+        if report['success']:
+            removed = self._remove_stale_chunks(existing_ids, pipeline.chunks.keys())
+
+            logger.info("Persistindo vectorstore...")
+            self._persist_indexes()
+
+            if self.db is not None:
+                self.db.replace_pdf_chunks(filename, [
+                    (chunk_id, page, page_hash)
+                    for chunk_id, (page, page_hash) in pipeline.chunks.items()
+                ])
+
+            logger.info(
+                f"{report['pages']} páginas e {report['chunks']} chunks em {report['seconds']:.2f}s "
+                f"({report['new']} novos, {report['kept']} reaproveitados, {removed} removidos)")
+
+        return report['success']
+
+    def _train_documents(self, pdf_path: str, filename: str) -> bool:
+        """Treina com o PDF inteiro em memória (Config.INGEST_STREAMING=False)
+
+        Como no streaming, os chunks da versão anterior do arquivo que não
+        estão na nova são removidos depois que os novos foram gravados.
+        """
+        # Processar PDF
+        documents = self.process_pdf(pdf_path, filename)
+
+        if not documents:
+            logger.error(
+                f"Nenhum documento processado para {filename}")
+            return False
+
+        existing_ids = self._existing_chunk_ids(filename) if self.vectorstore is not None else []
+
+        # Adicionar ao vectorstore
+        if not self.add_documents_to_vectorstore(documents):
+            return False
+
+        chunk_ids = [chunk_fingerprint(filename, doc.page_content) for doc in documents]
+        removed = self._remove_stale_chunks(existing_ids, chunk_ids)
+        if removed:
+            logger.info(f"{removed} chunks da versão anterior de {filename} removidos")
+            self._persist_indexes()
+
+        if self.db is not None:
+            # Sem páginas: a próxima ingestão em streaming extrai tudo de novo
+            self.db.replace_pdf_chunks(filename, [
+                (chunk_id, None, None) for chunk_id in dict.fromkeys(chunk_ids)])
+        return True
+
+    def search_similar_documents(self, query: str, k: int = 3,
+                                 deadline: Optional[Deadline] = None) -> List[Document]:
+        """Busca documentos similares à query
+
+        Sem deadline, a busca usa Config.SEARCH_TIMEOUT e retorna lista vazia
+        em caso de timeout. Com deadline (o prazo da requisição), timeouts e
+        pool sobrecarregado são propagados para o chamador.
+
+        Com o índice BM25, consultas que ele responde com confiança não
+        passam pelo modelo de embeddings; as demais combinam os resultados
+        léxicos e vetoriais.
+        """
+        self.refresh_if_stale()
+
         if self.vectorstore is None:
             logger.warning("Vectorstore não disponível para busca")
             return []
@@ -226,23 +836,158 @@ class PDFProcessor:
             logger.info(f"Buscando documentos para: '{query[:50]}...'")
 
             # Usar timeout para busca
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(
-                    self.vectorstore.similarity_search, query, k)
-                docs = future.result(timeout=30)  # 30 segundos para busca
+            search_deadline = deadline or Deadline(
+                getattr(self.config, 'SEARCH_TIMEOUT', 30))
+            lexical_hits = self._lexical_search(query, k)
+            if self._lexical_confident(query, lexical_hits):
+                self.retrieval_stats['lexical_fast_path'] += 1
+                docs = [doc for doc, _ in lexical_hits[:k]]
+            else:
+                candidates = k
+                if lexical_hits:
+                    candidates = max(k, getattr(self.config, 'HYBRID_CANDIDATES', 10))
+                if self.query_batcher is not None:
+                    docs = self.query_batcher.search(query, candidates, search_deadline)
+                else:
+                    docs = get_executor('query').run(
+                        self._search, query, candidates, deadline=search_deadline)
+
+                if lexical_hits:
+                    self.retrieval_stats['hybrid'] += 1
+                    docs = self.fuse_results(docs, [doc for doc, _ in lexical_hits], k)
+                else:
+                    self.retrieval_stats['dense'] += 1
+                    docs = docs[:k]
 
             logger.info(f"Encontrados {len(docs)} documentos similares")
             return docs
 
-        except TimeoutError:
-            logger.error("Timeout na busca de documentos")
+        except (DeadlineExceeded, ExecutorOverloaded) as e:
+            logger.error(f"Busca de documentos interrompida: {str(e)}")
+            if deadline is not None:
+                raise
             return []
         except Exception as e:
             logger.error(f"Erro na busca de documentos: {str(e)}")
             return []
 
-    def train_with_pdf(self, pdf_path: str, filename: str) -> bool:
-        """Treina a IA com um novo PDF"""
+    def search_similar_documents_batch(self, queries: List[str], k: int = 3,
+                                       deadline: Optional[Deadline] = None) -> List[List[Document]]:
+        """Busca várias consultas de uma vez, na ordem recebida
+
+        As consultas que o BM25 não resolve sozinho são vetorizadas em uma
+        única chamada ao modelo e consultadas no vectorstore em uma única
+        operação. Timeouts e pool sobrecarregado são propagados, como em
+        search_similar_documents com deadline.
+        """
+        self.refresh_if_stale()
+        results: List[List[Document]] = [[] for _ in queries]
+        if self.vectorstore is None:
+            logger.warning("Vectorstore não disponível para busca")
+            return results
+
+        dense = []
+        for i, query in enumerate(queries):
+            if not query.strip():
+                continue
+            lexical_hits = self._lexical_search(query, k)
+            if self._lexical_confident(query, lexical_hits):
+                self.retrieval_stats['lexical_fast_path'] += 1
+                results[i] = [doc for doc, _ in lexical_hits[:k]]
+            else:
+                dense.append((i, query, lexical_hits))
+
+        if dense:
+            candidates = max(k, getattr(self.config, 'HYBRID_CANDIDATES', 10))
+            search_deadline = deadline or Deadline(getattr(self.config, 'SEARCH_TIMEOUT', 30))
+            doc_lists = get_executor('query').run(
+                self._search_many, [query for _, query, _ in dense], candidates,
+                deadline=search_deadline)
+            for (i, _, lexical_hits), docs in zip(dense, doc_lists):
+                if lexical_hits:
+                    self.retrieval_stats['hybrid'] += 1
+                    results[i] = self.fuse_results(docs, [doc for doc, _ in lexical_hits], k)
+                else:
+                    self.retrieval_stats['dense'] += 1
+                    results[i] = docs[:k]
+
+        logger.info(f"Busca em lote: {len(queries)} consultas, {len(dense)} vetorizadas")
+        return results
+
+    def _search_many(self, queries: List[str], k: int) -> List[List[Document]]:
+        vectors = self.embed_queries(queries)
+        check_deadline()
+        return self.search_by_vectors(vectors, k)
+
+    def _lexical_search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Candidatos do índice BM25 como (documento, pontuação)"""
+        if self.lexical_index is None or len(self.lexical_index) == 0:
+            return []
+        candidates = max(k, getattr(self.config, 'HYBRID_CANDIDATES', 10))
+        hits = []
+        for chunk_id, score in self.lexical_index.search(query, candidates):
+            entry = self.lexical_index.get(chunk_id)
+            if entry is not None:
+                text, metadata = entry
+                hits.append((Document(page_content=text, metadata=metadata), score))
+        return hits
+
+    def _lexical_confident(self, query: str, lexical_hits: List[Tuple[Document, float]]) -> bool:
+        """O BM25 basta quando a consulta é feita de termos que o melhor chunk contém
+
+        Exige pelo menos LEXICAL_FAST_PATH_MIN_TERMS termos, pontuação mínima
+        e que a fração de termos presentes no melhor chunk atinja
+        LEXICAL_FAST_PATH_MIN_COVERAGE.
+        """
+        if not lexical_hits or not getattr(self.config, 'LEXICAL_FAST_PATH', False):
+            return False
+        terms = set(tokenize(query))
+        if len(terms) < getattr(self.config, 'LEXICAL_FAST_PATH_MIN_TERMS', 2):
+            return False
+        top_doc, top_score = lexical_hits[0]
+        if top_score < getattr(self.config, 'LEXICAL_FAST_PATH_MIN_SCORE', 5.0):
+            return False
+        matched = set(tokenize(top_doc.page_content))
+        coverage = sum(1 for term in terms if term in matched) / len(terms)
+        return coverage >= getattr(self.config, 'LEXICAL_FAST_PATH_MIN_COVERAGE', 1.0)
+
+    def fuse_results(self, dense_docs: List[Document], lexical_docs: List[Document], k: int) -> List[Document]:
+        """Combina as listas vetorial e léxica por Reciprocal Rank Fusion
+
+        Os chunks são identificados pelo conteúdo (mesmo hash usado como id
+        na ingestão), então um chunk presente nas duas listas soma as duas
+        contribuições.
+        """
+        rrf_k = getattr(self.config, 'HYBRID_RRF_K', 60)
+        weights = (1.0, getattr(self.config, 'HYBRID_LEXICAL_WEIGHT', 1.0))
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Document] = {}
+        for weight, ranked in zip(weights, (dense_docs, lexical_docs)):
+            for rank, doc in enumerate(ranked):
+                key = chunk_fingerprint(doc.metadata.get('source', ''), doc.page_content)
+                docs.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank + 1)
+        ranked_keys = sorted(scores, key=scores.get, reverse=True)
+        return [docs[key] for key in ranked_keys[:k]]
+
+    def _search(self, query: str, k: int) -> List[Document]:
+        vector = self.embed_query(query)
+        # Abandonada por timeout durante o encode: não consultar o índice
+        check_deadline()
+        return self.search_by_vectors([vector], k)[0]
+
+    def train_with_pdf(self, pdf_path: str, filename: str,
+                       progress_callback: Optional[Callable[[int, int, int], None]] = None) -> bool:
+        """Treina a IA com um novo PDF
+
+        progress_callback(páginas lidas, total de páginas, chunks gravados)
+        recebe o andamento da ingestão em streaming.
+        """
+        if self.read_only:
+            logger.error(
+                f"Treinamento de {filename} recusado: processo somente leitura (use o worker de ingestão)")
+            return False
+
         try:
             logger.info(f"=== INICIANDO TREINAMENTO: {filename} ===")
             start_time = time.time()
@@ -260,15 +1005,27 @@ class PDFProcessor:
             if file_size > 50 * 1024 * 1024:  # 50MB
                 logger.warning("Arquivo muito grande, pode causar problemas")
 
-            # Processar PDF
-            documents = self.process_pdf(pdf_path, filename)
+            # Arquivo idêntico a um já treinado: nada a fazer
+            file_hash = file_fingerprint(pdf_path)
+            if self.db is not None:
+                duplicate = self.db.find_pdf_by_hash(file_hash)
+                if duplicate is not None:
+                    logger.info(
+                        f"Conteúdo idêntico a {duplicate['filename']} já treinado - ignorando {filename}")
+                    return True
 
-            if not documents:
-                logger.error(f"Nenhum documento processado para {filename}")
-                return False
+            if getattr(self.config, 'INGEST_STREAMING', False):
+                success = self._train_streaming(
+                    pdf_path, filename, progress_callback)
+            else:
+                success = self._train_documents(pdf_path, filename)
 
-            # Adicionar ao vectorstore
-            success = self.add_documents_to_vectorstore(documents)
+            if success:
+                self.bump_index_version()
+                if self.db is not None:
+                    # Contagem real no vectorstore (vale para os dois pipelines)
+                    self.db.log_pdf_upload(filename, pdf_path, file_hash,
+                                           chunk_count=len(self._existing_chunk_ids(filename)))
 
             end_time = time.time()
             duration = end_time - start_time
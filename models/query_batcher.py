@@ -0,0 +1,115 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import List, Optional
+from utils.executors import Deadline, DeadlineExceeded, ExecutorOverloaded
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBatcher:
+    """Agrupa buscas concorrentes em uma única passada do modelo
+
+    As perguntas que chegam dentro de uma janela de poucos milissegundos
+    (ou enquanto o lote anterior está sendo processado) são vetorizadas
+    juntas e consultadas no vectorstore em uma só chamada; cada chamador
+    recebe apenas o seu resultado.
+    """
+
+    def __init__(self, processor, window_ms: float = 2, max_batch: int = 32, max_pending: int = 256):
+        self.processor = processor
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.queries = 0
+
+    def _ensure_thread(self):
+        # A thread não sobrevive a um fork: recriar no processo filho
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._thread = threading.Thread(
+                    target=self._loop, name='unibot-query-batcher', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def search(self, query: str, k: int, deadline: Optional[Deadline] = None) -> List:
+        """Enfileira uma busca e espera pelo resultado dentro do prazo"""
+        self._ensure_thread()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((query, k, deadline, future))
+        except queue.Full:
+            raise ExecutorOverloaded("Fila de buscas cheia")
+
+        try:
+            return future.result(
+                timeout=deadline.remaining() if deadline is not None else None)
+        except FuturesTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("Busca excedeu o prazo")
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            window_end = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = window_end - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # Janela encerrada: levar só o que já está na fila
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        # Descartar chamadores que desistiram ou cujo prazo acabou
+        active = []
+        for query, k, deadline, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            if deadline is not None and deadline.expired():
+                future.set_exception(DeadlineExceeded("Prazo esgotado na fila"))
+                continue
+            active.append((query, k, future))
+
+        if not active:
+            return
+
+        try:
+            vectors = self.processor.embed_queries([query for query, _, _ in active])
+            max_k = max(k for _, k, _ in active)
+            results = self.processor.search_by_vectors(vectors, max_k)
+        except Exception as e:
+            for _, _, future in active:
+                future.set_exception(e)
+            return
+
+        for (_, k, future), docs in zip(active, results):
+            future.set_result(docs[:k])
+
+        self.batches += 1
+        self.queries += len(active)
+        if len(active) > 1:
+            logger.debug(f"Lote de {len(active)} buscas processado")
+
+    def get_stats(self):
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'avg_batch_size': round(self.queries / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,73 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s$]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza uma pergunta para uso como chave de cache
+
+    "Qual o valor da mensalidade?" e "qual o valor  da mensalidade" geram a
+    mesma chave.
+    """
+    text = unicodedata.normalize('NFC', question).casefold()
+    text = _PUNCTUATION_RE.sub(' ', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class TTLCache:
+    """Cache LRU em memória com expiração (TTL) e contadores de acerto
+
+    Cada entrada guarda a versão com que foi criada; uma leitura com outra
+    versão é tratada como miss e descarta a entrada. Assim basta mudar a
+    versão (por exemplo, a do índice) para invalidar tudo de uma vez.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Any]:
+        """Retorna o valor em cache ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, expires_at = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, version: Any = None):
+        with self._lock:
+            self._entries[key] = (value, version, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
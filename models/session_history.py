@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Hashable, List
+
+
+class SessionHistoryStore:
+    """Histórico de conversa por sessão, com memória limitada
+
+    Cada sessão guarda as últimas max_turns interações em um deque de
+    tamanho fixo (anexar é O(1) e descarta a mais antiga). As sessões ficam
+    em ordem de uso: as paradas há mais de idle_seconds e, acima de
+    max_sessions, as usadas há mais tempo são descartadas primeiro, então
+    a memória total fica limitada a max_sessions × max_turns interações.
+    """
+
+    def __init__(self, max_turns: int = 10, max_sessions: int = 10000, idle_seconds: float = 1800):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.evicted = 0
+        # sessão -> (deque de interações, último uso)
+        self._sessions: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        """Descarta sessões ociosas e as excedentes (as do início são as mais antigas)"""
+        sessions = self._sessions
+        while sessions:
+            session_id, (_, last_used) = next(iter(sessions.items()))
+            if len(sessions) <= self.max_sessions and now - last_used <= self.idle_seconds:
+                break
+            del sessions[session_id]
+            self.evicted += 1
+
+    def add(self, session_id: Hashable, question: str, response: str):
+        now = time.monotonic()
+        turn = {
+            'question': question,
+            'response': response,
+            'timestamp': datetime.now().isoformat()
+        }
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            turns = entry[0] if entry is not None else deque(maxlen=self.max_turns)
+            turns.append(turn)
+            self._sessions[session_id] = (turns, now)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def get(self, session_id: Hashable) -> List[Dict]:
+        """Interações da sessão, da mais antiga para a mais recente"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or time.monotonic() - entry[1] > self.idle_seconds:
+                return []
+            return list(entry[0])
+
+    def clear(self, session_id: Hashable):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear_all(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._evict(time.monotonic())
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'turns': sum(len(turns) for turns, _ in self._sessions.values()),
+                'max_turns_per_session': self.max_turns,
+                'evicted': self.evicted
+            }
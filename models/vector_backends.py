@@ -0,0 +1,390 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Tuple
+from langchain.docstore.document import Document
+
+logger = logging.getLogger(__name__)
+
+# (texto, metadados) de cada resultado de busca
+SearchHit = Tuple[str, Dict]
+
+
+class VectorBackend:
+    """Interface do índice vetorial usado pelo PDFProcessor
+
+    Os vetores chegam já calculados (e normalizados) pelo modelo de
+    embeddings; o backend só guarda, busca e remove chunks por id.
+    """
+
+    name = 'base'
+    # Máximo de itens por upsert (0 = sem limite)
+    max_batch_size = 0
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[Dict],
+               embeddings: List[List[float]]):
+        raise NotImplementedError
+
+    def add_documents(self, documents: List[Document], ids: List[str]):
+        """Vetoriza e grava documentos com o modelo do backend (caminho legado)
+
+        Mesmos ids do upsert: gravar de novo um chunk o substitui.
+        """
+        raise NotImplementedError
+
+    def ids_for_source(self, source: str) -> List[str]:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def all_chunks(self) -> Tuple[List[str], List[str], List[Dict]]:
+        """Ids, textos e metadados de todos os chunks (para reconstruir índices)"""
+        raise NotImplementedError
+
+    def query(self, vectors: List[List[float]], k: int) -> List[List[SearchHit]]:
+        raise NotImplementedError
+
+    def persist(self):
+        pass
+
+    def close(self):
+        """Libera o índice antes de recarregá-lo do disco"""
+        pass
+
+
+class ChromaBackend(VectorBackend):
+    """Coleção do Chroma (HNSW persistido em data/vectorstore)"""
+
+    name = 'chroma'
+
+    def __init__(self, persist_directory: str, embedding_function, collection_name: str = "unibot_docs"):
+        from langchain_community.vectorstores import Chroma
+
+        self.vectorstore = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embedding_function,
+            collection_name=collection_name
+        )
+        self._collection = self.vectorstore._collection
+        self.max_batch_size = getattr(
+            getattr(self.vectorstore, '_client', None), 'max_batch_size', 0) or 0
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids, texts, metadatas, embeddings):
+        self._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas
+        )
+
+    def add_documents(self, documents, ids):
+        # Com ids, o Chroma do langchain grava com upsert
+        self.vectorstore.add_documents(documents, ids=ids)
+
+    def ids_for_source(self, source):
+        result = self._collection.get(where={"source": source}, include=[])
+        return result.get('ids', [])
+
+    def delete(self, ids):
+        if ids:
+            self._collection.delete(ids=ids)
+
+    def all_chunks(self):
+        result = self._collection.get(include=['documents', 'metadatas'])
+        return (result['ids'], result['documents'],
+                [metadata or {} for metadata in result['metadatas']])
+
+    def query(self, vectors, k):
+        result = self._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            include=['documents', 'metadatas']
+        )
+        return [
+            [(text, metadata or {}) for text, metadata in zip(texts, metadatas)]
+            for texts, metadatas in zip(result['documents'], result['metadatas'])
+        ]
+
+    def persist(self):
+        self.vectorstore.persist()
+
+    def close(self):
+        # O cliente do Chroma mantém o índice em memória e não enxerga
+        # gravações feitas por outros processos
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except Exception as e:
+            logger.warning(f"Não foi possível limpar o cache do Chroma: {str(e)}")
+
+
+class NumpyBackend(VectorBackend):
+    """Índice exato em memória: matriz de vetores normalizados + matmul
+
+    Os vetores ficam em vectors.npy (float32 ou float16), aberto com
+    memory-map, e os textos/metadados em records.json. A busca é um único
+    produto matricial seguido de argpartition, o que para alguns milhares
+    de chunks é mais rápido que o HNSW e dá recall de 100%.
+
+    As gravações montam uma nova matriz e só vão para o disco em persist():
+    cada versão é gravada em um diretório próprio e publicada trocando o
+    arquivo CURRENT (um único os.replace), então outro processo lendo o
+    índice nunca junta vetores de uma versão com registros de outra. Em
+    memória as buscas também sempre leem um estado completo (a troca do
+    estado é uma única atribuição).
+    """
+
+    name = 'numpy'
+    VECTORS_FILE = 'vectors.npy'
+    RECORDS_FILE = 'records.json'
+    # Nome do diretório da versão publicada
+    CURRENT_FILE = 'CURRENT'
+    # Versões mantidas no disco: a anterior ainda pode estar sendo aberta
+    KEEP_VERSIONS = 2
+    # Linhas convertidas para float32 por vez quando a matriz é float16
+    SCORE_BLOCK_ROWS = 65536
+
+    def __init__(self, path: str, embedding_function=None, dtype: str = 'float32'):
+        import numpy as np
+
+        self.np = np
+        self.path = path
+        self.embedding_function = embedding_function
+        self.dtype = np.dtype(dtype)
+        self._write_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._state = self._load()
+
+    def _current_directory(self) -> str:
+        """Diretório da versão publicada (ou a raiz, no formato antigo)"""
+        try:
+            with open(os.path.join(self.path, self.CURRENT_FILE), 'r') as file:
+                version = file.read().strip()
+        except FileNotFoundError:
+            return self.path
+        return os.path.join(self.path, version) if version else self.path
+
+    def _load(self):
+        np = self.np
+        directory = self._current_directory()
+        vectors_path = os.path.join(directory, self.VECTORS_FILE)
+        records_path = os.path.join(directory, self.RECORDS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            return self._make_state(None, [], [], [])
+
+        with open(records_path, 'r', encoding='utf-8') as file:
+            records = json.load(file)
+        matrix = np.load(vectors_path, mmap_mode='r')
+        if matrix.shape[0] != len(records['ids']):
+            raise ValueError(
+                f"Índice numpy inconsistente: {matrix.shape[0]} vetores e {len(records['ids'])} registros")
+        return self._make_state(
+            matrix, records['ids'], records['texts'], records['metadatas'])
+
+    def _make_state(self, matrix, ids, texts, metadatas):
+        return {
+            'matrix': matrix,
+            'ids': ids,
+            'texts': texts,
+            'metadatas': metadatas,
+            'positions': {chunk_id: i for i, chunk_id in enumerate(ids)}
+        }
+
+    def _normalize(self, vectors):
+        np = self.np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.clip(norms, 1e-12, None)
+
+    def count(self) -> int:
+        return len(self._state['ids'])
+
+    def upsert(self, ids, texts, metadatas, embeddings):
+        np = self.np
+        if not ids:
+            return
+        new_rows = self._normalize(embeddings).astype(self.dtype)
+
+        with self._write_lock:
+            state = self._state
+            matrix = state['matrix']
+            all_ids = list(state['ids'])
+            all_texts = list(state['texts'])
+            all_metadatas = list(state['metadatas'])
+            positions = dict(state['positions'])
+
+            replace_rows, replace_at, append_rows = [], [], []
+            for i, chunk_id in enumerate(ids):
+                position = positions.get(chunk_id)
+                if position is None:
+                    positions[chunk_id] = len(all_ids)
+                    all_ids.append(chunk_id)
+                    all_texts.append(texts[i])
+                    all_metadatas.append(metadatas[i] or {})
+                    append_rows.append(i)
+                else:
+                    all_texts[position] = texts[i]
+                    all_metadatas[position] = metadatas[i] or {}
+                    replace_rows.append(i)
+                    replace_at.append(position)
+
+            if matrix is None:
+                matrix = np.empty((0, new_rows.shape[1]), dtype=self.dtype)
+            # Cópia em memória: a matriz carregada é um memmap somente leitura
+            matrix = np.concatenate([matrix, new_rows[append_rows]])
+            if replace_rows:
+                matrix[replace_at] = new_rows[replace_rows]
+
+            self._state = self._make_state(matrix, all_ids, all_texts, all_metadatas)
+
+    def add_documents(self, documents, ids):
+        if self.embedding_function is None:
+            raise ValueError("Backend numpy sem modelo de embeddings")
+        texts = [doc.page_content for doc in documents]
+        self.upsert(
+            ids,
+            texts,
+            [doc.metadata for doc in documents],
+            self.embedding_function.embed_documents(texts)
+        )
+
+    def ids_for_source(self, source):
+        state = self._state
+        return [
+            chunk_id for chunk_id, metadata in zip(state['ids'], state['metadatas'])
+            if metadata.get('source') == source
+        ]
+
+    def delete(self, ids):
+        np = self.np
+        if not ids:
+            return
+        with self._write_lock:
+            state = self._state
+            remove = {state['positions'][chunk_id] for chunk_id in ids if chunk_id in state['positions']}
+            if not remove:
+                return
+            keep = [i for i in range(len(state['ids'])) if i not in remove]
+            self._state = self._make_state(
+                np.asarray(state['matrix'])[keep],
+                [state['ids'][i] for i in keep],
+                [state['texts'][i] for i in keep],
+                [state['metadatas'][i] for i in keep]
+            )
+
+    def all_chunks(self):
+        state = self._state
+        return list(state['ids']), list(state['texts']), list(state['metadatas'])
+
+    def _scores(self, queries, matrix):
+        """Similaridade de cosseno entre consultas (normalizadas) e a matriz"""
+        np = self.np
+        if matrix.dtype == np.float32:
+            return queries @ matrix.T
+        # float16: converter em blocos para usar o BLAS sem duplicar a matriz
+        result = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.SCORE_BLOCK_ROWS):
+            block = matrix[start:start + self.SCORE_BLOCK_ROWS].astype(np.float32)
+            result[:, start:start + block.shape[0]] = queries @ block.T
+        return result
+
+    def query(self, vectors, k):
+        np = self.np
+        state = self._state
+        matrix = state['matrix']
+        total = len(state['ids'])
+        if matrix is None or total == 0 or k <= 0:
+            return [[] for _ in vectors]
+
+        scores = self._scores(self._normalize(vectors), matrix)
+        k = min(k, total)
+        if k < total:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(total), (scores.shape[0], 1))
+        # Ordenar só os k melhores de cada consulta
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+
+        return [
+            [(state['texts'][i], state['metadatas'][i]) for i in row]
+            for row in top.tolist()
+        ]
+
+    def persist(self):
+        np = self.np
+        with self._write_lock:
+            state = self._state
+            matrix = state['matrix']
+            if matrix is None:
+                return
+            version = f"v{time.time_ns()}"
+            directory = os.path.join(self.path, version)
+            os.makedirs(directory)
+
+            with open(os.path.join(directory, self.VECTORS_FILE), 'wb') as file:
+                np.save(file, np.ascontiguousarray(matrix, dtype=self.dtype))
+            with open(os.path.join(directory, self.RECORDS_FILE), 'w', encoding='utf-8') as file:
+                json.dump({
+                    'ids': state['ids'],
+                    'texts': state['texts'],
+                    'metadatas': state['metadatas']
+                }, file, ensure_ascii=False)
+
+            # Publicar a versão completa de uma vez
+            current_path = os.path.join(self.path, self.CURRENT_FILE)
+            with open(current_path + '.tmp', 'w') as file:
+                file.write(version)
+            os.replace(current_path + '.tmp', current_path)
+            self._remove_old_versions()
+
+    def _remove_old_versions(self):
+        """Apaga as versões antigas, mantendo as KEEP_VERSIONS mais recentes"""
+        versions = sorted(
+            (name for name in os.listdir(self.path)
+             if name.startswith('v') and name[1:].isdigit()),
+            key=lambda name: int(name[1:]))
+        for name in versions[:-self.KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        # Arquivos do formato antigo (um par na raiz), já substituídos
+        for name in (self.VECTORS_FILE, self.RECORDS_FILE):
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        self._state = self._make_state(None, [], [], [])
+
+
+def create_vector_backend(config, embedding_function) -> VectorBackend:
+    """Cria o índice vetorial escolhido em Config.VECTOR_BACKEND"""
+    backend = getattr(config, 'VECTOR_BACKEND', 'chroma')
+
+    if backend == 'chroma':
+        return ChromaBackend(config.VECTORSTORE_PATH, embedding_function)
+
+    if backend == 'numpy':
+        return NumpyBackend(
+            getattr(config, 'NUMPY_INDEX_PATH', os.path.join(config.VECTORSTORE_PATH, 'numpy')),
+            embedding_function,
+            dtype=getattr(config, 'NUMPY_INDEX_DTYPE', 'float32')
+        )
+
+    raise ValueError(f"Backend vetorial desconhecido: {backend}")
+
+
+def hits_to_documents(hits: List[SearchHit]) -> List[Document]:
+    return [Document(page_content=text, metadata=metadata) for text, metadata in hits]
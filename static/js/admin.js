@@ -118,17 +118,25 @@ class UnibotAdmin {
 
       if (result.success) {
         this.showAlert(
-          `${result.uploaded_files.length} arquivo(s) processado(s) com sucesso!`,
-          "success"
+          `${result.uploaded_files.length} arquivo(s) enviado(s). Treinamento em andamento...`,
+          "info"
         );
 
         // Reset form
         fileInput.value = "";
         document.getElementById("fileList").style.display = "none";
 
-        // Reload data
-        this.loadStats();
-        this.loadTrainedDocs();
+        // Acompanhar o treinamento de cada arquivo
+        result.jobs.forEach((job) => {
+          if (job.job_id) {
+            this.trackJob(job);
+          } else {
+            this.showAlert(
+              `Erro ao enviar ${job.filename}: ${job.error}`,
+              "error"
+            );
+          }
+        });
       } else {
         this.showAlert(result.error || "Erro ao processar arquivos.", "error");
       }
@@ -143,6 +151,73 @@ class UnibotAdmin {
       '<i class="fas fa-upload"></i> Fazer Upload e Treinar IA';
   }
 
+  trackJob(job) {
+    const jobList = document.getElementById("jobList");
+    const item = document.createElement("div");
+    item.className = "job-item";
+    item.innerHTML = `
+            <div class="job-info">
+                <i class="fas fa-spinner fa-spin"></i>
+                <strong>${job.filename}</strong>
+                <small class="job-status">Na fila...</small>
+            </div>
+            <div class="job-progress"><div class="job-progress-bar"></div></div>
+        `;
+    jobList.appendChild(item);
+
+    this.pollJob(job.job_id, item);
+  }
+
+  async pollJob(jobId, item) {
+    try {
+      const response = await fetch(`/jobs/${jobId}`);
+      const result = await response.json();
+
+      if (!result.success) {
+        item.querySelector(".job-status").textContent =
+          result.error || "Job não encontrado";
+        return;
+      }
+
+      const job = result.job;
+      item.querySelector(".job-progress-bar").style.width = `${job.progress}%`;
+      item.querySelector(".job-status").textContent = this.formatJobStatus(job);
+
+      if (job.status === "done") {
+        item.querySelector("i").className = "fas fa-check-circle";
+        this.showAlert(`${job.filename} treinado com sucesso!`, "success");
+        this.loadStats();
+        this.loadTrainedDocs();
+        return;
+      }
+
+      if (job.status === "failed") {
+        item.querySelector("i").className = "fas fa-exclamation-circle";
+        item.classList.add("failed");
+        this.showAlert(`Falha no treinamento de ${job.filename}.`, "error");
+        return;
+      }
+    } catch (error) {
+      console.error("Erro ao consultar job:", error);
+    }
+
+    setTimeout(() => this.pollJob(jobId, item), 1500);
+  }
+
+  formatJobStatus(job) {
+    if (job.status === "queued") return "Na fila...";
+    if (job.status === "failed") return job.error || "Falha no treinamento";
+    if (job.status === "done") {
+      return `Concluído: ${job.pages_total} páginas, ${job.chunks_embedded} chunks novos`;
+    }
+
+    let text = `${job.pages_done}/${job.pages_total} páginas · ${job.chunks_embedded} chunks`;
+    if (job.eta_seconds !== null) {
+      text += ` · restam ~${Math.ceil(job.eta_seconds)}s`;
+    }
+    return text;
+  }
+
   async loadStats() {
     try {
       const response = await fetch("/stats");
@@ -155,6 +230,10 @@ class UnibotAdmin {
           result.stats.total_questions;
         document.getElementById("totalChunks").textContent =
           result.stats.total_chunks;
+        // Sem "cache" enquanto o modelo carrega
+        document.getElementById("cacheHitRatio").textContent = result.stats.cache
+          ? `${Math.round(result.stats.cache.responses.hit_ratio * 100)}%`
+          : "—";
       }
     } catch (error) {
       console.error("Erro ao carregar estatísticas:", error);
@@ -181,7 +260,11 @@ class UnibotAdmin {
                                         <strong>${doc.filename}</strong>
                                         <small>Carregado em: ${this.formatDate(
                                           doc.upload_date
-                                        )}</small>
+                                        )}${
+                              doc.chunk_count != null
+                                ? ` · ${doc.chunk_count} chunks`
+                                : ""
+                            }</small>
                                     </div>
                                 </div>
                                 <span class="doc-status ${doc.status}">${
@@ -221,6 +304,8 @@ class UnibotAdmin {
     try {
       const response = await fetch("/clear-history", {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ all: true }),
       });
 
       const result = await response.json();
@@ -392,6 +477,51 @@ style.textContent = `
         color: #22543d;
     }
 
+    .job-list {
+        display: flex;
+        flex-direction: column;
+        gap: 10px;
+        margin-top: 15px;
+    }
+
+    .job-item {
+        padding: 12px 15px;
+        background: rgba(102, 126, 234, 0.05);
+        border-radius: 8px;
+        border-left: 4px solid #667eea;
+    }
+
+    .job-item.failed {
+        border-left-color: #e53e3e;
+    }
+
+    .job-info {
+        display: flex;
+        align-items: center;
+        gap: 10px;
+        color: #4a5568;
+    }
+
+    .job-info small {
+        color: #718096;
+        margin-left: auto;
+    }
+
+    .job-progress {
+        height: 6px;
+        margin-top: 8px;
+        background: #e2e8f0;
+        border-radius: 3px;
+        overflow: hidden;
+    }
+
+    .job-progress-bar {
+        width: 0;
+        height: 100%;
+        background: #667eea;
+        transition: width 0.3s ease;
+    }
+
     .empty-state, .error-state {
         text-align: center;
         padding: 40px;
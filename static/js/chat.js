@@ -4,6 +4,7 @@ class UnibotChat {
     this.sendButton = document.getElementById("sendButton");
     this.chatMessages = document.getElementById("chatMessages");
     this.typingIndicator = document.getElementById("typingIndicator");
+    this.typingStatus = document.getElementById("typingStatus");
     this.charCount = document.getElementById("charCount");
 
     this.initializeEventListeners();
@@ -60,25 +61,7 @@ class UnibotChat {
     this.showTypingIndicator();
 
     try {
-      // Send to backend
-      const response = await fetch("/chat", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ message: message }),
-      });
-
-      const data = await response.json();
-
-      // Hide typing indicator
-      this.hideTypingIndicator();
-
-      if (data.success) {
-        this.addMessage(data.response, "bot");
-      } else {
-        this.addMessage("Desculpe, ocorreu um erro. Tente novamente.", "bot");
-      }
+      await this.streamResponse(message);
     } catch (error) {
       console.error("Erro ao enviar mensagem:", error);
       this.hideTypingIndicator();
@@ -92,6 +75,95 @@ class UnibotChat {
     this.setInputState(true);
   }
 
+  async streamResponse(message) {
+    // Send to backend - response arrives as Server-Sent Events
+    const response = await fetch("/chat/stream", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ message: message }),
+    });
+
+    const contentType = response.headers.get("Content-Type") || "";
+    if (!response.body || !contentType.includes("text/event-stream")) {
+      // Empty message, model still loading (503) etc.: plain JSON
+      const data = await response.json();
+      this.hideTypingIndicator();
+      this.addMessage(
+        data.success ? data.response : data.error || "Desculpe, ocorreu um erro. Tente novamente.",
+        "bot"
+      );
+      return;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+    let sources = [];
+    let bubble = null;
+
+    const handleEvent = (event, data) => {
+      if (event === "status") {
+        this.setTypingStatus(
+          data.stage === "searching"
+            ? "Buscando nos documentos..."
+            : "Unibot está digitando..."
+        );
+      } else if (event === "sources") {
+        sources = data.sources;
+        this.setTypingStatus(`Consultando: ${sources.join(", ")}`);
+      } else if (event === "delta") {
+        if (!bubble) {
+          this.hideTypingIndicator();
+          bubble = this.addMessage("", "bot");
+        }
+        text += data.text;
+        this.updateMessage(bubble, text, sources);
+      } else if (event === "error") {
+        this.hideTypingIndicator();
+        bubble = bubble || this.addMessage("", "bot");
+        this.updateMessage(bubble, "Desculpe, ocorreu um erro. Tente novamente.", []);
+      }
+    };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        if (data) handleEvent(event, JSON.parse(data));
+      }
+    }
+
+    if (!bubble) {
+      this.hideTypingIndicator();
+      this.addMessage("Desculpe, ocorreu um erro. Tente novamente.", "bot");
+    }
+  }
+
+  updateMessage(messageDiv, text, sources) {
+    messageDiv.querySelector(".text").innerHTML = this.formatMessage(text);
+    if (sources.length) {
+      messageDiv.querySelector(".timestamp").textContent =
+        `${this.getCurrentTimestamp()} · Fontes: ${sources.join(", ")}`;
+    }
+    this.scrollToBottom();
+  }
+
   addMessage(text, sender) {
     const messageDiv = document.createElement("div");
     messageDiv.className = `message ${sender}-message`;
@@ -109,6 +181,7 @@ class UnibotChat {
 
     this.chatMessages.appendChild(messageDiv);
     this.scrollToBottom();
+    return messageDiv;
   }
 
   formatMessage(text) {
@@ -123,10 +196,17 @@ class UnibotChat {
   }
 
   showTypingIndicator() {
+    this.setTypingStatus("Unibot está digitando...");
     this.typingIndicator.style.display = "flex";
     this.scrollToBottom();
   }
 
+  setTypingStatus(text) {
+    if (this.typingStatus) {
+      this.typingStatus.textContent = text;
+    }
+  }
+
   hideTypingIndicator() {
     this.typingIndicator.style.display = "none";
   }
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from models.ai_model import UnibotAI  # noqa: E402
+from models.intent_router import IntentRouter  # noqa: E402
+from models.query_cache import TTLCache  # noqa: E402
+from models.session_history import SessionHistoryStore  # noqa: E402
+
+
+class StubPDFProcessor:
+    """O que o UnibotAI usa do PDFProcessor, com documentos fixos por pergunta
+
+    Um valor Exception em documents faz a busca levantar a exceção.
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.vectorstore = object()
+        self.searches = []
+
+    def current_index_version(self):
+        return '1'
+
+    def _documents(self, question):
+        result = self.documents.get(question, [])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def search_similar_documents(self, query, k=3, deadline=None):
+        self.searches.append([query])
+        return self._documents(query)
+
+    def search_similar_documents_batch(self, queries, k=3, deadline=None):
+        self.searches.append(list(queries))
+        return [self._documents(query) for query in queries]
+
+
+@pytest.fixture
+def make_unibot_ai():
+    """UnibotAI sem modelo: caches, histórico e roteador reais, busca de StubPDFProcessor"""
+
+    def make(documents, db=None):
+        unibot_ai = UnibotAI.__new__(UnibotAI)
+        unibot_ai.config = Config()
+        unibot_ai.db = db
+        unibot_ai.pdf_processor = StubPDFProcessor(documents)
+        unibot_ai.intent_router = IntentRouter(Config.INTENT_KEYWORDS)
+        unibot_ai.response_cache = TTLCache()
+        unibot_ai.history = SessionHistoryStore()
+        return unibot_ai
+
+    return make
@@ -0,0 +1,67 @@
+from langchain.docstore.document import Document
+
+from config import Config
+from models.ai_model import batch_responses
+from models.intent_router import IntentRouter
+from utils.executors import ExecutorOverloaded
+
+
+def _doc(text, source='guia.pdf'):
+    return Document(page_content=text, metadata={'source': source})
+
+
+def test_generate_responses_searches_duplicates_once(make_unibot_ai):
+    unibot_ai = make_unibot_ai({
+        'Onde fica a biblioteca?': [_doc("A biblioteca fica no bloco B.")],
+        'Qual o horário da cantina?': [],
+    })
+
+    results = unibot_ai.generate_responses([
+        'Onde fica a biblioteca?', 'onde fica a  biblioteca', 'Qual o horário da cantina?'])
+
+    # Uma única busca em lote, sem a pergunta repetida
+    assert unibot_ai.pdf_processor.searches == [['Onde fica a biblioteca?', 'Qual o horário da cantina?']]
+    assert results[0] == results[1]
+    assert results[0]['success'] and results[0]['origin'] == 'documents'
+    assert results[0]['sources'] == ['guia.pdf']
+    assert results[2]['origin'] == 'fallback' and results[2]['sources'] == []
+
+    # A segunda chamada vem toda do cache
+    again = unibot_ai.generate_responses(['Onde fica a biblioteca?'])
+    assert again[0]['origin'] == 'cache'
+    assert again[0]['response'] == results[0]['response']
+    assert len(unibot_ai.pdf_processor.searches) == 1
+
+
+def test_generate_responses_reports_errors_per_item(make_unibot_ai):
+    unibot_ai = make_unibot_ai({
+        'Onde fica a biblioteca?': [_doc("A biblioteca fica no bloco B.")],
+        # Documento inválido: só esta pergunta falha
+        'Pergunta quebrada': [None],
+    })
+
+    results = unibot_ai.generate_responses(['Onde fica a biblioteca?', '  ', 42, 'Pergunta quebrada'])
+
+    assert results[0]['success']
+    assert results[1] == {'success': False, 'error': 'Pergunta vazia'}
+    assert results[2] == {'success': False, 'error': 'Pergunta vazia'}
+    assert results[3] == {'success': False, 'error': 'Erro ao processar a pergunta'}
+
+
+def test_failed_batch_search_fails_only_the_searched_questions(make_unibot_ai):
+    unibot_ai = make_unibot_ai({'Onde fica a biblioteca?': [_doc("A biblioteca fica no bloco B.")]})
+    unibot_ai.generate_responses(['Onde fica a biblioteca?'])
+    unibot_ai.pdf_processor.documents['Qual o horário da cantina?'] = ExecutorOverloaded()
+
+    results = unibot_ai.generate_responses(['Onde fica a biblioteca?', 'Qual o horário da cantina?'])
+
+    assert results[0]['origin'] == 'cache'
+    assert results[1] == {'success': False, 'error': 'Servidor sobrecarregado'}
+
+
+def test_batch_responses_while_loading_uses_fallback():
+    results = batch_responses(None, IntentRouter(Config.INTENT_KEYWORDS),
+                              ['Qual o valor da mensalidade?', ''], timeout=1)
+
+    assert results[0]['success'] and results[0]['origin'] == 'loading'
+    assert results[1] == {'success': False, 'error': 'Pergunta vazia'}
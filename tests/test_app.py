@@ -0,0 +1,84 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain.docstore.document import Document
+
+import app as app_module
+from utils.executors import DeadlineExceeded
+
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """Cliente do app Flask com um UnibotAI de teste no lugar do modelo"""
+    monkeypatch.chdir(tmp_path)
+
+    def make(unibot_ai):
+        monkeypatch.setattr(app_module, 'load_unibot_ai', lambda loader, config, db, warm_up=True: unibot_ai)
+        flask_app = app_module.create_app(preload=True)
+        flask_app.testing = True
+        return flask_app.test_client()
+
+    yield make
+
+
+def test_readyz_needs_the_vectorstore(make_client):
+    """Modelo carregado sem vectorstore não está pronto para receber tráfego"""
+    client = make_client(SimpleNamespace(pdf_processor=SimpleNamespace(vectorstore=None)))
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['vectorstore'] is False
+
+
+def test_readyz_with_model_and_vectorstore(make_client):
+    client = make_client(SimpleNamespace(pdf_processor=SimpleNamespace(vectorstore=object())))
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()['vectorstore'] is True
+
+
+def _sse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_chat_stream_event_order(make_client, make_unibot_ai):
+    unibot_ai = make_unibot_ai({
+        'Onde fica a biblioteca?': [Document(page_content="A biblioteca fica no bloco B.",
+                                             metadata={'source': 'guia.pdf'})]
+    })
+    client = make_client(unibot_ai)
+
+    response = client.post('/chat/stream', json={'message': 'Onde fica a biblioteca?'})
+    assert response.mimetype == 'text/event-stream'
+    events = _sse_events(response.get_data(as_text=True))
+
+    names = [event for event, _ in events]
+    assert names[:3] == ['status', 'status', 'sources']
+    assert set(names[3:-1]) == {'delta'} and len(names) > 4
+    assert names[-1] == 'done'
+    assert events[0][1] == {'stage': 'received', 'loading': False}
+    assert events[1][1] == {'stage': 'searching'}
+    assert events[2][1] == {'sources': ['guia.pdf']}
+    assert events[-1][1] == {'origin': 'documents'}
+    text = ''.join(data['text'] for event, data in events if event == 'delta')
+    assert 'A biblioteca fica no bloco B.' in text
+
+    # A mesma pergunta vem do cache: sem busca, mesma resposta
+    events = _sse_events(client.post('/chat/stream', json={'message': 'Onde fica a biblioteca?'})
+                         .get_data(as_text=True))
+    assert [event for event, _ in events][:2] == ['status', 'sources']
+    assert events[-1][1] == {'origin': 'cache'}
+    assert ''.join(data['text'] for event, data in events if event == 'delta') == text
+    assert len(unibot_ai.pdf_processor.searches) == 1
+
+
+def test_chat_stream_reports_search_errors_before_done(make_client, make_unibot_ai):
+    client = make_client(make_unibot_ai({'Pergunta?': DeadlineExceeded()}))
+    events = _sse_events(client.post('/chat/stream', json={'message': 'Pergunta?'}).get_data(as_text=True))
+
+    assert [event for event, _ in events] == ['status', 'status', 'delta', 'done']
+    assert events[-1][1] == {'origin': 'timeout'}
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+from utils.database import Database
+
+
+def _running_job(db, filename, worker_pid):
+    job_id = db.create_ingest_job(filename, f'/tmp/{filename}')
+    with db._connection() as conn:
+        conn.execute(
+            "UPDATE ingest_jobs SET status = 'running', worker_pid = ?, pages_done = 3 WHERE id = ?",
+            (worker_pid, job_id))
+    return job_id
+
+
+def test_requeue_only_jobs_of_dead_workers(tmp_path):
+    """Jobs de um worker ainda vivo não voltam à fila"""
+    db = Database(str(tmp_path / 'unibot.db'))
+    alive = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    try:
+        alive_job = _running_job(db, 'vivo.pdf', alive.pid)
+        dead_job = _running_job(db, 'morto.pdf', dead.pid)
+
+        assert db.requeue_stale_ingest_jobs() == 1
+    finally:
+        alive.kill()
+        alive.wait()
+
+    assert db.get_ingest_job(alive_job)['status'] == 'running'
+    assert db.get_ingest_job(alive_job)['pages_done'] == 3
+    requeued = db.get_ingest_job(dead_job)
+    assert requeued['status'] == 'queued'
+    assert requeued['pages_done'] == 0
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from utils.executors import (BoundedExecutor, Deadline, DeadlineExceeded, ExecutorOverloaded,
+                             check_deadline)
+
+
+def test_started_task_keeps_its_slot_until_it_finishes():
+    """O timeout libera o chamador, mas não a vaga de uma tarefa em execução"""
+    executor = BoundedExecutor('teste', max_workers=1, max_pending=0)
+    release = threading.Event()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            executor.run(release.wait, 5, deadline=Deadline(0.05))
+        # A tarefa abandonada continua rodando e ocupando a única vaga
+        with pytest.raises(ExecutorOverloaded):
+            executor.submit(time.sleep, 0)
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                assert executor.run(lambda: 'ok', deadline=Deadline(1)) == 'ok'
+                break
+            except ExecutorOverloaded:
+                time.sleep(0.01)
+        else:
+            pytest.fail("a vaga não voltou ao pool depois que a tarefa terminou")
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_started_task_stops_at_check_deadline():
+    """Uma tarefa abandonada que chama check_deadline termina logo e libera a vaga"""
+    executor = BoundedExecutor('teste', max_workers=1, max_pending=0)
+    steps = []
+
+    def work():
+        for step in range(100):
+            check_deadline()
+            steps.append(step)
+            time.sleep(0.01)
+
+    try:
+        with pytest.raises(DeadlineExceeded):
+            executor.run(work, deadline=Deadline(0.05))
+        time.sleep(0.1)
+        assert len(steps) < 20
+        assert executor.run(lambda: 'ok', deadline=Deadline(1)) == 'ok'
+    finally:
+        executor.shutdown()
+
+
+def test_check_deadline_outside_pool_does_nothing():
+    check_deadline()
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from models.fact_extractor import extract_facts
+from models.lexical_index import tokenize
+from utils.database import Database
+
+TABELA = (
+    "Graduação em Pedagogia Licenciatura 4 anos 50 X R$ 220,00 "
+    "Graduação em Matemática Licenciatura 4 anos 50 X R$ 240,00 "
+    "Taxa de rematrícula R$ 90,00. Cursos de Administração EAD e presencial."
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'unibot.db'))
+    database.add_chunk_facts([('chunk-1', 'precos.pdf', extract_facts(TABELA))])
+    return database
+
+
+def test_extract_facts():
+    facts = extract_facts(TABELA)
+
+    prices = facts['prices']
+    assert [price['amount'] for price in prices] == ['50 X R$ 220,00', '50 X R$ 240,00', 'R$ 90,00']
+    assert prices[0]['installments'] == 50
+    assert prices[0]['value'] == 220.0
+    assert prices[2]['label'].endswith('Taxa de rematrícula')
+    # Termos só do texto antes do valor, sem acentos
+    assert 'pedagogia' in prices[0]['terms']
+    assert 'matematica' not in prices[0]['terms']
+    assert 'rematricula' in prices[2]['terms']
+
+    assert ('Administração', 'administracao') in facts['courses']
+    assert set(facts['modalities']) == {'ead', 'presencial'}
+
+
+def test_find_prices_ranks_the_row_of_the_term_first(db):
+    prices = db.find_prices(['pedagogia'])
+    assert prices[0]['amount'] == '50 X R$ 220,00'
+    assert prices[0]['filename'] == 'precos.pdf'
+
+    prices = db.find_prices(tokenize('matemática'))
+    assert prices[0]['amount'] == '50 X R$ 240,00'
+    # O valor de Pedagogia vem antes de "Matemática" no texto
+    assert '50 X R$ 220,00' not in [price['amount'] for price in prices]
+
+
+def test_find_prices_needs_every_term_and_matches_word_prefixes(db):
+    assert db.find_prices(tokenize('rematrícula')) == db.find_prices(tokenize('rematric'))
+    assert [price['amount'] for price in db.find_prices(['taxa', 'matematica'])] == ['R$ 90,00']
+    assert db.find_prices(['taxa', 'pedagogia']) == []
+    # Termo no meio de uma palavra não casa
+    assert db.find_prices(['agogia']) == []
+    assert db.find_prices([]) == []
+
+
+def test_find_prices_uses_the_term_index(db):
+    with db._connection() as conn:
+        plan = ' '.join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM fact_prices WHERE id IN "
+            "(SELECT price_id FROM fact_price_terms WHERE term >= ? AND term < ?)",
+            ('pedagogia', 'pedagogia\U0010ffff')))
+    assert 'SEARCH fact_price_terms USING PRIMARY KEY' in plan
+
+
+def test_deleting_chunk_facts_removes_its_terms(db):
+    db.delete_chunk_facts(['chunk-1'])
+    assert db.find_prices(['pedagogia']) == []
+    with db._connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM fact_price_terms").fetchone()[0] == 0
+
+
+def test_facts_without_terms_are_cleared_for_reextraction(tmp_path):
+    """Banco anterior ao índice de termos: fatos são extraídos de novo"""
+    path = str(tmp_path / 'unibot.db')
+    Database(path).add_chunk_facts([('chunk-1', 'precos.pdf', extract_facts(TABELA))])
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE fact_price_terms")
+
+    assert Database(path).count_facts() == {'prices': 0, 'courses': 0, 'modalities': 0}
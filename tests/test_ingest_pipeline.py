@@ -0,0 +1,65 @@
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from models.ingest_pipeline import IngestPipeline
+
+
+class Embeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class Processor:
+    """O que o pipeline usa do PDFProcessor, com páginas em memória"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.extracted = 0
+        self.embeddings = Embeddings()
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0)
+        self.upserted = []
+
+    def count_pages(self, pdf_path):
+        return len(self.pages)
+
+    def iter_pages(self, pdf_path, known_page_hashes=frozenset()):
+        for page_num, text in enumerate(self.pages):
+            self.extracted += 1
+            yield page_num, text, f'hash-{page_num}'
+
+    def _upsert_embedded(self, ids, texts, metadatas, embeddings):
+        self.upserted.extend(ids)
+
+
+def _pages(count):
+    # Cada página vira dois chunks de 100 caracteres
+    return [(f'p{page:02d}' + 'a' * 96 + ' ') + (f'p{page:02d}' + 'b' * 96) for page in range(count)]
+
+
+def test_pipeline_without_limits_ingests_every_page():
+    processor = Processor(_pages(10))
+    report = IngestPipeline(processor).run('a.pdf', 'a.pdf')
+
+    assert report['success'] and not report['truncated']
+    assert report['chunks'] == 20
+    assert len(processor.upserted) == 20
+
+
+def test_pipeline_stops_at_the_chunk_limit():
+    processor = Processor(_pages(50))
+    pipeline = IngestPipeline(processor, queue_size=1, max_chunks=5)
+    report = pipeline.run('a.pdf', 'a.pdf')
+
+    assert report['success'] and report['truncated']
+    assert report['chunks'] == 5
+    assert len(processor.upserted) == 5
+    # A extração para junto, sem ler o resto do PDF
+    assert processor.extracted < 50
+
+
+def test_pipeline_stops_at_the_text_limit():
+    processor = Processor(_pages(10))
+    report = IngestPipeline(processor, max_text_chars=450).run('a.pdf', 'a.pdf')
+
+    assert report['truncated']
+    # Duas páginas inteiras (402 caracteres) e o início da terceira
+    assert report['chunks'] == 5
@@ -0,0 +1,27 @@
+from config import Config
+from models.intent_router import IntentRouter
+
+
+def test_scores_count_keyword_positions_without_accents():
+    router = IntentRouter(Config.INTENT_KEYWORDS)
+    assert router.scores("Qual o VALOR da mensalidade e o preco do curso?") == {
+        'precos': 3, 'cursos': 1}
+    # Casa em qualquer posição, como "valor" em "valores"
+    assert router.scores("valores") == {'precos': 1}
+    assert router.best("Bom dia!") is None
+
+
+def test_route_orders_by_score_then_table_order():
+    router = IntentRouter(Config.INTENT_KEYWORDS)
+    assert router.route("mensalidade e valor da graduação") == [('precos', 2), ('cursos', 1)]
+    # Empate: vale a ordem das intenções em INTENT_KEYWORDS
+    assert router.best("formas de pagamento") == 'modalidades'
+    assert router.best("pagamento em formas") == 'modalidades'
+
+
+def test_overlapping_keywords_count_once_per_position():
+    router = IntentRouter({'a': ['matricula', 'rematricula'], 'b': ['tricu']})
+    # "matricula" começa dentro de "rematricula": são duas posições de 'a'
+    assert router.scores("rematrícula") == {'a': 2, 'b': 1}
+    router = IntentRouter({'a': ['curso', 'cursos']})
+    assert router.scores("cursos") == {'a': 1}
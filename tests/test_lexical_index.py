@@ -0,0 +1,80 @@
+from langchain.docstore.document import Document
+
+from config import Config
+from models.lexical_index import BM25Index, tokenize
+from models.pdf_processor import PDFProcessor
+
+CHUNKS = {
+    'mensalidade': "A mensalidade do curso de Pedagogia é de R$ 220,00.",
+    'rematricula': "A taxa de rematrícula é cobrada a cada semestre.",
+    'biblioteca': "A biblioteca funciona de segunda a sábado.",
+}
+
+
+def _index(path=None):
+    index = BM25Index(path)
+    index.add(list(CHUNKS), list(CHUNKS.values()), [{'source': 'a.pdf'}] * len(CHUNKS))
+    return index
+
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    assert tokenize("Qual é a Taxa de Rematrícula?") == ['taxa', 'rematricula']
+
+
+def test_search_ranks_by_bm25():
+    index = _index()
+    results = index.search("taxa de rematrícula", k=3)
+    assert results[0][0] == 'rematricula'
+    assert len(results) == 1
+    assert index.search("mensalidade pedagogia", k=1)[0][0] == 'mensalidade'
+    assert index.search("inexistente") == []
+
+
+def test_delete_and_reindex_update_postings():
+    index = _index()
+    index.delete(['rematricula'])
+    assert index.search("rematrícula") == []
+
+    index.add(['biblioteca'], ["Horário da rematrícula online"], [{'source': 'a.pdf'}])
+    assert [chunk_id for chunk_id, _ in index.search("rematrícula")] == ['biblioteca']
+    assert index.search("sábado") == []
+    assert len(index) == 2
+
+
+def test_persist_and_load(tmp_path):
+    path = str(tmp_path / 'bm25.json')
+    _index(path).persist()
+
+    loaded = BM25Index(path)
+    assert loaded.load()
+    assert loaded.search("biblioteca", k=1) == _index().search("biblioteca", k=1)
+    assert loaded.get('biblioteca') == (CHUNKS['biblioteca'], {'source': 'a.pdf'})
+
+
+def _processor():
+    # fuse_results só usa a configuração: sem carregar o modelo
+    processor = PDFProcessor.__new__(PDFProcessor)
+    processor.config = Config()
+    return processor
+
+
+def _doc(text, source='a.pdf'):
+    return Document(page_content=text, metadata={'source': source})
+
+
+def test_fuse_results_sums_both_lists():
+    dense = [_doc('a'), _doc('b'), _doc('c')]
+    lexical = [_doc('c'), _doc('d')]
+
+    fused = _processor().fuse_results(dense, lexical, k=4)
+
+    # "c" aparece nas duas listas e passa à frente; no empate de "b" e "d"
+    # (mesma posição) vale a ordem de chegada, vetorial primeiro
+    assert [doc.page_content for doc in fused] == ['c', 'a', 'b', 'd']
+
+
+def test_fuse_results_tells_sources_apart_and_respects_k():
+    dense = [_doc('a', 'x.pdf'), _doc('a', 'y.pdf')]
+    fused = _processor().fuse_results(dense, [], k=5)
+    assert [doc.metadata['source'] for doc in fused] == ['x.pdf', 'y.pdf']
+    assert len(_processor().fuse_results(dense, [_doc('b')], k=1)) == 1
@@ -0,0 +1,40 @@
+import time
+
+from models.query_cache import TTLCache, normalize_question
+
+
+def test_new_index_version_invalidates_entries():
+    cache = TTLCache()
+    cache.set('pergunta', 'resposta', version='1')
+
+    assert cache.get('pergunta', '1') == 'resposta'
+    assert cache.get('pergunta', '2') is None
+    # A entrada da versão antiga foi descartada, não só ignorada
+    assert cache.get('pergunta', '1') is None
+    assert cache.get_stats()['entries'] == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl_seconds=0.05)
+    cache.set('pergunta', 'resposta')
+    assert cache.get('pergunta') == 'resposta'
+    time.sleep(0.1)
+    assert cache.get('pergunta') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_normalize_question():
+    assert normalize_question("Qual o valor da  Mensalidade?") == "qual o valor da mensalidade"
+    assert normalize_question("Custa R$ 100?") == "custa r$ 100"
@@ -0,0 +1,48 @@
+import time
+
+from models.session_history import SessionHistoryStore
+
+
+def test_each_session_keeps_its_last_turns():
+    store = SessionHistoryStore(max_turns=3)
+    for i in range(5):
+        store.add('s1', f'pergunta {i}', f'resposta {i}')
+    store.add('s2', 'outra', 'resposta')
+
+    assert [turn['question'] for turn in store.get('s1')] == ['pergunta 2', 'pergunta 3', 'pergunta 4']
+    assert [turn['question'] for turn in store.get('s2')] == ['outra']
+    assert store.get('desconhecida') == []
+
+
+def test_least_recently_used_session_is_evicted_above_max_sessions():
+    store = SessionHistoryStore(max_sessions=2)
+    store.add('a', 'p', 'r')
+    store.add('b', 'p', 'r')
+    store.add('a', 'p2', 'r2')  # "a" passa a ser a mais recente
+    store.add('c', 'p', 'r')
+
+    assert store.get('b') == []
+    assert len(store.get('a')) == 2
+    assert store.get_stats()['sessions'] == 2
+    assert store.evicted == 1
+
+
+def test_idle_sessions_expire():
+    store = SessionHistoryStore(idle_seconds=0.05)
+    store.add('a', 'p', 'r')
+    time.sleep(0.1)
+
+    assert store.get('a') == []
+    store.add('b', 'p', 'r')
+    stats = store.get_stats()
+    assert stats['sessions'] == 1 and stats['evicted'] == 1
+
+
+def test_clear_one_or_all_sessions():
+    store = SessionHistoryStore()
+    store.add('a', 'p', 'r')
+    store.add('b', 'p', 'r')
+    store.clear('a')
+    assert store.get('a') == [] and len(store.get('b')) == 1
+    store.clear_all()
+    assert store.get_stats()['turns'] == 0
@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+from models.vector_backends import NumpyBackend
+
+
+def _vector(*values):
+    return list(values) + [0.0] * (4 - len(values))
+
+
+def test_persist_publishes_a_complete_version(tmp_path):
+    """Vetores e registros de cada versão ficam juntos, trocados de uma vez"""
+    backend = NumpyBackend(str(tmp_path))
+    backend.upsert(['a'], ['texto a'], [{'source': 'a.pdf'}], [_vector(1.0)])
+    backend.persist()
+    first = (tmp_path / 'CURRENT').read_text()
+
+    backend.upsert(['b'], ['texto b'], [{'source': 'b.pdf'}], [_vector(0.0, 1.0)])
+    backend.persist()
+    second = (tmp_path / 'CURRENT').read_text()
+
+    assert first != second
+    # A versão anterior continua inteira para quem já leu o CURRENT antigo
+    old = np.load(tmp_path / first / 'vectors.npy')
+    assert old.shape[0] == len(json.loads((tmp_path / first / 'records.json').read_text())['ids'])
+    assert NumpyBackend(str(tmp_path)).all_chunks()[0] == ['a', 'b']
+
+
+def test_persist_keeps_only_recent_versions(tmp_path):
+    backend = NumpyBackend(str(tmp_path))
+    for i in range(5):
+        backend.upsert([str(i)], [f'texto {i}'], [{}], [_vector(1.0, i)])
+        backend.persist()
+
+    versions = [name for name in os.listdir(tmp_path) if name.startswith('v')]
+    assert len(versions) == NumpyBackend.KEEP_VERSIONS
+    assert (tmp_path / 'CURRENT').read_text() in versions
+
+
+def test_loads_and_replaces_the_old_single_directory_layout(tmp_path):
+    np.save(tmp_path / 'vectors.npy', np.array([_vector(1.0)], dtype=np.float32))
+    (tmp_path / 'records.json').write_text(json.dumps(
+        {'ids': ['a'], 'texts': ['texto a'], 'metadatas': [{'source': 'a.pdf'}]}))
+
+    backend = NumpyBackend(str(tmp_path))
+    assert backend.ids_for_source('a.pdf') == ['a']
+
+    backend.persist()
+    assert not (tmp_path / 'vectors.npy').exists()
+    assert NumpyBackend(str(tmp_path)).ids_for_source('a.pdf') == ['a']
+
+
+def test_upsert_query_delete_and_persist_round_trip(tmp_path):
+    backend = NumpyBackend(str(tmp_path))
+    backend.upsert(
+        ['a', 'b', 'c'],
+        ['texto a', 'texto b', 'texto c'],
+        [{'source': 'x.pdf'}, {'source': 'x.pdf'}, {'source': 'y.pdf'}],
+        [_vector(1.0), _vector(0.0, 1.0), _vector(0.0, 0.0, 1.0)]
+    )
+    # Mesmo id: substitui o chunk em vez de duplicar
+    backend.upsert(['b'], ['texto b2'], [{'source': 'x.pdf'}], [_vector(0.0, 2.0)])
+    assert backend.count() == 3
+
+    hits = backend.query([_vector(0.1, 1.0)], k=2)[0]
+    assert [text for text, _ in hits] == ['texto b2', 'texto a']
+    assert sorted(backend.ids_for_source('x.pdf')) == ['a', 'b']
+
+    backend.delete(['a', 'inexistente'])
+    backend.persist()
+
+    reloaded = NumpyBackend(str(tmp_path))
+    assert reloaded.all_chunks() == (
+        ['b', 'c'], ['texto b2', 'texto c'], [{'source': 'x.pdf'}, {'source': 'y.pdf'}])
+    assert reloaded.query([_vector(0.0, 0.0, 1.0)], k=5)[0][0] == ('texto c', {'source': 'y.pdf'})
+
+
+def test_float16_index_ranks_like_float32(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(50, 4)).tolist()
+    ids = [str(i) for i in range(50)]
+    results = []
+    for dtype in ('float32', 'float16'):
+        backend = NumpyBackend(str(tmp_path / dtype), dtype=dtype)
+        backend.upsert(ids, ids, [{}] * 50, vectors)
+        backend.persist()
+        reloaded = NumpyBackend(str(tmp_path / dtype), dtype=dtype)
+        results.append([text for text, _ in reloaded.query([vectors[7]], k=3)[0]])
+
+    assert results[0][0] == results[1][0] == '7'
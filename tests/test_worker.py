@@ -0,0 +1,60 @@
+import os
+import time
+
+from benchmarks.pipeline import write_text_pdf
+from config import Config
+from utils.database import Database
+from worker import acquire_worker_lock, start_worker_process, stop_worker_process
+
+
+def test_worker_process_runs_parallel_extraction_job(tmp_path, monkeypatch):
+    """Um PDF grande o bastante para a extração paralela (pool de processos
+    criado dentro do worker) é treinado pelo processo iniciado pelo app"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PDF_EXTRACTION_WORKERS', '2')
+    os.makedirs('data/pdfs')
+    pages = Config.PDF_PARALLEL_MIN_PAGES + 4
+    pdf_path = os.path.abspath('data/pdfs/regulamento.pdf')
+    write_text_pdf(pdf_path, [
+        [f"Regulamento - página {number + 1}",
+         f"A mensalidade do curso {number + 1} pode ser paga por boleto ou cartão.",
+         "A rematrícula é feita a cada semestre pela secretaria acadêmica."]
+        for number in range(pages)
+    ])
+
+    db = Database()
+    job_id = db.create_ingest_job('regulamento.pdf', pdf_path)
+    process = start_worker_process()
+    try:
+        deadline = time.monotonic() + 300
+        job = db.get_ingest_job(job_id)
+        while job['status'] not in ('done', 'failed') and time.monotonic() < deadline:
+            assert process.poll() is None, "o worker de ingestão terminou antes do job"
+            time.sleep(0.5)
+            job = db.get_ingest_job(job_id)
+    finally:
+        stop_worker_process(process)
+
+    assert job['status'] == 'done', job['error']
+    assert job['pages_total'] == pages
+    assert process.returncode is not None
+
+
+def test_second_worker_exits_while_the_lock_is_held(tmp_path, monkeypatch):
+    """Só um processo escritor: um worker extra sai sem carregar o modelo"""
+    monkeypatch.chdir(tmp_path)
+    lock_file = acquire_worker_lock(Config.INGEST_WORKER_LOCK_PATH)
+    assert lock_file is not None
+    try:
+        assert acquire_worker_lock(Config.INGEST_WORKER_LOCK_PATH) is None
+        process = start_worker_process()
+        try:
+            assert process.wait(timeout=30) == 0
+        finally:
+            stop_worker_process(process)
+    finally:
+        lock_file.close()
+
+    lock_file = acquire_worker_lock(Config.INGEST_WORKER_LOCK_PATH)
+    assert lock_file is not None
+    lock_file.close()
@@ -0,0 +1,148 @@
+"""Arquivo das conversas antigas, fora do banco principal
+
+Conversas com mais de N dias saem da tabela conversations e vão para
+arquivos JSON Lines compactados, um por dia:
+
+    data/archive/conversations/2025/03/conversations-2025-03-14.jsonl.gz
+
+Os arquivos podem ser consultados sem o servidor:
+
+    python -m utils.conversation_archive archive --days 90
+    python -m utils.conversation_archive query --since 2025-03-01 --until 2025-04-01 --contains matrícula
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def archive_file_path(archive_dir: str, day: str) -> str:
+    """Arquivo do dia 'AAAA-MM-DD'"""
+    year, month, _ = day.split('-')
+    return os.path.join(archive_dir, year, month, f"conversations-{day}.jsonl.gz")
+
+
+def _write_day(archive_dir: str, day: str, conversations: List[Dict]):
+    path = archive_file_path(archive_dir, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Cada execução acrescenta um novo membro gzip ao arquivo do dia
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as file:
+            for conversation in conversations:
+                file.write((json.dumps(conversation, ensure_ascii=False) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_conversations(db, archive_dir: str, retention_days: int,
+                          batch_size: int = 5000, now: Optional[datetime] = None) -> int:
+    """Move para o arquivo as conversas com mais de retention_days dias
+
+    Cada lote é gravado (com fsync) antes de ser removido do banco; se o
+    processo cair no meio, o lote é arquivado de novo na próxima execução
+    e read_archive descarta as cópias repetidas pelo id.
+    """
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    archived = 0
+    while True:
+        conversations = db.get_conversations_older_than(cutoff, limit=batch_size)
+        if not conversations:
+            break
+
+        by_day: Dict[str, List[Dict]] = {}
+        for conversation in conversations:
+            by_day.setdefault(conversation['timestamp'][:10], []).append(conversation)
+        for day, day_conversations in by_day.items():
+            _write_day(archive_dir, day, day_conversations)
+
+        if not db.delete_conversations([conversation['id'] for conversation in conversations]):
+            break
+        archived += len(conversations)
+        if len(conversations) < batch_size:
+            break
+
+    if archived:
+        logger.info(f"{archived} conversas anteriores a {cutoff} arquivadas em {archive_dir}")
+        db.vacuum_if_needed()
+    return archived
+
+
+def read_archive(archive_dir: str, since: Optional[str] = None, until: Optional[str] = None,
+                 contains: Optional[str] = None, origin: Optional[str] = None) -> Iterator[Dict]:
+    """Conversas arquivadas entre since e until ('AAAA-MM-DD...', UTC), em ordem
+
+    Só abre os arquivos dos dias do intervalo.
+    """
+    contains = contains.lower() if contains else None
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(archive_dir, '*', '*', 'conversations-*.jsonl.gz'))):
+        day = os.path.basename(path)[len('conversations-'):-len('.jsonl.gz')]
+        if (since and day < since[:10]) or (until and day > until[:10]):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                conversation = json.loads(line)
+                if conversation['id'] in seen:
+                    continue
+                seen.add(conversation['id'])
+                timestamp = conversation['timestamp']
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+                if origin and conversation.get('origin') != origin:
+                    continue
+                if contains and contains not in (conversation['question'] or '').lower() \
+                        and contains not in (conversation['response'] or '').lower():
+                    continue
+                yield conversation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    archive_parser = subparsers.add_parser('archive', help='Arquiva as conversas antigas agora')
+    archive_parser.add_argument('--days', type=int, help='Padrão: Config.CONVERSATION_RETENTION_DAYS')
+    archive_parser.add_argument('--db', default='data/unibot.db')
+
+    query_parser = subparsers.add_parser('query', help='Consulta os arquivos (JSON Lines na saída)')
+    query_parser.add_argument('--since', help="'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'")
+    query_parser.add_argument('--until', help='Exclusivo')
+    query_parser.add_argument('--contains', help='Texto na pergunta ou na resposta')
+    query_parser.add_argument('--origin')
+    query_parser.add_argument('--limit', type=int)
+
+    for subparser in (archive_parser, query_parser):
+        subparser.add_argument('--archive-dir', help='Padrão: Config.CONVERSATION_ARCHIVE_PATH')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+    archive_dir = args.archive_dir or Config.CONVERSATION_ARCHIVE_PATH
+
+    if args.command == 'archive':
+        logging.basicConfig(level=logging.INFO)
+        from utils.database import Database
+        archived = archive_conversations(
+            Database(args.db), archive_dir,
+            args.days if args.days is not None else Config.CONVERSATION_RETENTION_DAYS,
+            batch_size=Config.CONVERSATION_ARCHIVE_BATCH_SIZE)
+        print(f"{archived} conversas arquivadas")
+        return 0
+
+    for count, conversation in enumerate(read_archive(
+            archive_dir, args.since, args.until, args.contains, args.origin)):
+        if args.limit is not None and count >= args.limit:
+            break
+        print(json.dumps(conversation, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationLogger:
+    """Registro das conversas em segundo plano (write-behind)
+
+    O /chat só coloca o registro completo (pergunta, resposta, latência,
+    origem e fontes) em uma fila em memória; uma thread grava os registros
+    em lotes, um INSERT por conversa e uma transação por lote. Com a fila
+    cheia o registro é descartado (e contado) em vez de atrasar a resposta.
+    """
+
+    def __init__(self, db, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_pending: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        """Inicia a thread de gravação neste processo (também após um fork)"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Registros herdados do processo pai já são gravados por ele
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                atexit.register(self.close)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='unibot-conversation-log', daemon=True)
+            self._thread.start()
+
+    def log(self, question: str, response: str, latency_ms: float,
+            origin: Optional[str] = None, sources: Optional[List[str]] = None):
+        """Enfileira uma conversa (não acessa o banco)"""
+        self._ensure_thread()
+        record = {
+            'question': question,
+            'response': response,
+            'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'latency_ms': round(latency_ms, 1),
+            'cache_hit': origin == 'cache',
+            'origin': origin,
+            'sources': sources or []
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Fila de registro de conversas cheia - {self.dropped} descartadas")
+
+    def _run(self):
+        records_queue = self._queue
+        while True:
+            record = records_queue.get()
+            stop = record is None
+            batch = [] if stop else [record]
+            # Junta o que chegar até o intervalo de gravação ou o tamanho do lote
+            flush_at = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = records_queue.get(timeout=max(0.0, flush_at - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict]):
+        if self.db.log_conversations(batch):
+            self.written += len(batch)
+        else:
+            self.dropped += len(batch)
+
+    def close(self, timeout: float = 5.0):
+        """Grava o que estiver na fila e encerra a thread"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Fila de registro de conversas cheia ao encerrar")
+            return
+        thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped
+        }
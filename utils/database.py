@@ -1,22 +1,160 @@
+import json
 import sqlite3
 import os
-from datetime import datetime
+import queue
+import re
+import threading
+from contextlib import contextmanager
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Pragmas de cada conexão. Com WAL, synchronous=NORMAL só faz fsync nos
+# checkpoints, e leitores não bloqueiam o escritor (nem o contrário).
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",  # 8 MB
+    "PRAGMA temp_store = MEMORY",
+)
+# Espera por um lock de escrita de outro processo (worker de ingestão)
+BUSY_TIMEOUT = 5.0
+# Statements compilados mantidos por conexão (reaproveitados entre chamadas)
+CACHED_STATEMENTS = 256
+
+# Contadores da tabela stats: valor inicial (bancos já existentes)...
+COUNTER_QUERIES = {
+    'total_questions': "SELECT COUNT(*) FROM conversations WHERE response IS NOT NULL",
+    'total_pdfs': "SELECT COUNT(*) FROM uploaded_pdfs WHERE status = 'active'",
+    'total_chunks': "SELECT COALESCE(SUM(chunk_count), 0) FROM uploaded_pdfs WHERE status = 'active'",
+}
+
+
+def _counter_update(metric, delta):
+    return (f"UPDATE stats SET metric_value = metric_value + ({delta}), "
+            f"last_updated = CURRENT_TIMESTAMP WHERE metric_name = '{metric}';")
+
+
+# ...e triggers que os mantêm. Perguntas arquivadas continuam contando.
+COUNTER_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS trg_conversations_count
+        AFTER INSERT ON conversations WHEN NEW.response IS NOT NULL
+        BEGIN {_counter_update('total_questions', 1)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_uploaded_pdfs_insert
+        AFTER INSERT ON uploaded_pdfs WHEN NEW.status = 'active'
+        BEGIN
+            {_counter_update('total_pdfs', 1)}
+            {_counter_update('total_chunks', 'COALESCE(NEW.chunk_count, 0)')}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_uploaded_pdfs_update
+        AFTER UPDATE OF status, chunk_count ON uploaded_pdfs
+        BEGIN
+            {_counter_update('total_pdfs', "(NEW.status = 'active') - (OLD.status = 'active')")}
+            {_counter_update('total_chunks', "(CASE WHEN NEW.status = 'active' THEN COALESCE(NEW.chunk_count, 0) ELSE 0 END)"
+                                             " - (CASE WHEN OLD.status = 'active' THEN COALESCE(OLD.chunk_count, 0) ELSE 0 END)")}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_uploaded_pdfs_delete
+        AFTER DELETE ON uploaded_pdfs WHEN OLD.status = 'active'
+        BEGIN
+            {_counter_update('total_pdfs', -1)}
+            {_counter_update('total_chunks', '-COALESCE(OLD.chunk_count, 0)')}
+        END""",
+)
+
+
+def conversation_from_row(row):
+    """Conversa como dict (sources decodificado)"""
+    conversation = dict(row)
+    conversation['cache_hit'] = bool(conversation['cache_hit']) if conversation['cache_hit'] is not None else None
+    conversation['sources'] = json.loads(conversation['sources']) if conversation['sources'] else []
+    return conversation
+
+
+def _process_alive(pid):
+    """Indica se o processo ainda existe (sinal 0 só verifica o pid)"""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, mas pertence a outro usuário
+        return True
+    return True
+
 
 class Database:
-    def __init__(self, db_path='data/unibot.db'):
+    def __init__(self, db_path='data/unibot.db', pool_size=8):
         self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pool_pid = os.getpid()
+        self._pool_lock = threading.Lock()
+        # Conexões herdadas em um fork: não podem ser usadas nem fechadas no filho
+        self._inherited = []
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.init_database()
 
+    def _open_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _check_fork(self):
+        """Descarta o pool herdado do processo pai (após um fork)"""
+        if self._pool_pid == os.getpid():
+            return
+        with self._pool_lock:
+            if self._pool_pid == os.getpid():
+                return
+            while True:
+                try:
+                    self._inherited.append(self._pool.get_nowait())
+                except queue.Empty:
+                    break
+            self._pool_pid = os.getpid()
+
+    @contextmanager
+    def _connection(self):
+        """Conexão persistente do pool, dentro de uma transação
+
+        Como o "with sqlite3.connect(...)" de antes: commit ao sair e
+        rollback em caso de exceção, mas a conexão (e os statements já
+        compilados) volta para o pool em vez de ser fechada.
+        """
+        self._check_fork()
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection()
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Fecha as conexões ociosas do pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
     def init_database(self):
         """Inicializa o banco de dados com as tabelas necessárias"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
+                # Só tem efeito em bancos novos (ver vacuum_if_needed)
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                # WAL fica gravado no arquivo: vale para todas as conexões
+                cursor.execute("PRAGMA journal_mode = WAL")
 
                 # Tabela para perguntas e respostas
                 cursor.execute('''
@@ -39,6 +177,95 @@ class Database:
                     )
                 ''')
 
+                # Fingerprints dos chunks de cada PDF (id = hash do conteúdo)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS pdf_chunks (
+                        chunk_id TEXT PRIMARY KEY,
+                        filename TEXT NOT NULL,
+                        page INTEGER,
+                        page_hash TEXT
+                    )
+                ''')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_pdf_chunks_filename ON pdf_chunks (filename)")
+
+                # Fatos extraídos dos chunks na ingestão (respostas por consulta)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fact_prices (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        chunk_id TEXT NOT NULL,
+                        filename TEXT NOT NULL,
+                        position INTEGER NOT NULL,
+                        label TEXT,
+                        amount TEXT NOT NULL,
+                        value REAL,
+                        installments INTEGER,
+                        context_key TEXT,
+                        UNIQUE (chunk_id, position)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fact_courses (
+                        chunk_id TEXT NOT NULL,
+                        filename TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        name_key TEXT NOT NULL,
+                        PRIMARY KEY (chunk_id, name_key)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fact_modalities (
+                        chunk_id TEXT NOT NULL,
+                        filename TEXT NOT NULL,
+                        modality TEXT NOT NULL,
+                        PRIMARY KEY (chunk_id, modality)
+                    )
+                ''')
+                # Termos do contexto de cada preço (ver find_prices)
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fact_price_terms'")
+                price_terms_existed = cursor.fetchone() is not None
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS fact_price_terms (
+                        term TEXT NOT NULL,
+                        price_id INTEGER NOT NULL,
+                        PRIMARY KEY (term, price_id)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_fact_price_terms_price_id ON fact_price_terms (price_id)")
+                if not price_terms_existed:
+                    # Preços gravados antes dos termos: esvaziar os fatos para que
+                    # o worker os extraia de novo do vectorstore (_backfill_facts)
+                    for table in ('fact_prices', 'fact_courses', 'fact_modalities'):
+                        cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_fact_prices_filename ON fact_prices (filename)")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_fact_courses_name_key ON fact_courses (name_key)")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_fact_modalities_modality ON fact_modalities (modality)")
+
+                # Fila de jobs de ingestão (processados pelo worker.py)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS ingest_jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        filename TEXT NOT NULL,
+                        filepath TEXT NOT NULL,
+                        status TEXT DEFAULT 'queued',
+                        pages_total INTEGER DEFAULT 0,
+                        pages_done INTEGER DEFAULT 0,
+                        chunks_embedded INTEGER DEFAULT 0,
+                        error TEXT,
+                        worker_pid INTEGER,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        started_at DATETIME,
+                        finished_at DATETIME
+                    )
+                ''')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status, id)")
+
                 # Tabela para estatísticas
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS stats (
@@ -49,121 +276,587 @@ class Database:
                     )
                 ''')
 
+                # Migrações de bancos criados por versões anteriores
+                self._ensure_column(cursor, 'uploaded_pdfs', 'file_hash', 'TEXT')
+                self._ensure_column(cursor, 'uploaded_pdfs', 'chunk_count', 'INTEGER')
+                self._ensure_column(cursor, 'conversations', 'latency_ms', 'REAL')
+                self._ensure_column(cursor, 'conversations', 'cache_hit', 'INTEGER')
+                self._ensure_column(cursor, 'conversations', 'origin', 'TEXT')
+                self._ensure_column(cursor, 'conversations', 'sources', 'TEXT')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp)")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_conversations_origin ON conversations (origin, id)")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_uploaded_pdfs_upload_date ON uploaded_pdfs (upload_date)")
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_uploaded_pdfs_file_hash ON uploaded_pdfs (file_hash)")
+
+                self._init_counters(cursor)
+
                 conn.commit()
                 logger.info("Banco de dados inicializado com sucesso")
 
         except Exception as e:
             logger.error(f"Erro ao inicializar banco de dados: {str(e)}")
 
-    def log_question(self, question):
-        """Registra uma pergunta no banco"""
+    def _init_counters(self, cursor):
+        """Contadores da tabela stats, mantidos por triggers
+
+        Os triggers valem para qualquer processo que grave no banco (o app e
+        o worker de ingestão), e o /stats só lê três linhas. Cada contador é
+        calculado uma única vez, quando ainda não existe.
+        """
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_stats_metric_name ON stats (metric_name)")
+
+        for metric, query in COUNTER_QUERIES.items():
+            cursor.execute(
+                f"""INSERT INTO stats (metric_name, metric_value)
+                    SELECT ?, ({query})
+                    WHERE NOT EXISTS (SELECT 1 FROM stats WHERE metric_name = ?)""",
+                (metric, metric)
+            )
+
+        for trigger in COUNTER_TRIGGERS:
+            cursor.execute(trigger)
+
+    def _ensure_column(self, cursor, table, column, definition):
+        """Adiciona uma coluna se a tabela ainda não a tiver"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def log_conversations(self, records):
+        """Grava um lote de conversas em uma única transação
+
+        records: dicts com question, response, timestamp, latency_ms,
+        cache_hit, origin e sources (ver utils.conversation_log).
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
+                conn.executemany(
+                    """INSERT INTO conversations
+                       (question, response, timestamp, latency_ms, cache_hit, origin, sources)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    [(record['question'], record['response'], record['timestamp'],
+                      record['latency_ms'], int(record['cache_hit']), record['origin'],
+                      json.dumps(record['sources'], ensure_ascii=False))
+                     for record in records]
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao registrar conversas: {str(e)}")
+            return False
+
+    def get_conversations(self, limit=50, before_id=None, since=None, until=None, origin=None):
+        """Página do histórico de conversas, da mais recente para a mais antiga
+
+        Paginação por id (before_id = menor id da página anterior), que usa
+        a chave primária em vez de OFFSET; since/until (texto 'AAAA-MM-DD'
+        ou 'AAAA-MM-DD HH:MM:SS', UTC) usam o índice de timestamp.
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if origin:
+            conditions.append("origin = ?")
+            params.append(origin)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            with self._connection() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 cursor.execute(
-                    "INSERT INTO conversations (question) VALUES (?)",
-                    (question,)
+                    f"""SELECT id, question, response, timestamp, latency_ms, cache_hit, origin, sources
+                        FROM conversations
+                        {where}
+                        ORDER BY id DESC
+                        LIMIT ?""",
+                    params + [limit]
+                )
+                return [conversation_from_row(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao obter conversas: {str(e)}")
+            return []
+
+    def get_conversations_older_than(self, cutoff, limit=5000):
+        """Conversas anteriores a cutoff ('AAAA-MM-DD HH:MM:SS'), das mais antigas"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute(
+                    """SELECT id, question, response, timestamp, latency_ms, cache_hit, origin, sources
+                       FROM conversations
+                       WHERE timestamp < ?
+                       ORDER BY timestamp, id
+                       LIMIT ?""",
+                    (cutoff, limit)
+                )
+                return [conversation_from_row(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao obter conversas antigas: {str(e)}")
+            return []
+
+    def delete_conversations(self, ids):
+        """Remove conversas (já arquivadas) pelo id"""
+        try:
+            with self._connection() as conn:
+                conn.executemany(
+                    "DELETE FROM conversations WHERE id = ?", [(conversation_id,) for conversation_id in ids])
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao remover conversas: {str(e)}")
+            return False
+
+    def vacuum_if_needed(self):
+        """Devolve ao sistema as páginas liberadas pelas remoções
+
+        Bancos criados antes do auto_vacuum incremental são convertidos uma
+        vez com VACUUM; depois basta o incremental_vacuum.
+        """
+        try:
+            with self._connection() as conn:
+                auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            conn = self._open_connection()
+            try:
+                if auto_vacuum != 2:
+                    logger.info("Convertendo o banco para auto_vacuum incremental (VACUUM)...")
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+                else:
+                    conn.execute("PRAGMA incremental_vacuum").fetchall()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Erro ao compactar o banco: {str(e)}")
+
+    def log_pdf_upload(self, filename, filepath, file_hash=None, chunk_count=None):
+        """Registra um PDF carregado no banco, com o número de chunks no vectorstore
+
+        Versões anteriores do mesmo arquivo passam para o status 'replaced'.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE uploaded_pdfs SET status = 'replaced' WHERE filename = ? AND status = 'active'",
+                    (filename,)
+                )
+                cursor.execute(
+                    "INSERT INTO uploaded_pdfs (filename, filepath, file_hash, chunk_count) VALUES (?, ?, ?, ?)",
+                    (filename, filepath, file_hash, chunk_count)
                 )
                 conn.commit()
-                return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Erro ao registrar pergunta: {str(e)}")
+            logger.error(f"Erro ao registrar PDF: {str(e)}")
+
+    def find_pdf_by_hash(self, file_hash):
+        """Retorna o PDF ativo com o mesmo conteúdo, se já tiver sido treinado"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT filename, upload_date
+                       FROM uploaded_pdfs
+                       WHERE file_hash = ? AND status = 'active'
+                       LIMIT 1""",
+                    (file_hash,)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                return {'filename': row[0], 'upload_date': row[1]}
+        except Exception as e:
+            logger.error(f"Erro ao buscar PDF por hash: {str(e)}")
             return None
 
-    def log_response(self, question, response):
-        """Atualiza a resposta para uma pergunta"""
+    def get_pdf_chunks(self, filename):
+        """Retorna os fingerprints dos chunks de um PDF agrupados por página
+
+        Formato: {página: (hash da página, [ids dos chunks])}
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                # Corrigir a query SQL - remover ORDER BY do UPDATE
                 cursor.execute(
-                    """UPDATE conversations 
-                       SET response = ? 
-                       WHERE question = ? AND response IS NULL 
-                       AND id = (
-                           SELECT id FROM conversations 
-                           WHERE question = ? AND response IS NULL 
-                           ORDER BY timestamp DESC 
-                           LIMIT 1
-                       )""",
-                    (response, question, question)
+                    "SELECT chunk_id, page, page_hash FROM pdf_chunks WHERE filename = ?",
+                    (filename,)
+                )
+                pages = {}
+                for chunk_id, page, page_hash in cursor.fetchall():
+                    pages.setdefault(page, (page_hash, []))[1].append(chunk_id)
+                return pages
+        except Exception as e:
+            logger.error(f"Erro ao obter chunks de {filename}: {str(e)}")
+            return {}
+
+    def replace_pdf_chunks(self, filename, chunks):
+        """Substitui os fingerprints dos chunks de um PDF
+
+        chunks: lista de tuplas (chunk_id, página, hash da página)
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM pdf_chunks WHERE filename = ?", (filename,))
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO pdf_chunks (chunk_id, filename, page, page_hash) VALUES (?, ?, ?, ?)",
+                    [(chunk_id, filename, page, page_hash)
+                     for chunk_id, page, page_hash in chunks]
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao registrar chunks de {filename}: {str(e)}")
+
+    def add_chunk_facts(self, chunk_facts):
+        """Registra os fatos extraídos de chunks (preços, cursos e modalidades)
+
+        chunk_facts: lista de tuplas (chunk_id, filename, fatos), com fatos
+        no formato de models.fact_extractor.extract_facts. Chunks já
+        registrados são ignorados.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                for chunk_id, filename, facts in chunk_facts:
+                    for position, price in enumerate(facts['prices']):
+                        cursor.execute(
+                            """INSERT OR IGNORE INTO fact_prices
+                               (chunk_id, filename, position, label, amount, value, installments, context_key)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                            (chunk_id, filename, position, price['label'], price['amount'],
+                             price['value'], price['installments'], price['context_key'])
+                        )
+                        if cursor.rowcount == 1:
+                            price_id = cursor.lastrowid
+                            cursor.executemany(
+                                "INSERT OR IGNORE INTO fact_price_terms (term, price_id) VALUES (?, ?)",
+                                [(term, price_id) for term in price['terms']]
+                            )
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO fact_courses (chunk_id, filename, name, name_key) VALUES (?, ?, ?, ?)",
+                    [(chunk_id, filename, name, name_key)
+                     for chunk_id, filename, facts in chunk_facts
+                     for name, name_key in facts['courses']]
+                )
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO fact_modalities (chunk_id, filename, modality) VALUES (?, ?, ?)",
+                    [(chunk_id, filename, modality)
+                     for chunk_id, filename, facts in chunk_facts
+                     for modality in facts['modalities']]
                 )
                 conn.commit()
         except Exception as e:
-            logger.error(f"Erro ao registrar resposta: {str(e)}")
+            logger.error(f"Erro ao registrar fatos dos chunks: {str(e)}")
 
-    def log_pdf_upload(self, filename, filepath):
-        """Registra um PDF carregado no banco"""
+    def delete_chunk_facts(self, chunk_ids):
+        """Remove os fatos de chunks que saíram do vectorstore"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
+                cursor.executemany(
+                    """DELETE FROM fact_price_terms
+                       WHERE price_id IN (SELECT id FROM fact_prices WHERE chunk_id = ?)""",
+                    [(chunk_id,) for chunk_id in chunk_ids]
+                )
+                for table in ('fact_prices', 'fact_courses', 'fact_modalities'):
+                    cursor.executemany(
+                        f"DELETE FROM {table} WHERE chunk_id = ?",
+                        [(chunk_id,) for chunk_id in chunk_ids]
+                    )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao remover fatos dos chunks: {str(e)}")
+
+    def count_facts(self):
+        """Quantidade de fatos registrados em cada tabela"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                counts = {}
+                for name, table in (('prices', 'fact_prices'), ('courses', 'fact_courses'),
+                                    ('modalities', 'fact_modalities')):
+                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                    counts[name] = cursor.fetchone()[0]
+                return counts
+        except Exception as e:
+            logger.error(f"Erro ao contar fatos: {str(e)}")
+            return {'prices': 0, 'courses': 0, 'modalities': 0}
+
+    def find_prices(self, terms, limit=5):
+        """Preços cujo contexto contém todos os termos da pergunta
+
+        terms: termos já sem acento e em minúsculas; sem termos, nenhum preço
+        é retornado. Os termos casam no início de uma palavra ("curso" casa
+        com "cursos") no texto que precede o valor, por uma faixa do índice
+        de fact_price_terms, e os preços vêm do mais próximo dos termos para
+        o mais distante: numa tabela, o valor da própria linha vem antes dos
+        valores das linhas seguintes, que aparecem no mesmo contexto.
+        """
+        if not terms:
+            return []
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                # Prefixo como a faixa [termo, termo + maior caractere)
                 cursor.execute(
-                    "INSERT INTO uploaded_pdfs (filename, filepath) VALUES (?, ?)",
+                    f"""SELECT id, label, amount, filename, context_key
+                        FROM fact_prices
+                        WHERE {' AND '.join([
+                            'id IN (SELECT price_id FROM fact_price_terms WHERE term >= ? AND term < ?)'
+                        ] * len(terms))}""",
+                    [bound for term in terms for bound in (term, term + '\U0010ffff')]
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Erro ao buscar preços: {str(e)}")
+            return []
+
+        patterns = [re.compile(r'\b' + re.escape(term)) for term in terms]
+        # Chunks sobrepostos repetem valores: agrupar por rótulo e valor
+        best = {}
+        for row_id, label, amount, filename, context_key in rows:
+            position = max(context_key.find(amount.lower()), 0)
+            distance = 0
+            for pattern in patterns:
+                # Como nos rótulos da extração, só conta o texto antes do valor:
+                # o que vem depois já é a próxima linha da tabela
+                starts = [match.start() for match in pattern.finditer(context_key, 0, position)]
+                if not starts:
+                    break
+                distance += position - max(starts)
+            else:
+                key = (label, amount)
+                if key not in best or (distance, row_id) < best[key][:2]:
+                    best[key] = (distance, row_id, filename)
+
+        ranked = sorted(best.items(), key=lambda item: item[1][:2])[:limit]
+        return [{'label': label, 'amount': amount, 'filename': filename, 'distance': distance}
+                for (label, amount), (distance, _, filename) in ranked]
+
+    def get_courses(self, limit=10):
+        """Cursos mais citados nos documentos, com os arquivos de origem"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT MIN(name), GROUP_CONCAT(filename, char(10)), SUM(mentions) AS total
+                       FROM (
+                           SELECT name_key, MIN(name) AS name, filename, COUNT(*) AS mentions
+                           FROM fact_courses
+                           GROUP BY name_key, filename
+                       )
+                       GROUP BY name_key
+                       ORDER BY total DESC, MIN(name)
+                       LIMIT ?""",
+                    (limit,)
+                )
+                return [{'name': row[0], 'filenames': row[1].split('\n'), 'mentions': row[2]}
+                        for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao obter cursos: {str(e)}")
+            return []
+
+    def get_modalities(self):
+        """Modalidades citadas nos documentos: {modalidade: [arquivos]}"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT DISTINCT modality, filename FROM fact_modalities ORDER BY modality, filename")
+                modalities = {}
+                for modality, filename in cursor.fetchall():
+                    modalities.setdefault(modality, []).append(filename)
+                return modalities
+        except Exception as e:
+            logger.error(f"Erro ao obter modalidades: {str(e)}")
+            return {}
+
+    def create_ingest_job(self, filename, filepath):
+        """Enfileira um PDF para treinamento e retorna o id do job"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO ingest_jobs (filename, filepath) VALUES (?, ?)",
                     (filename, filepath)
                 )
                 conn.commit()
+                return cursor.lastrowid
         except Exception as e:
-            logger.error(f"Erro ao registrar PDF: {str(e)}")
+            logger.error(f"Erro ao criar job de ingestão: {str(e)}")
+            return None
 
-    def get_stats(self):
-        """Obtém estatísticas do sistema"""
+    def claim_next_ingest_job(self, worker_pid):
+        """Marca o job mais antigo da fila como 'running' e o retorna"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
+                while True:
+                    cursor.execute(
+                        "SELECT id FROM ingest_jobs WHERE status = 'queued' ORDER BY id LIMIT 1")
+                    row = cursor.fetchone()
+                    if row is None:
+                        return None
 
-                # Total de perguntas
+                    # Só um worker consegue trocar o status de 'queued'
+                    cursor.execute(
+                        """UPDATE ingest_jobs
+                           SET status = 'running', worker_pid = ?,
+                               started_at = CURRENT_TIMESTAMP
+                           WHERE id = ? AND status = 'queued'""",
+                        (worker_pid, row[0])
+                    )
+                    conn.commit()
+                    if cursor.rowcount == 1:
+                        return self.get_ingest_job(row[0])
+        except Exception as e:
+            logger.error(f"Erro ao obter próximo job: {str(e)}")
+            return None
+
+    def requeue_stale_ingest_jobs(self):
+        """Devolve à fila jobs 'running' cujo worker não existe mais
+
+        Jobs de um worker ainda vivo continuam com ele: reenfileirá-los
+        faria o mesmo PDF ser treinado por dois processos ao mesmo tempo.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT COUNT(*) FROM conversations WHERE response IS NOT NULL")
-                total_questions = cursor.fetchone()[0]
+                    "SELECT id, worker_pid FROM ingest_jobs WHERE status = 'running'")
+                stale = [(job_id, pid) for job_id, pid in cursor.fetchall()
+                         if not _process_alive(pid)]
+                requeued = 0
+                for job_id, pid in stale:
+                    # Condicional ao pid: outro worker pode ter pego o job
+                    cursor.execute(
+                        """UPDATE ingest_jobs
+                           SET status = 'queued', worker_pid = NULL, started_at = NULL,
+                               pages_done = 0, chunks_embedded = 0
+                           WHERE id = ? AND status = 'running' AND worker_pid IS ?""",
+                        (job_id, pid)
+                    )
+                    requeued += cursor.rowcount
+                conn.commit()
+                return requeued
+        except Exception as e:
+            logger.error(f"Erro ao reenfileirar jobs: {str(e)}")
+            return 0
 
-                # Total de PDFs
+    def update_ingest_job_progress(self, job_id, pages_done, pages_total, chunks_embedded):
+        """Atualiza o progresso de um job em andamento"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT COUNT(*) FROM uploaded_pdfs WHERE status = 'active'")
-                total_pdfs = cursor.fetchone()[0]
+                    """UPDATE ingest_jobs
+                       SET pages_done = ?, pages_total = ?, chunks_embedded = ?
+                       WHERE id = ?""",
+                    (pages_done, pages_total, chunks_embedded, job_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar job {job_id}: {str(e)}")
 
-                # Calcular chunks reais baseado nos documentos processados
-                total_chunks = self.get_total_chunks()
+    def finish_ingest_job(self, job_id, success, error=None):
+        """Marca um job como concluído ('done') ou com falha ('failed')"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """UPDATE ingest_jobs
+                       SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                           pages_done = CASE WHEN ? THEN pages_total ELSE pages_done END
+                       WHERE id = ?""",
+                    ('done' if success else 'failed', error, success, job_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao finalizar job {job_id}: {str(e)}")
 
-                return {
-                    'total_questions': total_questions,
-                    'total_pdfs': total_pdfs,
-                    'total_chunks': total_chunks
-                }
+    def get_ingest_job(self, job_id):
+        """Obtém um job de ingestão com o tempo decorrido em segundos"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute(
+                    """SELECT id, filename, filepath, status, pages_total, pages_done,
+                              chunks_embedded, error, created_at, started_at, finished_at,
+                              (julianday(COALESCE(finished_at, CURRENT_TIMESTAMP))
+                               - julianday(started_at)) * 86400 AS elapsed_seconds
+                       FROM ingest_jobs
+                       WHERE id = ?""",
+                    (job_id,)
+                )
+                row = cursor.fetchone()
+                return dict(row) if row is not None else None
+        except Exception as e:
+            logger.error(f"Erro ao obter job {job_id}: {str(e)}")
+            return None
 
+    def get_stats(self):
+        """Obtém estatísticas do sistema (contadores mantidos por triggers)"""
+        stats = dict.fromkeys(COUNTER_QUERIES, 0)
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT metric_name, metric_value FROM stats WHERE metric_name IN (?, ?, ?)",
+                    tuple(COUNTER_QUERIES)
+                )
+                stats.update(cursor.fetchall())
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas: {str(e)}")
-            return {
-                'total_questions': 0,
-                'total_pdfs': 0,
-                'total_chunks': 0
-            }
+        return stats
 
     def get_total_chunks(self):
-        """Calcula o número total de chunks baseado nos PDFs processados"""
+        """Número de chunks dos PDFs ativos no vectorstore"""
+        return self.get_stats()['total_chunks']
+
+    def get_pdfs_without_chunk_count(self):
+        """PDFs ativos registrados antes da contagem de chunks"""
         try:
-            # Tentar obter do vectorstore se disponível
-            vectorstore_path = 'data/vectorstore'
-            if os.path.exists(vectorstore_path):
-                # Estimar baseado nos arquivos do vectorstore
-                return len([f for f in os.listdir(vectorstore_path) if f.endswith('.bin')]) * 50
-            else:
-                # Fallback para estimativa baseada em PDFs
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM uploaded_pdfs WHERE status = 'active'")
-                    total_pdfs = cursor.fetchone()[0]
-                    return total_pdfs * 100  # Estimativa mais realista
-        except:
-            return 0
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT filename FROM uploaded_pdfs WHERE status = 'active' AND chunk_count IS NULL")
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao obter PDFs sem contagem de chunks: {str(e)}")
+            return []
+
+    def set_chunk_count(self, filename, chunk_count):
+        """Atualiza o número de chunks do PDF ativo com esse nome"""
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "UPDATE uploaded_pdfs SET chunk_count = ? WHERE filename = ? AND status = 'active'",
+                    (chunk_count, filename)
+                )
+        except Exception as e:
+            logger.error(f"Erro ao atualizar chunks de {filename}: {str(e)}")
 
     def get_trained_documents(self):
         """Obtém lista de documentos treinados"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    """SELECT filename, upload_date, status 
+                    """SELECT filename, upload_date, status, chunk_count
                        FROM uploaded_pdfs 
                        ORDER BY upload_date DESC"""
                 )
@@ -173,7 +866,8 @@ class Database:
                     docs.append({
                         'filename': row[0],
                         'upload_date': row[1],
-                        'status': row[2]
+                        'status': row[2],
+                        'chunk_count': row[3]
                     })
 
                 return docs
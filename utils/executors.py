@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """O prazo da requisição terminou antes da tarefa"""
+
+
+class ExecutorOverloaded(RuntimeError):
+    """O pool já tem o máximo de tarefas em execução e na fila"""
+
+
+class Deadline:
+    """Prazo absoluto de uma requisição, repassado às camadas de baixo
+
+    Cada camada usa o tempo que ainda resta em vez de um timeout próprio,
+    de modo que a soma das esperas nunca passa do prazo original.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Interrompe o trabalho cooperativamente se o prazo acabou"""
+        if self.expired():
+            raise DeadlineExceeded(f"Prazo de {self.timeout:.0f}s esgotado")
+
+
+# Prazo da tarefa em execução em cada thread dos pools (ver check_deadline)
+_task = threading.local()
+
+
+def check_deadline():
+    """Dentro de uma tarefa do pool: interrompe se o prazo dela acabou
+
+    Uma thread em execução não pode ser interrompida de fora: a tarefa
+    abandonada por timeout só libera a thread e a vaga no pool quando
+    terminar. Chamando esta função entre as etapas, ela termina na
+    próxima verificação em vez de ir até o fim. Fora dos pools não faz nada.
+    """
+    deadline = getattr(_task, 'deadline', None)
+    if deadline is not None:
+        deadline.check()
+
+
+class BoundedExecutor:
+    """Pool de threads de longa duração com limite de tarefas pendentes
+
+    É controle de admissão, não de cancelamento. Quando o pool está cheio,
+    submit falha na hora (ExecutorOverloaded) em vez de acumular threads
+    bloqueadas. Tarefas cujo prazo expira ainda na fila são canceladas sem
+    executar. As que já começaram ocupam a thread e a vaga (liberada apenas
+    quando terminam) até o fim ou até a próxima chamada a check_deadline.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"unibot-{name}")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn: Callable, *args, deadline: Optional[Deadline] = None, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorOverloaded(f"Pool '{self.name}' sem capacidade")
+
+        def task():
+            _task.deadline = deadline
+            try:
+                check_deadline()
+                return fn(*args, **kwargs)
+            finally:
+                _task.deadline = None
+
+        try:
+            future = self._executor.submit(task)
+        except Exception:
+            self._slots.release()
+            raise
+        # A vaga só volta ao pool quando a tarefa termina de fato
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable, *args, deadline: Optional[Deadline] = None, **kwargs):
+        """Executa no pool e espera no máximo o tempo restante do prazo
+
+        No timeout o chamador é liberado imediatamente: a tarefa é cancelada
+        se ainda não começou; se já estiver rodando, segue até terminar ou
+        até chamar check_deadline, ocupando a vaga até lá.
+        """
+        future = self.submit(fn, *args, deadline=deadline, **kwargs)
+        try:
+            return future.result(
+                timeout=deadline.remaining() if deadline is not None else None)
+        except FuturesTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"Tarefa no pool '{self.name}' excedeu o prazo")
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Pools compartilhados pelo processo, criados sob demanda
+_executors: Dict[str, BoundedExecutor] = {}
+_process_pool: Optional[ProcessPoolExecutor] = None
+_owner_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Pools herdados de um fork não têm threads vivas: descartá-los"""
+    global _executors, _process_pool, _owner_pid
+    if _owner_pid != os.getpid():
+        _executors = {}
+        _process_pool = None
+        _owner_pid = os.getpid()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Retorna o pool compartilhado 'query' ou 'ingest'"""
+    from config import Config
+
+    with _lock:
+        _reset_after_fork()
+        executor = _executors.get(name)
+        if executor is None:
+            prefix = name.upper()
+            executor = BoundedExecutor(
+                name,
+                max_workers=getattr(Config, f'{prefix}_EXECUTOR_WORKERS', 4),
+                max_pending=getattr(Config, f'{prefix}_EXECUTOR_MAX_PENDING', 16)
+            )
+            _executors[name] = executor
+            logger.info(
+                f"Pool '{name}' criado com {executor.max_workers} threads")
+        return executor
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Retorna o pool de processos compartilhado (extração de PDFs)"""
+    global _process_pool
+
+    with _lock:
+        _reset_after_fork()
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+            logger.info("Pool de processos criado")
+        return _process_pool
+
+
+def shutdown_executors(wait: bool = False):
+    """Encerra todos os pools compartilhados"""
+    global _executors, _process_pool
+
+    with _lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=wait)
+        _executors = {}
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=wait, cancel_futures=True)
+            _process_pool = None
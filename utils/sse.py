@@ -0,0 +1,6 @@
+import json
+
+
+def sse_event(event, data):
+    """Formata um evento do /chat/stream (Server-Sent Events)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoader:
+    """Constrói um objeto pesado (o UnibotAI) em uma thread separada
+
+    O servidor começa a responder logo; enquanto a carga não termina,
+    get() retorna None e status() informa o andamento para o /readyz.
+    A função de carga pode registrar etapas com stage(nome) para que o
+    tempo de cada uma apareça no status.
+    """
+
+    def __init__(self, factory: Callable[['BackgroundLoader'], Any], name: str = 'unibot-warmup'):
+        self.factory = factory
+        self.name = name
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self._value = None
+        self._ready = threading.Event()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._current_stage: Optional[str] = None
+        self._stage_started: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = 'loading'
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def load(self):
+        """Executa a carga na thread atual (bloqueia até terminar)"""
+        with self._lock:
+            if self._thread is not None or self._ready.is_set():
+                return
+            self.state = 'loading'
+            self._started_at = time.monotonic()
+        self._run()
+
+    def stage(self, name: str):
+        """Marca o início de uma etapa da carga (encerra a anterior)"""
+        now = time.monotonic()
+        if self._current_stage is not None:
+            self.stages[self._current_stage] = round(now - self._stage_started, 3)
+        self._current_stage = name
+        self._stage_started = now
+        if name is not None:
+            logger.info(f"Carregamento: {name}...")
+
+    def _run(self):
+        try:
+            value = self.factory(self)
+            self.stage(None)
+            self._value = value
+            self.state = 'ready'
+        except Exception as e:
+            logger.error(f"Erro no carregamento em segundo plano: {str(e)}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self._current_stage = None
+            self._finished_at = time.monotonic()
+            self._ready.set()
+        if self.state == 'ready':
+            logger.info(f"Carregamento concluído em {self._finished_at - self._started_at:.1f}s")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def get(self, timeout: Optional[float] = 0) -> Optional[Any]:
+        """O objeto carregado, esperando no máximo timeout segundos (None = sem limite)"""
+        if timeout != 0:
+            self._ready.wait(timeout)
+        return self._value if self.ready else None
+
+    def status(self) -> Dict:
+        end = self._finished_at or time.monotonic()
+        return {
+            'state': self.state,
+            'stage': self._current_stage,
+            'seconds': round(end - self._started_at, 3) if self._started_at else 0.0,
+            'stages': dict(self.stages),
+            'error': self.error
+        }
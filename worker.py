@@ -0,0 +1,196 @@
+import fcntl
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from config import Config
+from utils.conversation_archive import archive_conversations
+from utils.database import Database
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class IngestWorker:
+    """Processa os jobs de ingestão enfileirados pelo /upload
+
+    Roda em um processo separado do servidor web: é o único processo que
+    grava no vectorstore, e publica uma nova versão do índice a cada PDF
+    treinado para que o servidor web recarregue.
+    """
+
+    def __init__(self, config, db):
+        self.config = config
+        self.db = db
+        # Import tardio: o app importa este módulo sem carregar o modelo
+        from models.pdf_processor import PDFProcessor
+        self.pdf_processor = PDFProcessor(config, db)
+        self.running = True
+        self.next_retention = 0.0
+
+    def run(self):
+        """Loop principal: busca o próximo job da fila e o executa"""
+        requeued = self.db.requeue_stale_ingest_jobs()
+        if requeued:
+            logger.info(f"{requeued} job(s) interrompido(s) devolvido(s) à fila")
+
+        poll_interval = getattr(self.config, 'INGEST_POLL_INTERVAL', 1.0)
+        logger.info(f"Worker de ingestão iniciado (pid {os.getpid()})")
+
+        while self.running:
+            self.run_retention()
+            job = self.db.claim_next_ingest_job(os.getpid())
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            self.process_job(job)
+
+    def run_retention(self):
+        """Arquiva as conversas antigas, no máximo uma vez por intervalo"""
+        retention_days = getattr(self.config, 'CONVERSATION_RETENTION_DAYS', 0)
+        interval = getattr(self.config, 'CONVERSATION_RETENTION_INTERVAL', 3600)
+        if not retention_days or time.monotonic() < self.next_retention:
+            return
+        self.next_retention = time.monotonic() + interval
+        try:
+            archive_conversations(
+                self.db, self.config.CONVERSATION_ARCHIVE_PATH, retention_days,
+                batch_size=getattr(self.config, 'CONVERSATION_ARCHIVE_BATCH_SIZE', 5000))
+        except Exception as e:
+            logger.error(f"Erro ao arquivar conversas: {str(e)}")
+
+    def process_job(self, job):
+        """Treina a IA com o PDF de um job, registrando o progresso no banco"""
+        job_id = job['id']
+        logger.info(f"Iniciando job {job_id}: {job['filename']}")
+        last_update = [0.0]
+        latest = {}
+
+        def progress(pages_done, pages_total, chunks_embedded):
+            latest['values'] = (pages_done, pages_total, chunks_embedded)
+            # Limitar as gravações no banco a duas por segundo
+            now = time.time()
+            if now - last_update[0] >= 0.5:
+                last_update[0] = now
+                self.db.update_ingest_job_progress(
+                    job_id, pages_done, pages_total, chunks_embedded)
+
+        try:
+            success = self.pdf_processor.train_with_pdf(
+                job['filepath'], job['filename'], progress_callback=progress)
+            error = None if success else 'Falha no treinamento'
+        except Exception as e:
+            logger.error(f"Erro no job {job_id}: {str(e)}")
+            success, error = False, str(e)
+
+        if 'values' in latest:
+            self.db.update_ingest_job_progress(job_id, *latest['values'])
+        self.db.finish_ingest_job(job_id, success, error)
+        if success:
+            logger.info(f"✅ Job {job_id} ({job['filename']}) concluído")
+        else:
+            logger.error(f"❌ Job {job_id} ({job['filename']}) FALHOU")
+
+    def stop(self, *args):
+        logger.info("Encerrando worker de ingestão...")
+        self.running = False
+
+
+def describe_ingest_job(job):
+    """Job como exposto pelo /jobs: progresso, tempo decorrido e estimativa"""
+    # Estimar o tempo restante pela taxa de páginas processadas
+    eta_seconds = None
+    elapsed = job.pop('elapsed_seconds')
+    if job['status'] == 'running' and elapsed and job['pages_done'] > 0:
+        remaining = max(job['pages_total'] - job['pages_done'], 0)
+        eta_seconds = round(elapsed * remaining / job['pages_done'], 1)
+
+    job.pop('filepath', None)
+    job['elapsed_seconds'] = round(elapsed, 1) if elapsed else 0
+    job['eta_seconds'] = eta_seconds
+    job['progress'] = (
+        round(100 * job['pages_done'] / job['pages_total'], 1)
+        if job['pages_total'] else (100.0 if job['status'] == 'done' else 0.0)
+    )
+    return job
+
+
+def acquire_worker_lock(path):
+    """Trava exclusiva do escritor do índice; None se outro processo a tem
+
+    A trava é do arquivo aberto: dura enquanto o objeto retornado existir
+    (ou até o processo terminar, mesmo que seja morto).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock_file = open(path, 'a+')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    lock_file.truncate(0)
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+    return lock_file
+
+
+def run_worker():
+    """Ponto de entrada do processo worker
+
+    Só um worker roda por vez: cada processo do servidor (uvicorn
+    --workers N, app.py) inicia o seu, e os que não conseguem a trava
+    terminam logo, antes de carregar o modelo.
+    """
+    config = Config()
+    lock_file = acquire_worker_lock(config.INGEST_WORKER_LOCK_PATH)
+    if lock_file is None:
+        logger.info("Outro worker de ingestão já está em execução - encerrando")
+        return
+    worker = IngestWorker(config, Database())
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        worker.run()
+    finally:
+        lock_file.close()
+
+
+def start_worker_process():
+    """Inicia o worker em um processo separado, sem herdar o estado do pai
+
+    Como um processo comum e não um filho daemon do multiprocessing:
+    processos daemon não podem ter filhos, e a extração paralela dos PDFs
+    usa um pool de processos. Encerrar com stop_worker_process.
+    """
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__)])
+    logger.info(f"Worker de ingestão iniciado em segundo plano (pid {process.pid})")
+    return process
+
+
+def stop_worker_process(process, timeout: float = 10):
+    """Pede ao worker que termine (SIGTERM) e o mata se não sair a tempo"""
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Worker de ingestão (pid {process.pid}) não terminou - encerrando à força")
+        process.kill()
+        process.wait()
+
+
+if __name__ == '__main__':
+    try:
+        run_worker()
+    except Exception as e:
+        logger.error(f"Erro fatal no worker: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,23 @@
+"""Entrada WSGI para o servidor pre-fork de produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+O gunicorn importa este módulo uma única vez no processo mestre
+(preload_app), então o modelo de embeddings e o índice são carregados antes
+do fork e compartilhados pelos workers via copy-on-write.
+"""
+import os
+
+# Os tokenizers do Hugging Face criam threads que não sobrevivem ao fork
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+from app import create_app  # noqa: E402
+
+app = create_app(preload=True)
+
+
+def after_fork(num_threads=0):
+    """Recria no worker o que não pode ser herdado do mestre e aquece o modelo"""
+    unibot_ai = app.extensions['unibot_ai_loader'].get()
+    if unibot_ai is not None:
+        unibot_ai.after_fork(num_threads)